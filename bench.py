@@ -0,0 +1,1126 @@
+"""
+End-to-end benchmark suite: runs the real monitor loop on Linux against a pty-based
+fake Arduino and fake keyboard/locale backends, and reports latency, loop rate, idle
+CPU and port-enumeration rate as JSON so runs can be compared across commits.
+
+    python bench.py --output bench.json
+    python bench.py --compare baseline.json
+"""
+from __future__ import annotations
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+# `import boten.main` in a fresh interpreter must stay under this (-X importtime cumulative)
+STARTUP_BUDGET_MS = 100.0
+# Modules the monitor may only load lazily: platform code, pyserial, async mode, metrics endpoint
+LAZY_MODULES = ("win32api", "win32gui", "win32process", "serial", "boten.windows", "asyncio", "http.server", "selectors")
+
+# Reconnect: the first language frame must follow the slowest device's handshake within this
+BOOT_FRAME_MARGIN_S = 0.25
+# (name, boot delays of the candidate ports, whether their firmware sends the READY handshake)
+BOOT_SCENARIOS = (("single", (0.3,), True), ("pair", (0.3, 0.8), True), ("no_handshake", (0.3,), False))
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return float("nan")
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _summary(name: str, samples: List[float]) -> Dict[str, float]:
+    # Latencies are reported in milliseconds
+    ms = [s * 1000 for s in samples]
+    return {
+        f"{name}_p50_ms": round(percentile(ms, 50), 3),
+        f"{name}_p99_ms": round(percentile(ms, 99), 3),
+        f"{name}_mean_ms": round(statistics.fmean(ms), 3) if ms else float("nan"),
+    }
+
+
+def bench_toggle_to_inject(sim, rounds: int) -> List[float]:
+    # Device sends LANGUAGE_TOGGLE → FakeBackend records the Alt+Shift injection
+    arduino = sim.arduinos[0]
+    samples = []
+    for _ in range(rounds):
+        before = len(sim.backend.injections)
+        sent_at = arduino.send(b"LANGUAGE_TOGGLE\n")
+        deadline = time.perf_counter() + 2.0
+        while len(sim.backend.injections) == before and time.perf_counter() < deadline:
+            time.sleep(0.0002)
+        if len(sim.backend.injections) > before:
+            samples.append(sim.backend.injections[before] - sent_at)
+        # Let the resulting language frame drain before the next round
+        time.sleep(0.1)
+    return samples
+
+
+def bench_toggle_burst(sim, taps: int = 5, window: float = 0.4) -> Dict[str, float]:
+    # `taps` LANGUAGE_TOGGLE lines in one burst over the pty; the loop must keep passing while the
+    # injector presses, and the layout must end up advanced by taps mod installed layouts
+    arduino = sim.arduinos[0]
+    backend = sim.backend
+    injector = sim.main.toggle_injector
+    installed = list(dict.fromkeys(backend.installed))
+    expected = installed[(installed.index(backend.current) + taps) % len(installed)]
+    presses = len(backend.injections)
+    arduino.send(b"LANGUAGE_TOGGLE\n" * taps)
+    # Longest stretch without a loop pass while the burst is handled, less time blocked idle
+    longest = 0.0
+    iterations = sim.stats["iterations"]
+    blocked = sim.stats.get("blocked", 0.0)
+    last_pass = started = time.perf_counter()
+    while time.perf_counter() - started < window:
+        time.sleep(0.0005)
+        now = time.perf_counter()
+        if sim.stats["iterations"] != iterations:
+            iterations = sim.stats["iterations"]
+            longest = max(longest, now - last_pass - (sim.stats["blocked"] - blocked))
+            blocked = sim.stats["blocked"]
+            last_pass = now
+    deadline = time.perf_counter() + 2.0
+    while not injector.idle() and time.perf_counter() < deadline:
+        time.sleep(0.005)
+    return {
+        "toggle_burst_taps": taps,
+        "toggle_burst_presses": len(backend.injections) - presses,
+        "toggle_burst_layout_ok": backend.current == expected,
+        "toggle_burst_max_loop_gap_ms": round(longest * 1000, 3),
+    }
+
+
+def bench_toggle_to_frame(sim, rounds: int, mode: str) -> List[float]:
+    # Device sends LANGUAGE_TOGGLE → the next layout's frame arrives back at the device,
+    # with main.TOGGLE_MODE = "hotkey" (Alt+Shift) or "direct" (activate_layout + optimistic send)
+    arduino = sim.arduinos[0]
+    main = sim.main
+    main.TOGGLE_MODE = mode
+    samples = []
+    try:
+        for _ in range(rounds):
+            target = main.layout_switcher.target(sim.backend.current)
+            expected = main.language_frames.get(target)[0].encode("utf-8")
+            start = len(arduino.received)
+            sent_at = arduino.send(b"LANGUAGE_TOGGLE\n")
+            hit = arduino.wait_for(lambda line: line == expected, start=start)
+            if hit is not None:
+                samples.append(hit[0] - sent_at)
+            # Let the OS-side report of the switch settle before the next round
+            time.sleep(0.1)
+    finally:
+        main.TOGGLE_MODE = "hotkey"
+    return samples
+
+
+def bench_select_layout(sim) -> Dict[str, object]:
+    # "SELECT_LAYOUT k" in direct mode lands on layout k with one activation and no hotkey presses
+    main = sim.main
+    backend = sim.backend
+    main.TOGGLE_MODE = "direct"
+    try:
+        presses = len(backend.injections)
+        index = len(main.layout_switcher.layouts()) - 1
+        target = main.layout_switcher.layout_at(index)
+        if target == backend.current:
+            index, target = 0, main.layout_switcher.layout_at(0)
+        expected = main.language_frames.get(target)[0].encode("utf-8")
+        arduino = sim.arduinos[0]
+        start = len(arduino.received)
+        sent_at = arduino.send(f"SELECT_LAYOUT {index}\n".encode("ascii"))
+        hit = arduino.wait_for(lambda line: line == expected, start=start)
+    finally:
+        main.TOGGLE_MODE = "hotkey"
+    return {
+        "select_layout_ok": hit is not None and backend.current == target,
+        "select_layout_hotkey_presses": len(backend.injections) - presses,
+        "select_layout_ms": round((hit[0] - sent_at) * 1000, 3) if hit else float("nan"),
+    }
+
+
+def bench_change_to_send(sim, rounds: int, layouts: List[int]) -> List[float]:
+    # Language source fires → the new frame arrives at the fake Arduino
+    arduino = sim.arduinos[0]
+    samples = []
+    for i in range(rounds):
+        lang_id = layouts[i % len(layouts)]
+        if lang_id == sim.language_source.current():
+            lang_id = layouts[(i + 1) % len(layouts)]
+        expected = sim.main.language_frames.get(lang_id)[0].encode("utf-8")
+        start = len(arduino.received)
+        sim.language_source.set_langid(lang_id)
+        changed_at = sim.language_source.changed_at
+        hit = arduino.wait_for(lambda line: line == expected, start=start)
+        if hit is not None:
+            samples.append(hit[0] - changed_at)
+        time.sleep(0.02)
+    return samples
+
+
+class _SlowSink:
+    """Log sink that takes `delay` per write, like a paused console or a pipe nobody reads."""
+
+    def __init__(self, delay: float) -> None:
+        self.delay = delay
+        self.lines = 0
+
+    def write(self, text: str) -> None:
+        time.sleep(self.delay)
+        self.lines += text.count("\n")
+
+    def close(self) -> None:
+        pass
+
+
+def bench_slow_log_sink(sim, rounds: int, layouts: List[int], delay: float = 0.02) -> Dict[str, float]:
+    # change_to_send at DEBUG level with a slow sink: written on the loop thread ("sync", what
+    # print() did) and through the background writer ("async")
+    from boten.log import DEBUG, log
+
+    saved = log.sinks, log.level, log.background, log.repeat_limit
+    results: Dict[str, float] = {}
+    try:
+        # Every line reaches the sink: the cost of writing it is what is measured
+        log.level, log.repeat_limit = DEBUG, 1 << 30
+        for name, background in (("sync", False), ("async", True)):
+            log.flush(timeout=5)
+            sink = _SlowSink(delay)
+            log.sinks, log.background = [sink], background
+            results.update(_summary(f"slow_log_{name}_change_to_send", bench_change_to_send(sim, rounds, layouts)))
+            log.flush(timeout=5)
+            results[f"slow_log_{name}_lines"] = sink.lines
+    finally:
+        log.flush(timeout=5)
+        log.sinks, log.level, log.background, log.repeat_limit = saved
+    return results
+
+
+def bench_idle(sim, seconds: float) -> Dict[str, float]:
+    registry = sim.main.port_registry
+    iterations = sim.stats["iterations"]
+    enumerations = registry.enumerations
+    cpu = time.process_time()
+    wall = time.perf_counter()
+    time.sleep(seconds)
+    wall = time.perf_counter() - wall
+    cpu = time.process_time() - cpu
+    return {
+        "loop_iterations_per_s": round((sim.stats["iterations"] - iterations) / wall, 1),
+        "idle_cpu_s_per_hour": round(cpu / wall * 3600, 2),
+        "enumerations_per_min": round((registry.enumerations - enumerations) / wall * 60, 2),
+    }
+
+
+def _legacy_port_checks(enumerate, description: str, seconds: float, read_timeout: float) -> Dict[str, float]:
+    # The pre-registry loop's idle pass: get_port_state() enumerated in GET_LANG_STATE and again
+    # before the readline, which returned after SERIAL_TIMEOUT with nothing to read
+    calls = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        for _ in range(2):
+            any(description in port.description for port in enumerate())
+            calls += 1
+        time.sleep(read_timeout)
+    return {"calls": calls, "wall": time.perf_counter() - started}
+
+
+def bench_enumerations(sim, seconds: float) -> Dict[str, float]:
+    # Port enumerations per hour while idle and connected: the comports()-every-check loop
+    # against the cached registry driving the real loop, over the same synthetic port list
+    registry = sim.main.port_registry
+    legacy = _legacy_port_checks(
+        registry._enumerator, sim.main.ARDUINO_PORT_DESCRIPTION, seconds, sim.main.SERIAL_TIMEOUT,
+    )
+    enumerations = registry.enumerations
+    wall = time.perf_counter()
+    time.sleep(seconds)
+    wall = time.perf_counter() - wall
+    before = legacy["calls"] / legacy["wall"] * 3600
+    after = (registry.enumerations - enumerations) / wall * 3600
+    return {
+        "enumerations_per_hour_before": round(before),
+        "enumerations_per_hour_after": round(after),
+        "enumerations_reduction_x": round(before / after, 1) if after else float("inf"),
+    }
+
+
+def bench_unplugged(sim, seconds: float) -> Dict[str, float]:
+    # Device unplugged for `seconds`: CPU, log lines and enumerations while backing off,
+    # then the time from replug to the first language frame on the device
+    arduino = sim.arduinos[0]
+    registry = sim.main.port_registry
+    sim.unplug(arduino)
+    time.sleep(0.5)
+    lines = sim.output.getvalue().count("\n") if sim.output is not None else 0
+    enumerations = registry.enumerations
+    cpu = time.process_time()
+    wall = time.perf_counter()
+    time.sleep(seconds)
+    wall = time.perf_counter() - wall
+    cpu = time.process_time() - cpu
+    results = {
+        "unplugged_cpu_s_per_hour": round(cpu / wall * 3600, 2),
+        "unplugged_enumerations_per_min": round((registry.enumerations - enumerations) / wall * 60, 2),
+    }
+    if sim.output is not None:
+        results["unplugged_log_lines_per_min"] = round((sim.output.getvalue().count("\n") - lines) / wall * 60, 2)
+    start = len(arduino.received)
+    replugged_at = time.perf_counter()
+    sim.replug(arduino)
+    hit = arduino.wait_for(lambda line: b":" in line, start=start, timeout=5.0)
+    results["replug_to_send_ms"] = round((hit[0] - replugged_at) * 1000, 3) if hit else float("nan")
+    return results
+
+
+def bench_instrumentation_cost(calls: int = 200_000) -> Dict[str, float]:
+    # Per-call cost of the metrics API, enabled and disabled
+    from boten.instrumentation import Instrumentation
+
+    results = {}
+    for enabled in (True, False):
+        inst = Instrumentation(enabled=enabled)
+        started = time.perf_counter()
+        for _ in range(calls):
+            inst.observe("bench", 0.000123)
+            inst.count("bench")
+        elapsed = time.perf_counter() - started
+        key = "metrics_call_ns" if enabled else "metrics_disabled_call_ns"
+        results[key] = round(elapsed / (calls * 2) * 1e9, 1)
+    return results
+
+
+def _stalled_traffic(send, stall: float, tick: float) -> float:
+    # A keep-alive every tick and three language flips while the device is stalled;
+    # returns when the last language frame was submitted
+    from boten.protocol import TextCodec
+    from boten.write_scheduler import KEEP_ALIVE, LANGUAGE
+
+    codec = TextCodec()
+    last_language = 0.0
+    steps = int(stall / tick)
+    for step in range(steps):
+        send(codec.keep_alive(), KEEP_ALIVE)
+        if step in (2, steps // 2, steps - 2):
+            send(codec.language(0x0409, None, f"Green:Language {step}"), LANGUAGE)
+            last_language = time.perf_counter()
+        time.sleep(tick)
+    return last_language
+
+
+def bench_stalled_writer(stall: float = 1.0, tick: float = 0.05, baud: int = 9600) -> Dict[str, float]:
+    # The device stops draining for `stall` seconds; compare the old FIFO writer (blocking
+    # writes, every frame kept) with DeviceLink's scheduler (priorities, supersede, write timeout)
+    import queue
+    import threading
+
+    from boten.connection import FakeSerialPort
+    from boten.fanout import DeviceLink
+    from boten.protocol import TextCodec
+
+    results: Dict[str, float] = {}
+    for name in ("fifo", "scheduled"):
+        port = FakeSerialPort("BENCH", handshake=False)
+        port.byte_time = 10 / baud
+        port.stall(stall)
+        if name == "fifo":
+            fifo: queue.Queue = queue.Queue()
+            stop = threading.Event()
+
+            def drain() -> None:
+                while not stop.is_set():
+                    try:
+                        port.write(fifo.get(timeout=0.05))
+                    except queue.Empty:
+                        pass
+
+            writer = threading.Thread(target=drain, daemon=True)
+            writer.start()
+            submitted = _stalled_traffic(lambda frame, kind: fifo.put(frame), stall, tick)
+            while not fifo.empty():
+                time.sleep(0.01)
+            time.sleep(0.1)
+            stop.set()
+            writer.join()
+        else:
+            link = DeviceLink("BENCH", port, TextCodec(), queue.Queue(), keep_alive_interval=tick * 4)
+            link.start()
+            submitted = _stalled_traffic(link.send, stall, tick)
+            time.sleep(stall / 2 + 0.1)
+            link.close()
+        latest = max(i for i, frame in enumerate(port.written) if frame.startswith(b"Green:"))
+        results[f"stalled_{name}_bytes"] = sum(len(frame) for frame in port.written)
+        results[f"stalled_{name}_frames"] = len(port.written)
+        results[f"stalled_{name}_latest_frame_ms"] = round((port.write_times[latest] - submitted) * 1000, 3)
+    return results
+
+
+def bench_serial_reader(frames: int = 20_000, burst: int = 50, rounds: int = 200) -> Dict[str, float]:
+    # Device → PC over a pty pair: SerialReader throughput for `frames` toggles sent in bursts of
+    # `burst` lines, then per-frame latency from the device's write to the parsed command for
+    # `rounds` bursts of 5 toggles (one to five frames per read)
+    from boten.serial_reader import SerialReader
+    from boten.simulation import FakeArduino, PtyPort
+
+    arduino = FakeArduino()
+    reader = SerialReader(PtyPort(arduino.path), queue_size=frames + 1)
+    reader.start()
+    try:
+        chunk = b"LANGUAGE_TOGGLE\n" * burst
+        started = time.perf_counter()
+        for _ in range(frames // burst):
+            arduino.send(chunk)
+        received = 0
+        while received < frames // burst * burst and reader.get(timeout=2.0) is not None:
+            received += 1
+        elapsed = time.perf_counter() - started
+
+        latencies = []
+        for _ in range(rounds):
+            sent_at = arduino.send(b"LANGUAGE_TOGGLE\n" * 5)
+            for _ in range(5):
+                if reader.get(timeout=2.0) is None:
+                    break
+                latencies.append(time.perf_counter() - sent_at)
+            time.sleep(0.001)
+    finally:
+        reader.stop()
+        reader.conn.close()
+        arduino.close()
+    results = {
+        "serial_reader_frames": received,
+        "serial_reader_frames_per_s": round(received / elapsed),
+        "serial_reader_dropped": reader.dropped,
+    }
+    results.update(_summary("serial_reader_frame_latency", latencies))
+    return results
+
+
+def bench_wire_bytes(changes_per_hour=(60, 600), layouts=(0x0409, 0x040D, 0x0419)) -> Dict[str, int]:
+    # PC → device bytes in one simulated hour (fake clock): a keep-alive offered every second
+    # and evenly spaced language changes cycling through `layouts`, written through the
+    # WriteScheduler so keep-alives right after a language frame are skipped as in the monitor.
+    # v2 wraps each language frame in a 4-byte state header; its 3-byte acks flow the other way.
+    from boten.frame_cache import FrameCache
+    from boten.langid_table import langid_table
+    from boten.protocol import STATE_HEADER, AckedBinaryCodec, BinaryCodec, TextCodec
+    from boten.write_scheduler import KEEP_ALIVE, LANGUAGE, WriteScheduler
+
+    pool = ["Red", "Green", "Blue", "White", "Cyan", "Yellow", "Magenta"]
+    colors = {lang_id: pool[i % len(pool)] for i, lang_id in enumerate(layouts)}
+    frames = FrameCache(langid_table().display_name, colors.get)
+    results: Dict[str, int] = {}
+    for changes in changes_per_hour:
+        for name, codec in (("text", TextCodec()), ("binary", BinaryCodec(pool)), ("acked", AckedBinaryCodec(pool))):
+            now = [0.0]
+            scheduler = WriteScheduler(1.0, clock=lambda: now[0])
+            every = 3600 // changes
+            sent = 0
+            for second in range(3600):
+                now[0] = float(second)
+                if second % every == 0:
+                    frame = frames.get(layouts[second // every % len(layouts)], codec)[1]
+                    scheduler.submit(frame if not codec.acked else bytes(STATE_HEADER.size) + frame, LANGUAGE)
+                scheduler.submit(codec.keep_alive(), KEEP_ALIVE)
+                while True:
+                    item = scheduler.next(0)
+                    if item is None:
+                        break
+                    scheduler.sent(item[0])
+                    sent += len(item[1])
+            results[f"wire_{name}_bytes_per_hour_{changes}_changes"] = sent
+    return results
+
+
+def _ns_per_call(lookup, keys: List[int], repeat: int = 200) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for key in keys:
+            lookup(key)
+    return round((time.perf_counter() - started) / (repeat * len(keys)) * 1e9, 1)
+
+
+def bench_langid_table() -> Dict[str, float]:
+    # Footprint and lookup cost of the compiled LANGID table vs the LANGUAGE_MAP dict,
+    # the fake OS backend, and (off Windows) a ctypes call shaped like GetLocaleInfoW
+    import ctypes
+
+    from boten.language_map import LANGUAGE_MAP
+    from boten.langid_table import LangIdTable, compile_table
+    from boten.os_backend import BUF_LEN, FakeBackend
+
+    table = LangIdTable(compile_table(LANGUAGE_MAP))
+    dict_bytes = sys.getsizeof(LANGUAGE_MAP) + sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in LANGUAGE_MAP.items())
+    # Every known LANGID plus as many unknown ones
+    keys = list(LANGUAGE_MAP) + [key + 0x8000 for key in LANGUAGE_MAP]
+    if sys.platform == "win32":
+        from boten.windows import WindowsBackend
+        os_lookup = WindowsBackend().display_name
+    else:
+        wcsncpy = ctypes.CDLL(None).wcsncpy
+        source = ctypes.create_unicode_buffer("English (United States)")
+
+        def os_lookup(lang_id: int) -> str:
+            buf = ctypes.create_unicode_buffer(BUF_LEN)
+            wcsncpy(buf, source, BUF_LEN)
+            return buf.value
+    return {
+        "langid_table_bytes": table.nbytes,
+        "langid_dict_bytes": dict_bytes,
+        "langid_table_lookup_ns": _ns_per_call(table.label, keys),
+        "langid_dict_lookup_ns": _ns_per_call(LANGUAGE_MAP.get, keys),
+        "langid_fake_backend_lookup_ns": _ns_per_call(FakeBackend().display_name, keys),
+        "langid_ctypes_lookup_ns": _ns_per_call(os_lookup, keys, repeat=50),
+    }
+
+
+def _scan_color(path: Path, language_id: int) -> str:
+    # The pre-index retrieve_saved_language_color: exists() check, then a line scan per call
+    if not os.path.exists(path):
+        open(path, "a", encoding="utf-8").close()
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.startswith(f"{language_id}:"):
+                return line.split(":", 2)[2].rstrip("\n")
+    return "Language not found"
+
+
+def bench_color_lookup(lookups: int = 2_000) -> Dict[str, float]:
+    # LANGID → color lookups per second over a mapping file with every LANGUAGE_MAP entry:
+    # the per-call file scan it replaced, LanguageColorIndex, and a bare dict as the ceiling
+    from boten.color_index import LanguageColorIndex
+    from boten.language_map import LANGUAGE_MAP
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "installed_languages.txt"
+        path.write_text("".join(f"{lcid}:{label}:Red\n" for lcid, label in LANGUAGE_MAP.items()), encoding="utf-8")
+        index = LanguageColorIndex(path)
+        plain = {lcid: "Red" for lcid in LANGUAGE_MAP}
+        keys = list(LANGUAGE_MAP)
+        # The scan is slow enough that fewer calls give a stable rate
+        scan_keys = (keys * (lookups // len(keys) + 1))[:lookups]
+        started = time.perf_counter()
+        for key in scan_keys:
+            _scan_color(path, key)
+        scan_rate = len(scan_keys) / (time.perf_counter() - started)
+        index_rate = 1e9 / _ns_per_call(index.lookup, keys)
+        dict_rate = 1e9 / _ns_per_call(plain.get, keys)
+    return {
+        "color_lookup_entries": len(keys),
+        "color_lookup_file_scan_per_s": round(scan_rate),
+        "color_lookup_index_per_s": round(index_rate),
+        "color_lookup_dict_per_s": round(dict_rate),
+        "color_lookup_speedup_x": round(index_rate / scan_rate, 1),
+    }
+
+
+def bench_trace(main, layouts: List[int], seconds: float, rounds: int) -> Dict[str, float]:
+    # A fresh simulated session with BOTEN_TRACE-style recording on from the start: idle cost
+    # and trace growth, then language changes that are replayed as fast as possible
+    from boten.replay import replay
+    from boten.simulation import Simulation
+    from boten.trace import recorder
+
+    path = main.DATA_DIR / "bench-trace.bin"
+    recorder.start(path)
+    sim = Simulation(main, devices=1, layouts=layouts)
+    sim.start()
+    try:
+        if not sim.wait_connected():
+            raise RuntimeError("traced simulation never received a language frame")
+        recorder.flush()
+        size = path.stat().st_size
+        idle = bench_idle(sim, seconds)
+        recorder.flush()
+        idle_bytes = path.stat().st_size - size
+        changes = bench_change_to_send(sim, rounds, layouts)
+    finally:
+        sim.stop()
+        recorder.stop()
+    results = {
+        "trace_idle_cpu_s_per_hour": idle["idle_cpu_s_per_hour"],
+        "trace_bytes_per_hour_idle": round(idle_bytes / seconds * 3600),
+        "trace_file_bytes": path.stat().st_size,
+        "trace_records": recorder.records,
+        "traced_change_to_send_p50_ms": round(percentile(changes, 50) * 1000, 3),
+    }
+    replayed = replay(main, path, speed=0.0)
+    results["replay_fast_duration_s"] = replayed["replayed"]["duration_s"]
+    results["replay_change_to_send_p50_ms"] = replayed["replayed"]["change_to_send_p50_ms"]
+    results["replay_frames_out_match"] = replayed["replayed"]["frames_out"] == replayed["recorded"]["frames_out"]
+    return results
+
+
+def bench_mapping_refresh(main, counts=(1, 100), refreshes: int = 200) -> Dict[str, float]:
+    # Steady-state cost of one LANG_MAPPING_CHANGE_TIMER refresh with nothing changed
+    from boten.language_map import LANGUAGE_MAP
+    from boten.os_backend import FakeBackend
+
+    results: Dict[str, float] = {}
+    saved = main.os_backend
+    try:
+        for count in counts:
+            backend = FakeBackend(installed=list(LANGUAGE_MAP)[:count])
+            main.os_backend = backend
+            # The first refresh applies the new layout set
+            main.save_language_color_mapping_if_changed()
+            calls = backend.calls
+            started = time.perf_counter()
+            for _ in range(refreshes):
+                main.save_language_color_mapping_if_changed()
+            elapsed = time.perf_counter() - started
+            results[f"mapping_refresh_{count}_layouts_us"] = round(elapsed / refreshes * 1e6, 1)
+            results[f"mapping_refresh_{count}_layouts_os_calls"] = round((backend.calls - calls) / refreshes, 1)
+    finally:
+        main.os_backend = saved
+    return results
+
+
+class _FileColorStore:
+    """The pre-ColorAllocator allocate_color/release_color: a full JSON load and atomic rewrite per call."""
+
+    def __init__(self, path: Path, pool: List[str]) -> None:
+        self.path = path
+        self.pool = pool
+        self.writes = 0
+
+    def _load(self) -> Dict[str, Optional[str]]:
+        if not self.path.exists():
+            self._save({})
+            return {}
+        return {str(k): v for k, v in json.loads(self.path.read_text(encoding="utf-8")).items()}
+
+    def _save(self, mapping: Dict[str, Optional[str]]) -> None:
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(mapping, ensure_ascii=False, indent=2), encoding="utf-8")
+        tmp.replace(self.path)
+        self.writes += 1
+
+    def allocate(self, identifier) -> Optional[str]:
+        mapping = self._load()
+        if identifier in mapping:
+            return mapping[identifier]
+        used = set(mapping.values())
+        color = next((c for c in self.pool if c not in used), None)
+        mapping[identifier] = color
+        self._save(mapping)
+        return color
+
+    def release(self, identifier) -> bool:
+        mapping = self._load()
+        if identifier not in mapping:
+            return False
+        mapping.pop(identifier)
+        self._save(mapping)
+        return True
+
+
+def bench_color_allocator(cycles: int = 1_000, installed: int = 5) -> Dict[str, object]:
+    # `cycles` allocate + release pairs with `installed` other layouts holding colors throughout:
+    # the per-call file store against ColorAllocator, whose batch is flushed once at the end
+    from boten.color_allocator import ColorAllocator
+    from boten.log import log
+
+    pool = ["Red", "Green", "Blue", "White", "Cyan", "Yellow", "Magenta"]
+    results: Dict[str, object] = {}
+    scratch = Path(tempfile.mkdtemp(prefix="boten-alloc-"))
+    stores = (
+        ("file", _FileColorStore(scratch / "file.json", pool)),
+        ("allocator", ColorAllocator(scratch / "allocator.json", pool)),
+    )
+    for name, store in stores:
+        with contextlib.redirect_stdout(io.StringIO()):
+            for lcid in range(installed):
+                store.allocate(str(lcid))
+            colors = set()
+            started = time.perf_counter()
+            for i in range(cycles):
+                lcid = str(0x0400 + i)
+                colors.add(store.allocate(lcid))
+                store.release(lcid)
+            if isinstance(store, ColorAllocator):
+                store.flush()
+            elapsed = time.perf_counter() - started
+            # Pending "×N" lines go to the discarded stdout, not to the JSON on the real one
+            log.flush()
+        writes = store.writes if isinstance(store, _FileColorStore) else store.flushes
+        results[f"color_alloc_{name}_cycle_us"] = round(elapsed / cycles * 1e6, 2)
+        results[f"color_alloc_{name}_writes"] = writes
+        # Each released color is the next one allocated, so one color serves every cycle
+        results[f"color_alloc_{name}_reuse_ok"] = colors == {pool[installed]}
+    results["color_alloc_speedup_x"] = round(
+        results["color_alloc_file_cycle_us"] / results["color_alloc_allocator_cycle_us"], 1
+    )
+    return results
+
+
+def bench_color_lru(counts=(100, 1000), palettes=(7, 64), touches: int = 20_000) -> Dict[str, object]:
+    # Allocation with more layouts than colors: every new id and every touch of an uncolored id
+    # evicts the least recently used color, so the cost per call must not grow with the id count
+    import random
+
+    from boten.color_allocator import ColorAllocator, rgb_palette
+    from boten.log import log
+
+    results: Dict[str, object] = {}
+    scratch = tempfile.mkdtemp(prefix="boten-lru-")
+    rng = random.Random(7)
+    for count in counts:
+        for size in palettes:
+            allocator = ColorAllocator(Path(scratch) / f"lru_{count}_{size}.json", rgb_palette(size))
+            ids = list(range(0x0400, 0x0400 + count))
+            with contextlib.redirect_stdout(io.StringIO()):
+                allocator.mapping()  # load (and create) the state file outside the timing
+                started = time.perf_counter()
+                for lang_id in ids:
+                    allocator.allocate(lang_id)
+                allocated = time.perf_counter() - started
+                picks = [rng.choice(ids) for _ in range(touches)]
+                started = time.perf_counter()
+                for lang_id in picks:
+                    allocator.touch(lang_id)
+                touched = time.perf_counter() - started
+                log.flush()
+            # The `size` most recently touched distinct ids must be exactly the colored ones
+            recent = list(dict.fromkeys(reversed(picks)))[:size]
+            mapping = allocator.mapping()
+            prefix = f"color_lru_{count}_ids_{size}_colors"
+            results[f"{prefix}_allocate_ns"] = round(allocated / count * 1e9, 1)
+            results[f"{prefix}_touch_ns"] = round(touched / touches * 1e9, 1)
+            results[f"{prefix}_evictions"] = allocator.evictions
+            results[f"{prefix}_lru_ok"] = all(mapping[str(i)] is not None for i in recent) and (
+                sum(1 for c in mapping.values() if c is not None) == min(size, count)
+            )
+    return results
+
+
+def bench_ipc_fanout(subscribers: int = 100, events: int = 200, gap: float = 0.002) -> Dict[str, object]:
+    # publish() → the event line read by each of `subscribers` local clients, plus one client that
+    # subscribes and never reads: it must be dropped without delaying the others
+    if sys.platform == "win32":
+        return {}
+    import selectors
+    import socket
+
+    from boten.ipc import UnixIpcServer
+
+    path = os.path.join(tempfile.mkdtemp(prefix="boten-ipc-"), "bench.sock")
+    server = UnixIpcServer(path)
+    server.start()
+    clients = []
+    for _ in range(subscribers):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(path)
+        sock.sendall(b"subscribe\n")
+        clients.append(sock)
+    stuck = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stuck.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+    stuck.connect(path)
+    stuck.sendall(b"subscribe\n")
+    deadline = time.perf_counter() + 2.0
+    while server.subscribers < subscribers + 1 and time.perf_counter() < deadline:
+        time.sleep(0.001)
+
+    published: Dict[int, float] = {}
+    latencies: List[float] = []
+    last_arrival: Dict[int, float] = {}
+    done = threading.Event()
+
+    def read() -> None:
+        selector = selectors.DefaultSelector()
+        buffers = {}
+        for sock in clients:
+            sock.setblocking(False)
+            selector.register(sock, selectors.EVENT_READ)
+            buffers[sock] = b""
+        while not done.is_set():
+            for key, _ in selector.select(0.05):
+                now = time.perf_counter()
+                data = buffers[key.fileobj] + key.fileobj.recv(65536)
+                *lines, buffers[key.fileobj] = data.split(b"\n")
+                for line in lines:
+                    seq = json.loads(line)["seq"]
+                    if seq in published:
+                        latencies.append(now - published[seq])
+                        last_arrival[seq] = now
+        selector.close()
+
+    reader = threading.Thread(target=read, name="ipc-bench-reader", daemon=True)
+    reader.start()
+    padding = "x" * 200
+    publish_cost = 0.0
+    for i in range(events):
+        state = {"langid": 0x0400 + i, "color": "Red", "text": padding}
+        started = time.perf_counter()
+        # Recorded first: the reader may see the event before publish() returns
+        published[server.published + 1] = started
+        server.publish(state)
+        publish_cost += time.perf_counter() - started
+        time.sleep(gap)
+    time.sleep(0.2)
+    # Overrun the stuck client's socket buffer and queue
+    flood = "x" * 4096
+    for i in range(server.queue_size * 4):
+        server.publish({"langid": i, "text": flood})
+        time.sleep(0.0005)
+    time.sleep(0.1)
+    done.set()
+    reader.join(timeout=2)
+    fanout = [last_arrival[seq] - at for seq, at in published.items() if seq in last_arrival]
+    result = {
+        "ipc_subscribers": subscribers,
+        "ipc_publish_us": round(publish_cost / events * 1e6, 1),
+        "ipc_delivered_pct": round(len(latencies) / (events * subscribers) * 100, 2),
+        "ipc_stuck_client_dropped": server.dropped >= 1,
+    }
+    result.update(_summary("ipc_event_latency", latencies))
+    result.update(_summary("ipc_fanout_last_subscriber", fanout))
+    for sock in clients:
+        sock.close()
+    stuck.close()
+    server.stop()
+    return result
+
+
+def _acked_changes(hub, device, changes: int, first: int, timeout: float = 5.0):
+    # Broadcast `changes` states one at a time; per state, the time until the device shows it
+    # and until the PC holds its ack (time to a consistent state on both sides)
+    from boten.write_scheduler import LANGUAGE
+
+    link = hub.links[device.port]
+    shown: List[float] = []
+    acked: List[float] = []
+    for i in range(first, first + changes):
+        langid = 0x0400 + i
+        started = time.perf_counter()
+        hub.broadcast(lambda codec, langid=langid: codec.language(langid, "Red", f"Red:L{langid:x}"), LANGUAGE)
+        at = device.wait_for(langid, timeout)
+        if at is not None:
+            shown.append(at - started)
+        deadline = started + timeout
+        while link.acks.outstanding and time.perf_counter() < deadline:
+            time.sleep(0.0005)
+        if not link.acks.outstanding:
+            acked.append(time.perf_counter() - started)
+    return shown, acked
+
+
+def bench_acked_updates(changes: int = 50, loss: float = 0.3, duplicate: float = 0.3, seed: int = 1) -> Dict[str, object]:
+    # Protocol v2 against the device simulator: frame and ack loss, duplication, then a reconnect
+    # after the PC moved on while the device was away, which must take exactly one frame
+    from boten.device_sim import SimulatedDevice
+    from boten.fanout import DeviceHub
+    from boten.protocol import negotiate
+    from boten.write_scheduler import LANGUAGE
+
+    results: Dict[str, object] = {}
+    pool = ["Red"]
+    scenarios = (
+        ("loss", dict(loss=loss, ack_loss=loss / 3)),
+        ("dup", dict(loss=loss / 3, duplicate=duplicate)),
+    )
+    for name, faults in scenarios:
+        hub = DeviceHub()
+        device = SimulatedDevice(f"SIM-{name}", ack_latency=0.002, seed=seed, **faults)
+        codec = negotiate(device, pool)
+        hub.add(device.port, device, codec)
+        shown, acked = _acked_changes(hub, device, changes, 0)
+        link = hub.links[device.port]
+        results[f"acks_{name}_protocol"] = codec.version
+        results[f"acks_{name}_consistent_pct"] = round(len(acked) / changes * 100, 2)
+        results.update(_summary(f"acks_{name}_shown", shown))
+        results.update(_summary(f"acks_{name}_acked", acked))
+        results[f"acks_{name}_retransmits"] = link.acks.retransmits
+        results[f"acks_{name}_lost"] = device.lost + device.acks_lost
+        results[f"acks_{name}_rejected"] = device.rejected
+        results[f"acks_{name}_regressions"] = device.regressions()
+        if name != "loss":
+            hub.close()
+            continue
+        # Reconnect: the device keeps its seq, the PC skips states while it is away
+        hub.remove(device.port)
+        for i in range(changes, changes + 5):
+            hub.broadcast(lambda codec, langid=0x0400 + i: codec.language(langid, "Red", f"Red:L{langid:x}"), LANGUAGE)
+        device.loss = device.ack_loss = 0.0
+        device.reconnect()
+        started = time.perf_counter()
+        hub.add(device.port, device, negotiate(device, pool))
+        at = device.wait_for(0x0400 + changes + 4, 5.0)
+        time.sleep(0.05)
+        results["acks_reconnect_consistent_ms"] = round((at - started) * 1000, 3) if at else float("nan")
+        results["acks_reconnect_frames"] = device.since_reconnect
+        results["acks_reconnect_regressions"] = device.regressions()
+        hub.close()
+    return results
+
+
+def bench_boot_delays(scenarios=BOOT_SCENARIOS) -> Dict[str, object]:
+    # Reconnect to fake ports with injected boot delays: time from the connect attempt to the
+    # first language frame written to any device and to every device. The old code opened the
+    # ports one after another and slept 2 s after each, so its first frame took 2 s per port.
+    from boten.connection import BOOT_TIMEOUT, ConnectionManager, FakeSerialPort
+    from boten.fanout import DeviceHub
+    from boten.protocol import TextCodec
+    from boten.write_scheduler import LANGUAGE
+
+    results: Dict[str, object] = {}
+    frame = b"Red:Eng (United States)\n"
+    for name, delays, handshake in scenarios:
+        names = [f"COM{i + 3}" for i in range(len(delays))]
+        opened: List[FakeSerialPort] = []
+
+        def open_port(port: str) -> FakeSerialPort:
+            conn = FakeSerialPort(port, boot_delay=delays[names.index(port)], handshake=handshake)
+            opened.append(conn)
+            return conn
+
+        hub = DeviceHub()
+        started = time.perf_counter()
+        # As establish_devices(): the first device up gets the language, later ones get it from the hub
+        for result in ConnectionManager(open_port).connect_all(names):
+            hub.add(result.port, result.conn, TextCodec())
+            if hub.latest is None:
+                hub.broadcast(lambda codec: frame, LANGUAGE)
+        deadline = time.perf_counter() + 5.0
+        while any(frame not in conn.written for conn in opened) and time.perf_counter() < deadline:
+            time.sleep(0.001)
+        firsts = [conn.write_times[conn.written.index(frame)] - started for conn in opened if frame in conn.written]
+        hub.close()
+        fastest, slowest = (min(delays), max(delays)) if handshake else (BOOT_TIMEOUT, BOOT_TIMEOUT)
+        results[f"boot_{name}_first_frame_ms"] = round(min(firsts) * 1000, 1) if firsts else float("nan")
+        results[f"boot_{name}_all_frames_ms"] = round(max(firsts) * 1000, 1) if len(firsts) == len(delays) else float("nan")
+        results[f"boot_{name}_first_bound_ms"] = round((fastest + BOOT_FRAME_MARGIN_S) * 1000, 1)
+        results[f"boot_{name}_all_bound_ms"] = round((slowest + BOOT_FRAME_MARGIN_S) * 1000, 1)
+        results[f"boot_{name}_old_first_frame_ms"] = round(BOOT_TIMEOUT * 1000, 1)
+        results[f"boot_{name}_old_all_frames_ms"] = round(BOOT_TIMEOUT * len(delays) * 1000, 1)
+    return results
+
+
+def check_boot(results: Dict[str, object]) -> List[str]:
+    # The fastest device, and then every device, gets a frame within BOOT_FRAME_MARGIN_S of being ready
+    problems = []
+    for name, _, _ in BOOT_SCENARIOS:
+        for measured, limit, what in (("first_frame", "first_bound", "first frame"),
+                                      ("all_frames", "all_bound", "first frame on every device")):
+            took = results[f"boot_{name}_{measured}_ms"]
+            bound = results[f"boot_{name}_{limit}_ms"]
+            if not took <= bound:
+                problems.append(f"{name}: {what} after {took} ms (bound {bound} ms)")
+    return problems
+
+
+def check_acks(results: Dict[str, object]) -> List[str]:
+    # Every state reaches the device and gets acked, nothing goes backwards, and reconnect sends one frame
+    problems = []
+    for name in ("loss", "dup"):
+        if results[f"acks_{name}_consistent_pct"] < 100:
+            problems.append(f"{name}: only {results[f'acks_{name}_consistent_pct']}% of states were acked")
+        if results[f"acks_{name}_regressions"]:
+            problems.append(f"{name}: the device showed {results[f'acks_{name}_regressions']} stale states")
+    if results["acks_dup_rejected"] == 0:
+        problems.append("dup: no duplicate frame was rejected")
+    if results["acks_reconnect_frames"] != 1:
+        problems.append(f"reconnect: {results['acks_reconnect_frames']} frames instead of one resync frame")
+    if results["acks_reconnect_consistent_ms"] != results["acks_reconnect_consistent_ms"]:
+        problems.append("reconnect: the device never showed the latest state")
+    return problems
+
+
+def bench_startup(runs: int = 5) -> Dict[str, object]:
+    # Best of `runs` fresh interpreters importing boten.main with -X importtime
+    env = dict(os.environ, BOTEN_HOME=tempfile.mkdtemp(prefix="boten-bench-"))
+    root = os.path.dirname(os.path.abspath(__file__))
+    best: Optional[Dict[str, object]] = None
+    for _ in range(runs):
+        started = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import boten.main"],
+            cwd=root, env=env, capture_output=True, text=True, check=True,
+        )
+        wall = time.perf_counter() - started
+        # "import time: self [us] | cumulative | imported package"
+        modules = {}
+        for line in proc.stderr.splitlines():
+            parts = line.split("|")
+            if len(parts) == 3 and parts[1].strip().isdigit():
+                modules[parts[2].strip()] = int(parts[1])
+        result = {
+            "startup_import_ms": round(modules.get("boten.main", 0) / 1000, 2),
+            "startup_wall_ms": round(wall * 1000, 1),
+            "startup_modules": len(modules),
+            "startup_lazy_violations": sorted(m for m in modules if m in LAZY_MODULES),
+        }
+        if best is None or result["startup_import_ms"] < best["startup_import_ms"]:
+            best = result
+    return best
+
+
+def check_startup(results: Dict[str, object]) -> List[str]:
+    # Empty when the startup budget holds
+    problems = []
+    if results["startup_import_ms"] > STARTUP_BUDGET_MS:
+        problems.append(f"import boten.main took {results['startup_import_ms']} ms (budget {STARTUP_BUDGET_MS} ms)")
+    if results["startup_lazy_violations"]:
+        problems.append(f"imported at startup: {', '.join(results['startup_lazy_violations'])}")
+    return problems
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)), stderr=subprocess.DEVNULL, text=True,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def run(rounds: int = 50, idle_seconds: float = 5.0) -> Dict[str, object]:
+    # main reads BOTEN_HOME at import time, so the scratch directory must be set first
+    scratch = tempfile.mkdtemp(prefix="boten-bench-")
+    os.environ["BOTEN_HOME"] = scratch
+    from boten import main
+    from boten.simulation import Simulation
+
+    layouts = [0x0409, 0x040D, 0x0419]
+    sim = Simulation(main, devices=1, layouts=layouts)
+    sim.start()
+    try:
+        if not sim.wait_connected():
+            raise RuntimeError("simulated device never received a language frame")
+        from boten.instrumentation import metrics as instruments
+
+        metrics: Dict[str, float] = {}
+        instruments.enabled = False
+        metrics.update(bench_idle(sim, idle_seconds))
+        metrics.update(bench_enumerations(sim, idle_seconds))
+        # Same idle run with instrumentation on: the CPU difference is its overhead,
+        # reported as a share of one core since the idle baseline itself is tiny
+        instruments.enabled = True
+        instrumented = bench_idle(sim, idle_seconds)
+        metrics["idle_cpu_s_per_hour_instrumented"] = instrumented["idle_cpu_s_per_hour"]
+        overhead = instrumented["idle_cpu_s_per_hour"] - metrics["idle_cpu_s_per_hour"]
+        metrics["instrumentation_overhead_pct_core"] = round(overhead / 3600 * 100, 3)
+        metrics.update(bench_instrumentation_cost())
+        metrics.update(bench_stalled_writer())
+        metrics.update(bench_boot_delays())
+        metrics.update(bench_serial_reader())
+        metrics.update(bench_wire_bytes())
+        metrics.update(bench_startup())
+        metrics.update(bench_langid_table())
+        metrics.update(bench_color_lookup())
+        metrics.update(bench_color_allocator())
+        metrics.update(bench_color_lru())
+        metrics.update(bench_ipc_fanout())
+        metrics.update(bench_acked_updates(rounds))
+        metrics.update(_summary("toggle_to_inject", bench_toggle_to_inject(sim, rounds)))
+        metrics.update(bench_toggle_burst(sim))
+        # Same round trip through both toggle paths
+        metrics.update(_summary("toggle_to_frame_hotkey", bench_toggle_to_frame(sim, rounds, "hotkey")))
+        metrics.update(_summary("toggle_to_frame_direct", bench_toggle_to_frame(sim, rounds, "direct")))
+        metrics.update(bench_select_layout(sim))
+        metrics.update(_summary("change_to_send", bench_change_to_send(sim, rounds, layouts)))
+        metrics.update(bench_slow_log_sink(sim, rounds, layouts))
+        # Last: it drops and re-establishes the connection
+        metrics.update(bench_unplugged(sim, idle_seconds))
+    finally:
+        sim.stop()
+    # Both swap the OS backend, so they run after the simulated loop has stopped
+    metrics.update(bench_trace(main, layouts, idle_seconds, rounds))
+    overhead = metrics["trace_idle_cpu_s_per_hour"] - metrics["idle_cpu_s_per_hour"]
+    metrics["trace_overhead_pct_core"] = round(overhead / 3600 * 100, 3)
+    with contextlib.redirect_stdout(io.StringIO()):
+        metrics.update(bench_mapping_refresh(main))
+        main.log.flush()
+    return {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "rounds": rounds,
+        "idle_seconds": idle_seconds,
+        "metrics": metrics,
+    }
+
+
+def compare(baseline: Dict[str, object], current: Dict[str, object]) -> str:
+    lines = [f"{'metric':32} {'baseline':>12} {'current':>12} {'change':>9}"]
+    for name, value in current["metrics"].items():
+        old = baseline.get("metrics", {}).get(name)
+        if isinstance(old, (int, float)) and old:
+            change = f"{(value - old) / old * 100:+.1f}%"
+        else:
+            change = ""
+        lines.append(f"{name:32} {str(old):>12} {str(value):>12} {change:>9}")
+    return "\n".join(lines)
+
+
+def main_cli(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=50, help="samples per latency benchmark")
+    parser.add_argument("--idle-seconds", type=float, default=5.0, help="length of the idle measurement")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="baseline JSON file to compare against")
+    parser.add_argument(
+        "--check-startup", action="store_true",
+        help="only measure startup; exit 1 if over STARTUP_BUDGET_MS or a lazy module is imported eagerly",
+    )
+    parser.add_argument(
+        "--check-boot", action="store_true",
+        help="only run the boot-delay reconnect scenarios; exit 1 if a first frame misses its bound",
+    )
+    parser.add_argument(
+        "--check-acks", action="store_true",
+        help="only run the acked-update scenarios; exit 1 on a lost, stale or replayed state",
+    )
+    args = parser.parse_args(argv)
+
+    if args.check_acks:
+        results = bench_acked_updates(args.rounds)
+        print(json.dumps(results, indent=2))
+        problems = check_acks(results)
+        for problem in problems:
+            print(f"FAIL: {problem}", file=sys.stderr)
+        return 1 if problems else 0
+
+    if args.check_boot:
+        results = bench_boot_delays()
+        print(json.dumps(results, indent=2))
+        problems = check_boot(results)
+        for problem in problems:
+            print(f"FAIL: {problem}", file=sys.stderr)
+        return 1 if problems else 0
+
+    if args.check_startup:
+        results = bench_startup()
+        print(json.dumps(results, indent=2))
+        problems = check_startup(results)
+        for problem in problems:
+            print(f"FAIL: {problem}", file=sys.stderr)
+        return 1 if problems else 0
+
+    results = run(args.rounds, args.idle_seconds)
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            print(compare(json.load(f), results))
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
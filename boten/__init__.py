@@ -0,0 +1,7 @@
+"""
+Boten: keeps an Arduino's language indicator in sync with the Windows keyboard layout
+and injects the layout hotkey when the device's button is pressed.
+
+Importing the package has no side effects; the OS backend and serial port are only
+touched when the monitor runs (python -m boten).
+"""
@@ -0,0 +1,100 @@
+from __future__ import annotations
+import threading
+import time
+from typing import Callable, Optional
+
+from .instrumentation import metrics
+from .protocol import FLAG_RESYNC, encode_state
+
+# First retransmit of an unacknowledged state frame; doubles per retransmit up to ACK_TIMEOUT_MAX
+ACK_TIMEOUT = 0.15
+ACK_TIMEOUT_MAX = 1.0
+
+
+class AckTracker:
+    """
+    Sequence numbers and retransmission of one device's state frames (protocol v2).
+    - Only the newest state is outstanding: stamping a new one abandons the older unacked one.
+    - A frame that was written but not acked is due again after the timeout, with the same seq.
+    - Frames carry FLAG_RESYNC until the device acked one on this connection, so it takes
+      the first state whatever seq it remembers from an earlier connection.
+    Called from the monitor loop (stamp), the writer thread (sent, due) and the reader thread (ack).
+    """
+
+    def __init__(
+        self,
+        timeout: float = ACK_TIMEOUT,
+        max_timeout: float = ACK_TIMEOUT_MAX,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.timeout = timeout
+        self.max_timeout = max_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._resync = True
+        self._frame: Optional[bytes] = None  # outstanding stamped frame
+        self._first_sent: Optional[float] = None
+        self._deadline = float("inf")  # armed once the frame is written
+        self._backoff = timeout
+        self.last_acked: Optional[int] = None
+        self.acked = 0
+        self.retransmits = 0
+        self.stale_acks = 0
+
+    def stamp(self, language_frame: bytes) -> bytes:
+        # Wrap a language frame in OP_STATE with the next seq; it becomes the outstanding frame
+        with self._lock:
+            self._seq = (self._seq + 1) & 0xFFFF
+            self._frame = encode_state(self._seq, language_frame, FLAG_RESYNC if self._resync else 0)
+            self._first_sent = None
+            self._deadline = float("inf")
+            self._backoff = self.timeout
+            return self._frame
+
+    def sent(self, frame: bytes) -> None:
+        # The writer finished writing `frame`: start its retransmit timer
+        with self._lock:
+            if frame is not self._frame:
+                return
+            now = self._clock()
+            if self._first_sent is None:
+                self._first_sent = now
+            self._deadline = now + self._backoff
+
+    def due(self) -> Optional[bytes]:
+        # The outstanding frame if its ack is overdue; the next timeout is doubled
+        with self._lock:
+            if self._frame is None or self._clock() < self._deadline:
+                return None
+            self._deadline = float("inf")
+            self._backoff = min(self._backoff * 2, self.max_timeout)
+            self.retransmits += 1
+            metrics.count("serial.retransmits")
+            return self._frame
+
+    def remaining(self) -> float:
+        # Seconds until due() returns a frame; inf when nothing is waiting for an ack
+        with self._lock:
+            return max(0.0, self._deadline - self._clock())
+
+    def ack(self, seq: int) -> bool:
+        # Acks of superseded or already acked frames (duplicates, late retransmits) are only counted
+        with self._lock:
+            if self._frame is None or seq != self._seq:
+                self.stale_acks += 1
+                metrics.count("serial.stale_acks")
+                return False
+            if self._first_sent is not None:
+                metrics.observe("serial.ack_rtt", self._clock() - self._first_sent)
+            self._frame = None
+            self._deadline = float("inf")
+            self._resync = False
+            self.last_acked = seq
+            self.acked += 1
+            return True
+
+    @property
+    def outstanding(self) -> bool:
+        with self._lock:
+            return self._frame is not None
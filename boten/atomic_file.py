@@ -0,0 +1,14 @@
+from __future__ import annotations
+import os
+from pathlib import Path
+
+
+def atomic_write(path: Path, text: str) -> None:
+    # Write to a temp file, fsync it, then rename it over `path`: a reader or a crash
+    # sees the old content or the new, never a half-written file
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
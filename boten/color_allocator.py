@@ -0,0 +1,282 @@
+from __future__ import annotations
+import json
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Union
+
+from .atomic_file import atomic_write
+from .log import log
+
+# Debounce for mutations made outside a transaction
+COLOR_FLUSH_DELAY = 1.0
+# Recency-only changes (touch()) are persisted lazily: losing a minute of ordering on a crash is harmless
+RECENCY_FLUSH_DELAY = 60.0
+
+Identifier = Union[int, str]
+
+
+def _key(identifier: Identifier) -> str:
+    # LANGIDs arrive as int (allocation) and as decimal str (parsed from the mapping file)
+    try:
+        return str(int(identifier))
+    except (TypeError, ValueError):
+        return str(identifier)
+
+
+def rgb_palette(count: int) -> List[str]:
+    # `count` evenly spaced full-saturation hues as "#RRGGBB", for addressable RGB LEDs
+    colors = []
+    for i in range(count):
+        hue = 6.0 * i / count
+        sector = int(hue)
+        rising = round(255 * (hue - sector))
+        falling = 255 - rising
+        r, g, b = [(255, rising, 0), (falling, 255, 0), (0, 255, rising),
+                   (0, falling, 255), (rising, 0, 255), (255, 0, falling)][sector]
+        colors.append(f"#{r:02X}{g:02X}{b:02X}")
+    return colors
+
+
+def parse_palette(spec: str, default: List[str]) -> List[str]:
+    # "Red,Green,..." or "#FF0000,..." lists the colors; "rgb:<n>" generates n hues; "" keeps `default`
+    spec = spec.strip()
+    if spec.lower().startswith("rgb:"):
+        count = int(spec[4:])
+        if count <= 0:
+            raise ValueError(f"palette size must be positive: {spec}")
+        return rgb_palette(count)
+    colors = list(dict.fromkeys(c.strip() for c in spec.split(",") if c.strip()))
+    return colors or list(default)
+
+
+class ColorAllocator:
+    """
+    Owns the id→color mapping in memory and persists it write-behind.
+    - Free colors are a bitmap over the pool, so allocation picks the lowest free bit.
+    - When the pool is exhausted the least recently used color is evicted; touch() records use.
+      Recency is an OrderedDict (O(1) move/evict) persisted as last-seen times.
+    - Mutations inside `with allocator.transaction():` are flushed once when it exits.
+    - Other mutations are flushed by flush_if_due() after COLOR_FLUSH_DELAY.
+    Flushes are fsync'ed and renamed over the state file, so a crash mid-batch leaves
+    the last flushed state intact.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        pool: List[str],
+        flush_delay: float = COLOR_FLUSH_DELAY,
+        clock: Callable[[], float] = time.monotonic,
+        wall_clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.path = path
+        self.pool = list(pool)
+        self._pool_index = {color: i for i, color in enumerate(self.pool)}
+        self.flush_delay = flush_delay
+        self._clock = clock
+        self._wall_clock = wall_clock
+        self._mapping: Dict[str, Optional[str]] = {}
+        self._users: Dict[str, int] = {}  # holders per color, for hand-edited duplicates
+        self._free = 0
+        # Every mapped id, least recently seen first, with its last-seen wall time
+        self._last_seen: "OrderedDict[str, float]" = OrderedDict()
+        # Ids holding a color, least recently seen first: the head is the eviction victim
+        self._colored: "OrderedDict[str, None]" = OrderedDict()
+        self._loaded = False
+        self._depth = 0
+        self._flush_at: Optional[float] = None
+        self.flushes = 0  # number of state file writes, for benchmarking
+        self.evictions = 0
+        # id → new color for every id eviction changed since take_recolored(), so the owner can
+        # rewrite entries it already wrote out
+        self.recolored: Dict[str, Optional[str]] = {}
+
+    def _load(self) -> None:
+        # Ensure the directory exists; create if missing
+        if not self.path.parent.exists():
+            log.info("Creating directory: %s", self.path.parent)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        mapping: Optional[Dict[str, Optional[str]]] = None
+        last_seen: Dict[str, float] = {}
+        migrate = False
+        if self.path.exists():
+            try:
+                data = json.loads(self.path.read_text(encoding="utf-8"))
+                if isinstance(data, dict) and isinstance(data.get("colors"), dict):
+                    last_seen = {_key(k): float(v) for k, v in (data.get("last_seen") or {}).items()}
+                    data = data["colors"]
+                else:
+                    # The original format is the bare id→color object
+                    migrate = True
+                if isinstance(data, dict):
+                    mapping = {_key(k): (None if v is None else str(v)) for k, v in data.items()}
+            except Exception:
+                pass
+        self._loaded = True
+        if mapping is None:
+            # Missing or malformed content: reset safely
+            self._set_mapping({}, {})
+            self.flush()
+        else:
+            self._set_mapping(mapping, last_seen)
+            if migrate:
+                # Rewritten at once, so the old format never outlives the first load
+                log.info("Converting color assignments to the current format: %s", self.path)
+                self.flush()
+
+    def _set_mapping(self, mapping: Dict[str, Optional[str]], last_seen: Dict[str, float]) -> None:
+        self._mapping = mapping
+        self._users = {}
+        for color in mapping.values():
+            if color is not None:
+                self._users[color] = self._users.get(color, 0) + 1
+        self._free = 0
+        for i, color in enumerate(self.pool):
+            if color not in self._users:
+                self._free |= 1 << i
+        # Ids never seen (older state files) count as least recent, in file order
+        order = sorted(mapping, key=lambda key: last_seen.get(key, 0.0))
+        self._last_seen = OrderedDict((key, last_seen.get(key, 0.0)) for key in order)
+        self._colored = OrderedDict((key, None) for key in order if mapping[key] is not None)
+
+    def _ensure_loaded(self) -> None:
+        if not self._loaded:
+            self._load()
+
+    def _mark_dirty(self, delay: Optional[float] = None) -> None:
+        flush_at = self._clock() + (self.flush_delay if delay is None else delay)
+        if self._flush_at is None or flush_at < self._flush_at:
+            self._flush_at = flush_at
+
+    def mapping(self) -> Dict[str, Optional[str]]:
+        self._ensure_loaded()
+        return dict(self._mapping)
+
+    def _take_color(self, key: str) -> Optional[str]:
+        # Lowest free pool color, else the least recently used one (its holder keeps None)
+        if self._free:
+            index = (self._free & -self._free).bit_length() - 1
+            self._free &= ~(1 << index)
+            color = self.pool[index]
+            self._users[color] = 1
+            return color
+        victim = next((k for k in self._colored if k != key), None)
+        if victim is None:
+            return None
+        del self._colored[victim]
+        color = self._mapping[victim]
+        self._mapping[victim] = None
+        self.recolored[victim] = None
+        self.evictions += 1
+        log.info("--- Color %s moved from %s to %s (least recently used)", color, victim, key)
+        return color
+
+    def allocate(self, identifier: Identifier) -> Optional[str]:
+        """
+        Allocate a color for the given identifier.
+        - If the identifier is already mapped, return its color (None if it was evicted).
+        - Otherwise pick the first color from the pool not currently assigned,
+          or evict the least recently used one when the pool is exhausted.
+        - None only when the pool is empty.
+        """
+        self._ensure_loaded()
+        key = _key(identifier)
+        if key in self._mapping:
+            return self._mapping[key]
+
+        color = self._take_color(key)
+        self._mapping[key] = color
+        self._last_seen[key] = self._wall_clock()
+        if color is not None:
+            self._colored[key] = None
+        self._mark_dirty()
+        return color
+
+    def touch(self, identifier: Identifier) -> bool:
+        """
+        Record that the identifier is in use now (O(1)); unmapped identifiers are ignored.
+        A mapped identifier without a color takes one back, evicting the least recently used.
+        Returns True when that changed the mapping.
+        """
+        self._ensure_loaded()
+        key = _key(identifier)
+        if key not in self._last_seen:
+            return False
+        self._last_seen[key] = self._wall_clock()
+        self._last_seen.move_to_end(key)
+        if key in self._colored:
+            self._colored.move_to_end(key)
+            self._mark_dirty(RECENCY_FLUSH_DELAY)
+            return False
+        color = self._take_color(key)
+        if color is None:
+            self._mark_dirty(RECENCY_FLUSH_DELAY)
+            return False
+        self._mapping[key] = color
+        self._colored[key] = None
+        self.recolored[key] = color
+        self._mark_dirty()
+        return True
+
+    def take_recolored(self) -> Dict[str, Optional[str]]:
+        recolored, self.recolored = self.recolored, {}
+        return recolored
+
+    def last_seen(self) -> Dict[str, float]:
+        # id → last-seen wall time, least recent first
+        self._ensure_loaded()
+        return dict(self._last_seen)
+
+    def release(self, identifier: Identifier) -> bool:
+        """
+        Release the color associated with the identifier.
+        Returns True if released, False if the identifier was unknown.
+        """
+        self._ensure_loaded()
+        key = _key(identifier)
+        if key not in self._mapping:
+            return False
+        color = self._mapping.pop(key)
+        self._last_seen.pop(key, None)
+        self._colored.pop(key, None)
+        if color is not None:
+            self._users[color] -= 1
+            if not self._users[color]:
+                del self._users[color]
+                index = self._pool_index.get(color)
+                if index is not None:
+                    self._free |= 1 << index
+        self._mark_dirty()
+        return True
+
+    @contextmanager
+    def transaction(self) -> Iterator["ColorAllocator"]:
+        self._ensure_loaded()
+        self._depth += 1
+        try:
+            yield self
+        finally:
+            self._depth -= 1
+            if self._depth == 0 and self._flush_at is not None:
+                self.flush()
+
+    def flush_due_in(self) -> Optional[float]:
+        # Seconds until flush_if_due() would write, or None when nothing is pending
+        if self._depth or self._flush_at is None:
+            return None
+        return max(0.0, self._flush_at - self._clock())
+
+    def flush_if_due(self) -> None:
+        if self._depth or self._flush_at is None:
+            return
+        if self._clock() >= self._flush_at:
+            self.flush()
+
+    def flush(self) -> None:
+        state = {"colors": self._mapping, "last_seen": self._last_seen}
+        atomic_write(self.path, json.dumps(state, ensure_ascii=False, indent=2))
+        self._flush_at = None
+        self.flushes += 1
@@ -0,0 +1,77 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from .log import log
+
+LANGUAGE_NOT_FOUND = "Language not found"
+
+
+class LanguageColorIndex:
+    """
+    Loaded-once LANGID → color view of installed_languages.txt ("lcid:name:color" lines).
+    - lookup() is a dict access and never touches the file.
+    - refresh() stats the file and reloads only when its mtime or size changed.
+    - update() replaces the index after the process writes the file itself.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._colors: Dict[int, str] = {}
+        self._signature: Optional[Tuple[int, int]] = None
+        self._loaded = False
+        self.loads = 0  # number of file parses, for benchmarking
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = self.path.stat()
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _parse(self, lines: Iterable[str]) -> Dict[int, str]:
+        colors: Dict[int, str] = {}
+        for line in lines:
+            parts = line.rstrip("\n").split(":", 2)
+            if len(parts) != 3:
+                continue
+            try:
+                colors[int(parts[0])] = parts[2]
+            except ValueError:
+                continue
+        return colors
+
+    def refresh(self) -> bool:
+        # Returns True when the file was (re)loaded
+        if not self.path.parent.exists():
+            log.info("Creating directory: %s", self.path.parent)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Ensure file exists
+        if not self.path.exists():
+            open(self.path, "a", encoding="utf-8").close()
+
+        signature = self._stat()
+        if self._loaded and signature == self._signature:
+            return False
+        with open(self.path, "r", encoding="utf-8") as f:
+            self._colors = self._parse(f)
+        self._signature = signature
+        self._loaded = True
+        self.loads += 1
+        return True
+
+    def update(self, lines: Iterable[str]) -> None:
+        # Called right after this process wrote `lines` to the file: no re-read needed
+        self._colors = self._parse(lines)
+        self._signature = self._stat()
+        self._loaded = True
+
+    def ids(self) -> Set[int]:
+        if not self._loaded:
+            self.refresh()
+        return set(self._colors)
+
+    def lookup(self, language_id: int) -> str:
+        if not self._loaded:
+            self.refresh()
+        return self._colors.get(language_id, LANGUAGE_NOT_FOUND)
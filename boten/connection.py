@@ -0,0 +1,227 @@
+from __future__ import annotations
+import queue
+import threading
+import time
+from typing import Callable, Iterator, List, Optional, Tuple
+
+# Line the firmware prints once its sketch is running after the open-triggered reset
+DEVICE_READY_LINE = b"READY"
+# Fallback when the device never sends DEVICE_READY_LINE (older firmware): the old fixed delay
+BOOT_TIMEOUT = 2.0
+# Read timeout while waiting for the handshake; bounds how fast a cancelled probe exits
+PROBE_POLL = 0.05
+
+
+class ProbeResult:
+    def __init__(self, port: str) -> None:
+        self.port = port
+        self.conn = None
+        self.status = "Unavailable"
+        self.handshake = False
+        self.elapsed = 0.0
+
+
+class ConnectionManager:
+    """
+    Opens every candidate port in parallel and picks one.
+    - A port is ready as soon as it sends DEVICE_READY_LINE; the first such port wins.
+    - If none does within boot_timeout, the first port (in candidate order) that opened wins.
+    - Every other opened port is closed before connect() returns.
+    - connect_all() keeps every port that opened and yields each one as soon as it is ready.
+    open_port(name) must return a serial.Serial-like object or raise.
+    """
+
+    def __init__(self, open_port: Callable[[str], object], boot_timeout: float = BOOT_TIMEOUT) -> None:
+        self.open_port = open_port
+        self.boot_timeout = boot_timeout
+        self.results: List[ProbeResult] = []
+
+    def _probe(self, result: ProbeResult, cancel: threading.Event, done: queue.Queue) -> None:
+        start = time.perf_counter()
+        try:
+            conn = self.open_port(result.port)
+            result.conn = conn
+            result.status = "Available"
+            saved_timeout = conn.timeout
+            conn.timeout = PROBE_POLL
+            pending = b""
+            deadline = start + self.boot_timeout
+            while not cancel.is_set() and time.perf_counter() < deadline:
+                pending += conn.readline()
+                if pending.endswith(b"\n"):
+                    if pending.strip() == DEVICE_READY_LINE:
+                        result.handshake = True
+                        break
+                    pending = b""
+            conn.timeout = saved_timeout
+        except Exception:
+            result.status = "Busy or Unavailable"
+            # Opened but failed during the handshake: never hand it out, and do not leak it
+            if result.conn is not None:
+                try:
+                    result.conn.close()
+                except Exception:
+                    pass
+                result.conn = None
+        result.elapsed = time.perf_counter() - start
+        done.put(result)
+
+    def connect(self, ports: List[str]) -> Tuple[Optional[ProbeResult], List[ProbeResult]]:
+        # Returns (winner or None, all probe results)
+        cancel = threading.Event()
+        done: queue.Queue = queue.Queue()
+        self.results = [ProbeResult(port) for port in ports]
+        threads = [
+            threading.Thread(target=self._probe, args=(r, cancel, done), name=f"probe-{r.port}", daemon=True)
+            for r in self.results
+        ]
+        for thread in threads:
+            thread.start()
+
+        winner: Optional[ProbeResult] = None
+        for _ in threads:
+            result = done.get()
+            if result.handshake:
+                winner = result
+                break
+        cancel.set()
+        for thread in threads:
+            thread.join()
+
+        if winner is None:
+            winner = next((r for r in self.results if r.conn is not None), None)
+        # Close the losers deterministically
+        for result in self.results:
+            if result is not winner and result.conn is not None:
+                try:
+                    result.conn.close()
+                except Exception:
+                    pass
+                result.conn = None
+        return winner, self.results
+
+    def connect_all(self, ports: List[str]) -> Iterator[ProbeResult]:
+        # Multi-device variant: every port that opened is kept, each ready on its own handshake.
+        # Yielded as each probe finishes, so the fastest device is not held back by the slowest.
+        cancel = threading.Event()
+        done: queue.Queue = queue.Queue()
+        self.results = [ProbeResult(port) for port in ports]
+        threads = [
+            threading.Thread(target=self._probe, args=(r, cancel, done), name=f"probe-{r.port}", daemon=True)
+            for r in self.results
+        ]
+        for thread in threads:
+            thread.start()
+        handed_out = set()
+        try:
+            for _ in threads:
+                result = done.get()
+                if result.conn is not None:
+                    handed_out.add(result.port)
+                    yield result
+        finally:
+            # Only when the caller stopped early: close the ports it never took
+            cancel.set()
+            for thread in threads:
+                thread.join()
+            for result in self.results:
+                if result.port not in handed_out and result.conn is not None:
+                    try:
+                        result.conn.close()
+                    except Exception:
+                        pass
+                    result.conn = None
+
+
+class FakeSerialPort:
+    """
+    serial.Serial stand-in for a device that boots for `boot_delay` seconds after open.
+    It then sends DEVICE_READY_LINE (if `handshake`), followed by anything passed to feed().
+    Writes are recorded in `written` with their completion time in `write_times`.
+    - stall(seconds) makes writes block as a full USB buffer would; past write_timeout
+      they raise TimeoutError like pyserial's SerialTimeoutException.
+    - byte_time adds a per-byte transmit delay (1 / (baud / 10) for a real UART).
+    """
+
+    def __init__(self, port: str, boot_delay: float = 0.0, handshake: bool = True) -> None:
+        self.port = port
+        self.timeout: Optional[float] = None
+        self.write_timeout: Optional[float] = None
+        self.byte_time = 0.0
+        self.written: List[bytes] = []
+        self.write_times: List[float] = []
+        self._stalled_until = 0.0
+        self.is_open = True
+        self._booted_at = time.perf_counter() + boot_delay
+        self._inbound = bytearray(DEVICE_READY_LINE + b"\n" if handshake else b"")
+        self._cond = threading.Condition()
+
+    def feed(self, data: bytes) -> None:
+        with self._cond:
+            self._inbound += data
+            self._cond.notify_all()
+
+    def _available(self) -> int:
+        return len(self._inbound) if time.perf_counter() >= self._booted_at else 0
+
+    @property
+    def in_waiting(self) -> int:
+        return self._available()
+
+    def _wait_for(self, predicate) -> None:
+        deadline = None if self.timeout is None else time.perf_counter() + self.timeout
+        with self._cond:
+            while self.is_open and not predicate():
+                now = time.perf_counter()
+                if deadline is not None and now >= deadline:
+                    return
+                wake = self._booted_at if now < self._booted_at else None
+                limits = [t - now for t in (deadline, wake) if t is not None]
+                self._cond.wait(min(limits) if limits else None)
+            if not self.is_open:
+                raise OSError("port closed")
+
+    def read(self, size: int = 1) -> bytes:
+        self._wait_for(lambda: self._available() >= size)
+        with self._cond:
+            n = min(size, self._available())
+            data = bytes(self._inbound[:n])
+            del self._inbound[:n]
+        return data
+
+    def readline(self) -> bytes:
+        self._wait_for(lambda: b"\n" in self._inbound[:self._available()])
+        with self._cond:
+            available = self._available()
+            end = self._inbound.find(b"\n", 0, available)
+            n = available if end < 0 else end + 1
+            data = bytes(self._inbound[:n])
+            del self._inbound[:n]
+        return data
+
+    def stall(self, seconds: float) -> None:
+        with self._cond:
+            self._stalled_until = time.perf_counter() + seconds
+            self._cond.notify_all()
+
+    def write(self, data: bytes) -> int:
+        deadline = None if self.write_timeout is None else time.perf_counter() + self.write_timeout
+        with self._cond:
+            while self.is_open and time.perf_counter() < self._stalled_until:
+                now = time.perf_counter()
+                if deadline is not None and now >= deadline:
+                    raise TimeoutError("write timeout")
+                wake = self._stalled_until if deadline is None else min(deadline, self._stalled_until)
+                self._cond.wait(wake - now)
+            if not self.is_open:
+                raise OSError("port closed")
+        if self.byte_time:
+            time.sleep(self.byte_time * len(data))
+        self.written.append(bytes(data))
+        self.write_times.append(time.perf_counter())
+        return len(data)
+
+    def close(self) -> None:
+        with self._cond:
+            self.is_open = False
+            self._cond.notify_all()
@@ -0,0 +1,92 @@
+from __future__ import annotations
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+from .instrumentation import metrics
+
+# How long an enumeration result is trusted when no hotplug signal arrives
+PORT_REGISTRY_TTL = 2.0
+
+
+def _comports():
+    import serial.tools.list_ports
+    return serial.tools.list_ports.comports()
+
+
+class DeviceRegistry:
+    """
+    In-memory set of serial devices whose description matches a pattern.
+    - Enumerates at most once per TTL, or sooner after notify_hotplug().
+    - is_present() is a dict lookup between refreshes.
+    - The enumerator is injectable: any callable returning objects with .device and .description.
+    - subscribe(callback) is called with the newly appeared ports after a refresh finds any.
+    - on_hotplug(callback) is called from notify_hotplug(), on the notifying thread.
+    """
+
+    def __init__(
+        self,
+        description: str,
+        enumerator: Optional[Callable[[], Iterable]] = None,
+        ttl: float = PORT_REGISTRY_TTL,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.description = description
+        self._enumerator = enumerator or _comports
+        self.ttl = ttl
+        self._clock = clock
+        self._devices: Dict[str, str] = {}
+        self._expires = 0.0
+        self._stale = threading.Event()
+        self._stale.set()
+        self.enumerations = 0  # number of enumerator calls, for benchmarking
+        self._listeners: List[Callable[[List[str]], None]] = []
+        self._hotplug_listeners: List[Callable[[], None]] = []
+
+    def subscribe(self, callback: Callable[[List[str]], None]) -> None:
+        self._listeners.append(callback)
+
+    def on_hotplug(self, callback: Callable[[], None]) -> None:
+        self._hotplug_listeners.append(callback)
+
+    def notify_hotplug(self) -> None:
+        # Safe to call from any thread (e.g. a WM_DEVICECHANGE handler)
+        self._stale.set()
+        for callback in self._hotplug_listeners:
+            callback()
+
+    def expires_in(self) -> float:
+        # Seconds until the cached enumeration goes stale (0 when a refresh is already due)
+        if self._stale.is_set():
+            return 0.0
+        return max(0.0, self._expires - self._clock())
+
+    def refresh(self, force: bool = False) -> None:
+        if not (force or self._stale.is_set() or self._clock() >= self._expires):
+            return
+        self._stale.clear()
+        started = time.perf_counter()
+        ports = self._enumerator()
+        self.enumerations += 1
+        metrics.observe("ports.enumerate", time.perf_counter() - started)
+        devices = {p.device: p.description for p in ports if self.description in p.description}
+        appeared = [device for device in devices if device not in self._devices]
+        self._devices = devices
+        self._expires = self._clock() + self.ttl
+        if appeared:
+            for callback in self._listeners:
+                callback(appeared)
+
+    def devices(self) -> List[str]:
+        self.refresh()
+        return list(self._devices)
+
+    def describe(self, device: str) -> str:
+        return self._devices.get(device, "")
+
+    def is_present(self, device: Optional[str] = None) -> bool:
+        # With no device given, answers "is any matching device attached?"
+        self.refresh()
+        if device is None:
+            return bool(self._devices)
+        return device in self._devices
@@ -0,0 +1,153 @@
+"""
+Device-side model of protocol v2 for exercising sequence numbers, acks and resync without hardware.
+SimulatedDevice is a FakeSerialPort that answers the handshake with "PROTO 2", shows the states it
+receives and acknowledges every OP_STATE frame. Frame loss, ack loss, duplication and ack latency
+are drawn from a seeded random generator, so a run is reproducible.
+"""
+from __future__ import annotations
+import random
+import threading
+import time
+from typing import List, NamedTuple, Optional
+
+from .connection import FakeSerialPort
+from .protocol import (
+    FLAG_RESYNC,
+    OP_LANGUAGE,
+    OP_STATE,
+    PROTOCOL_VERSION,
+    FrameDecoder,
+    encode_ack,
+    seq_newer,
+)
+
+
+class Shown(NamedTuple):
+    time: float  # perf_counter when the device applied the state
+    langid: int
+    label: str
+    seq: Optional[int]  # None for an unsequenced OP_LANGUAGE frame
+    resync: bool = False
+
+
+class SimulatedDevice(FakeSerialPort):
+    """
+    Applies a state frame only if it carries FLAG_RESYNC or a seq newer than the last one applied,
+    so duplicates and late retransmits never move the display backwards.
+    The applied seq survives reconnect(), like the firmware's RAM across a USB re-enumeration.
+    """
+
+    def __init__(
+        self,
+        port: str = "SIM",
+        loss: float = 0.0,
+        ack_loss: float = 0.0,
+        duplicate: float = 0.0,
+        ack_latency: float = 0.0,
+        seed: int = 0,
+        version: int = PROTOCOL_VERSION,
+    ) -> None:
+        super().__init__(port, handshake=False)
+        self.loss = loss
+        self.ack_loss = ack_loss
+        self.duplicate = duplicate
+        self.ack_latency = ack_latency
+        self.version = version
+        self._rng = random.Random(seed)
+        self._decoder = FrameDecoder()
+        self._shown_cond = threading.Condition()
+        self.seq: Optional[int] = None
+        self.shown: List[Shown] = []
+        self.states_received = 0  # OP_STATE frames that arrived, duplicates included
+        self.since_reconnect = 0  # of those, since the last reconnect()
+        self.lost = 0
+        self.acks_lost = 0
+        self.duplicated = 0
+        self.rejected = 0  # stale or duplicate frames not applied
+
+    @property
+    def langid(self) -> Optional[int]:
+        with self._shown_cond:
+            return self.shown[-1].langid if self.shown else None
+
+    def wait_for(self, langid: int, timeout: float) -> Optional[float]:
+        # perf_counter time the device started showing `langid`, or None on timeout
+        deadline = time.perf_counter() + timeout
+        with self._shown_cond:
+            while not self.shown or self.shown[-1].langid != langid:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    return None
+                self._shown_cond.wait(remaining)
+            return self.shown[-1].time
+
+    def reconnect(self) -> None:
+        # Reopen after close(): a fresh link to the same device, which keeps what it shows
+        with self._cond:
+            self.is_open = True
+            self._inbound.clear()
+            self._decoder = FrameDecoder()
+            self.since_reconnect = 0
+
+    def write(self, data: bytes) -> int:
+        n = super().write(data)
+        if data.startswith(b"PROTO?"):
+            if self.version:
+                self.feed(f"PROTO {self.version}\n".encode("ascii"))
+            return n
+        if self._rng.random() < self.loss:
+            self.lost += 1
+            return n
+        copies = 1
+        if self._rng.random() < self.duplicate:
+            self.duplicated += 1
+            copies = 2
+        for _ in range(copies):
+            for frame in self._decoder.feed(data):
+                if frame.opcode in (OP_STATE, OP_LANGUAGE):
+                    self._receive(frame)
+        return n
+
+    def _receive(self, frame) -> None:
+        if frame.opcode == OP_STATE:
+            self.states_received += 1
+            self.since_reconnect += 1
+            resync = bool(frame.flags & FLAG_RESYNC)
+            fresh = resync or self.seq is None or seq_newer(frame.seq, self.seq)
+            if fresh:
+                self.seq = frame.seq
+            else:
+                self.rejected += 1
+            # Acked either way, so the PC stops resending what the device already has
+            self._ack(frame.seq)
+            if not fresh:
+                return
+        else:
+            resync = False
+        with self._shown_cond:
+            self.shown.append(Shown(time.perf_counter(), frame.langid, frame.label, frame.seq, resync))
+            self._shown_cond.notify_all()
+
+    def _ack(self, seq: int) -> None:
+        if self._rng.random() < self.ack_loss:
+            self.acks_lost += 1
+            return
+        if self.ack_latency > 0:
+            timer = threading.Timer(self.ack_latency, self.feed, (encode_ack(seq),))
+            timer.daemon = True
+            timer.start()
+        else:
+            self.feed(encode_ack(seq))
+
+    def regressions(self) -> int:
+        # Sequenced states applied after a newer one without a resync in between; must stay 0
+        count = 0
+        last: Optional[int] = None
+        with self._shown_cond:
+            for shown in self.shown:
+                if shown.seq is None:
+                    continue
+                if last is not None and not shown.resync and not seq_newer(shown.seq, last):
+                    count += 1
+                last = shown.seq
+        return count
@@ -0,0 +1,220 @@
+from __future__ import annotations
+import asyncio
+from collections import deque
+from typing import Callable, Deque, List, Optional, Tuple
+
+from .acks import AckTracker
+from .language_source import LanguageSource
+from .log import log
+from .protocol import TEXT_ACK, TEXT_TOGGLE, TextCodec, parse_select_layout
+from .serial_reader import LineFramer
+
+# How long the language watcher blocks in its executor thread before re-checking for shutdown
+LANGUAGE_WAIT_TIMEOUT = 0.5
+# Read timeout used by PySerialTransport; the reader runs in a thread so this only bounds shutdown
+TRANSPORT_READ_TIMEOUT = 0.5
+
+
+class SerialTransport:
+    """Line-oriented link to the Arduino. read_line() returns None once the link is closed."""
+
+    async def read_line(self) -> Optional[bytes]:
+        raise NotImplementedError
+
+    async def write(self, data: bytes) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class PySerialTransport(SerialTransport):
+    """Wraps a serial.Serial (a COM port, or a pty slave on Linux); blocking calls run in threads."""
+
+    def __init__(self, conn, framer=None) -> None:
+        self.conn = conn
+        self.conn.timeout = TRANSPORT_READ_TIMEOUT
+        # Frames text lines by default; protocol.BinaryFramer for the binary protocol
+        self.framer = framer or LineFramer()
+        self._lines: Deque[bytes] = deque()
+        self._closed = False
+
+    def _read_line_blocking(self) -> Optional[bytes]:
+        # A read may end mid-line; the framer keeps the partial line until its end arrives
+        while not self._lines:
+            if self._closed:
+                return None
+            try:
+                data = self.conn.read(self.conn.in_waiting or 1)
+            except Exception:
+                # close() from another thread fails the pending read; that is an orderly end
+                if self._closed:
+                    return None
+                raise
+            if data:
+                self._lines.extend(self.framer.feed(data))
+        return self._lines.popleft()
+
+    async def read_line(self) -> Optional[bytes]:
+        return await asyncio.to_thread(self._read_line_blocking)
+
+    async def write(self, data: bytes) -> None:
+        await asyncio.to_thread(self.conn.write, data)
+
+    def close(self) -> None:
+        self._closed = True
+        self.conn.close()
+
+
+class MemoryTransport(SerialTransport):
+    """In-memory fake: feed() simulates device lines, `written` records what the PC sent."""
+
+    def __init__(self) -> None:
+        self._inbound: asyncio.Queue = asyncio.Queue()
+        self.written: List[bytes] = []
+
+    def feed(self, line: bytes) -> None:
+        self._inbound.put_nowait(line)
+
+    async def read_line(self) -> Optional[bytes]:
+        return await self._inbound.get()
+
+    async def write(self, data: bytes) -> None:
+        self.written.append(data)
+
+    def close(self) -> None:
+        self._inbound.put_nowait(None)
+
+
+class AsyncEngine:
+    """
+    Runs the monitor as independent tasks that talk through a single outbound queue:
+    - reader: device lines → toggle / select-layout handlers; a LANGID they return is assumed at once
+    - writer: outbound queue → transport
+    - keep-alive: KEEP_ALIVE every keep_alive_interval
+    - language watcher: language source changes → frame_of(lang_id) frames
+    - mapping refresher: refresh_mapping() every refresh_interval
+    - retransmitter (acked protocol v2 only): language frames go out sequence-numbered through
+      an AckTracker and are resent until the device's "ACK <seq>" line arrives
+    run() returns when the transport closes or fails; blocking callbacks run in the executor.
+    """
+
+    def __init__(
+        self,
+        transport: SerialTransport,
+        language_source: LanguageSource,
+        frame_of: Callable[[int], Tuple[str, bytes]],
+        on_toggle: Callable[[], Optional[int]],
+        refresh_mapping: Optional[Callable[[], None]] = None,
+        keep_alive_interval: float = 1.0,
+        refresh_interval: float = 5.0,
+        codec=None,
+        on_select: Optional[Callable[[int], Optional[int]]] = None,
+    ) -> None:
+        self.transport = transport
+        self.language_source = language_source
+        self.frame_of = frame_of
+        self.on_toggle = on_toggle
+        self.on_select = on_select
+        self.refresh_mapping = refresh_mapping
+        self.keep_alive_interval = keep_alive_interval
+        self.refresh_interval = refresh_interval
+        self.codec = codec or TextCodec()
+        self.outbound: asyncio.Queue = asyncio.Queue()
+        self.last_lang: Optional[str] = None
+        # New per connection, so the first state frame carries FLAG_RESYNC
+        self.acks: Optional[AckTracker] = AckTracker() if getattr(self.codec, "acked", False) else None
+        self._written = asyncio.Event()
+
+    async def _reader(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            raw = await self.transport.read_line()
+            if raw is None:
+                return
+            line = raw.decode("utf-8", errors="replace").strip()
+            activated = None
+            if self.acks is not None and line.startswith(TEXT_ACK + " "):
+                try:
+                    self.acks.ack(int(line[len(TEXT_ACK) + 1:]))
+                except ValueError:
+                    pass
+            elif line == TEXT_TOGGLE:
+                log.info("Toggle = %s", line)
+                activated = await loop.run_in_executor(None, self.on_toggle)
+            elif self.on_select is not None:
+                index = parse_select_layout(line)
+                if index is not None:
+                    log.info("Select layout = %d", index)
+                    activated = await loop.run_in_executor(None, self.on_select, index)
+            if activated is not None:
+                self.language_source.assume(activated)
+
+    async def _writer(self) -> None:
+        while True:
+            data = await self.outbound.get()
+            await self.transport.write(data)
+            if self.acks is not None:
+                # Starts the retransmit timer if this was the outstanding state frame
+                self.acks.sent(data)
+                self._written.set()
+
+    async def _keep_alive(self) -> None:
+        while True:
+            self.outbound.put_nowait(self.codec.keep_alive())
+            await asyncio.sleep(self.keep_alive_interval)
+
+    async def _language_watcher(self) -> None:
+        loop = asyncio.get_running_loop()
+        # Each connection starts by reporting the current language
+        self.language_source.resend()
+        while True:
+            lang_id = await loop.run_in_executor(None, self.language_source.wait, LANGUAGE_WAIT_TIMEOUT)
+            if lang_id is None:
+                continue
+            current_lang, frame = self.frame_of(lang_id)
+            if current_lang != self.last_lang:
+                log.info("Language changed to: %s", current_lang)
+                self.last_lang = current_lang
+                self.outbound.put_nowait(frame if self.acks is None else self.acks.stamp(frame))
+                log.info("NEW Language Sent to Arduino: %s", current_lang)
+
+    async def _retransmitter(self) -> None:
+        # Sleeps until the outstanding frame's ack is overdue; every write may have re-armed the timer
+        while True:
+            remaining = self.acks.remaining()
+            try:
+                await asyncio.wait_for(self._written.wait(), None if remaining == float("inf") else remaining)
+            except asyncio.TimeoutError:
+                frame = self.acks.due()
+                if frame is not None:
+                    self.outbound.put_nowait(frame)
+            self._written.clear()
+
+    async def _mapping_refresher(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await loop.run_in_executor(None, self.refresh_mapping)
+            await asyncio.sleep(self.refresh_interval)
+
+    async def run(self) -> None:
+        tasks = [
+            asyncio.create_task(self._reader(), name="reader"),
+            asyncio.create_task(self._writer(), name="writer"),
+            asyncio.create_task(self._keep_alive(), name="keep-alive"),
+            asyncio.create_task(self._language_watcher(), name="language-watcher"),
+        ]
+        if self.acks is not None:
+            tasks.append(asyncio.create_task(self._retransmitter(), name="retransmitter"))
+        if self.refresh_mapping is not None:
+            tasks.append(asyncio.create_task(self._mapping_refresher(), name="mapping-refresher"))
+        try:
+            # Any task finishing (reader EOF) or failing (serial error) ends this connection
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                task.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.transport.close()
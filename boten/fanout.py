@@ -0,0 +1,230 @@
+from __future__ import annotations
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from .acks import AckTracker
+from .instrumentation import metrics
+from .serial_reader import INBOUND_QUEUE_SIZE, SerialReader
+from .write_scheduler import LANGUAGE, WriteScheduler
+
+# How often an idle writer thread re-checks for shutdown
+WRITER_POLL = 0.1
+# A write that cannot complete within this is abandoned, so a stalled USB buffer never wedges the writer
+WRITE_TIMEOUT = 0.5
+# Consecutive write timeouts after which the device counts as failed
+MAX_WRITE_TIMEOUTS = 6
+
+
+def _is_write_timeout(e: BaseException) -> bool:
+    # pyserial raises SerialTimeoutException; fakes and ptys raise TimeoutError
+    return isinstance(e, TimeoutError) or type(e).__name__ == "SerialTimeoutException"
+
+
+class DeviceLink:
+    """
+    One connected device with its own reader thread and write scheduler/thread,
+    so a slow or wedged device never blocks the others.
+    Writes use WRITE_TIMEOUT; a timed-out language frame is retried unless superseded.
+    With an acked protocol (v2) language frames are sequence-numbered and resent until acked.
+    on_event, if given, is called when a command arrives or the device fails.
+    """
+
+    def __init__(
+        self,
+        port: str,
+        conn,
+        codec,
+        commands: queue.Queue,
+        keep_alive_interval: float = 1.0,
+        on_event: Optional[Callable[[], None]] = None,
+    ) -> None:
+        self.port = port
+        self.on_event = on_event
+        self.conn = conn
+        self.codec = codec
+        self.conn.write_timeout = WRITE_TIMEOUT
+        self.acks: Optional[AckTracker] = AckTracker() if getattr(codec, "acked", False) else None
+        framer = codec.framer(on_ack=self.acks.ack) if self.acks is not None else codec.framer()
+        self.reader = SerialReader(conn, framer=framer, commands=commands, on_event=on_event)
+        self.outbound = WriteScheduler(keep_alive_interval)
+        self.state = "connected"
+        self.connected_at = time.monotonic()
+        self.last_write = 0.0
+        self.bytes_written = 0
+        self.frames_sent = 0
+        self.write_timeouts = 0
+        self.last_error: Optional[BaseException] = None
+        self._stop = threading.Event()
+        self._writer: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self.reader.start()
+        self._writer = threading.Thread(target=self._write_loop, name=f"writer-{self.port}", daemon=True)
+        self._writer.start()
+
+    def send(self, data: bytes, kind: int = LANGUAGE) -> None:
+        # Never blocks: the frame takes its scheduler slot and the writer thread does the I/O
+        if kind == LANGUAGE and self.acks is not None:
+            data = self.acks.stamp(data)
+        self.outbound.submit(data, kind)
+
+    def _next_frame(self):
+        if self.acks is None:
+            return self.outbound.next(WRITER_POLL)
+        # A newer language frame, if queued, already replaced the outstanding one, so nothing is due
+        retransmit = self.acks.due()
+        if retransmit is not None:
+            return LANGUAGE, retransmit
+        return self.outbound.next(min(WRITER_POLL, self.acks.remaining()))
+
+    def _write_loop(self) -> None:
+        consecutive_timeouts = 0
+        while not self._stop.is_set():
+            item = self._next_frame()
+            if item is None:
+                continue
+            kind, data = item
+            started = time.perf_counter()
+            try:
+                self.conn.write(data)
+            except Exception as e:
+                self.last_error = e
+                if _is_write_timeout(e) and consecutive_timeouts + 1 < MAX_WRITE_TIMEOUTS:
+                    consecutive_timeouts += 1
+                    self.write_timeouts += 1
+                    metrics.count("serial.write_timeouts")
+                    self.outbound.requeue(kind, data)
+                    continue
+                self.state = "failed"
+                metrics.count("serial.write_errors")
+                if self.on_event is not None:
+                    self.on_event()
+                return
+            consecutive_timeouts = 0
+            metrics.observe("serial.write", time.perf_counter() - started)
+            metrics.count("serial.write_bytes", len(data))
+            self.outbound.sent(kind)
+            if kind == LANGUAGE and self.acks is not None:
+                self.acks.sent(data)
+            self.bytes_written += len(data)
+            self.frames_sent += 1
+            self.last_write = time.monotonic()
+
+    @property
+    def healthy(self) -> bool:
+        if self.state == "connected" and self.reader.error is not None:
+            self.last_error = self.reader.error
+            self.state = "failed"
+        return self.state == "connected"
+
+    def close(self) -> None:
+        self._stop.set()
+        self.reader.stop()
+        try:
+            self.conn.close()
+        except Exception:
+            pass
+        if self._writer is not None:
+            self._writer.join(timeout=WRITER_POLL * 5)
+        if self.state == "connected":
+            self.state = "closed"
+
+    def health(self) -> Dict[str, object]:
+        return {
+            "port": self.port,
+            "state": self.state,
+            "protocol": self.codec.version,
+            "uptime": round(time.monotonic() - self.connected_at, 1),
+            "queued": self.outbound.pending(),
+            "sent": self.frames_sent,
+            "bytes": self.bytes_written,
+            "superseded": self.outbound.superseded,
+            "ka_skipped": self.outbound.suppressed,
+            "timeouts": self.write_timeouts,
+            "retx": 0 if self.acks is None else self.acks.retransmits,
+            "dropped": self.outbound.control_dropped + self.reader.dropped,
+            "error": "" if self.last_error is None else str(self.last_error),
+        }
+
+
+class DeviceHub:
+    """
+    Fans out every outbound frame to N devices and merges their inbound commands
+    into one queue, so a single language watcher serves all of them.
+    A device added after a language broadcast gets exactly one frame with the latest state,
+    and the devices already connected get nothing.
+    on_event, if given, is called (from the device threads) when a command arrives or a device fails,
+    so the monitor loop can block instead of polling get_command().
+    """
+
+    def __init__(
+        self,
+        queue_size: int = INBOUND_QUEUE_SIZE,
+        keep_alive_interval: float = 1.0,
+        on_event: Optional[Callable[[], None]] = None,
+    ) -> None:
+        self.links: Dict[str, DeviceLink] = {}
+        self.on_event = on_event
+        self.commands: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.keep_alive_interval = keep_alive_interval
+        # frame_for of the last language broadcast, replayed to devices that connect later
+        self.latest: Optional[Callable[[object], bytes]] = None
+
+    def add(self, port: str, conn, codec) -> DeviceLink:
+        self.remove(port)
+        link = DeviceLink(port, conn, codec, self.commands, self.keep_alive_interval, self.on_event)
+        self.links[port] = link
+        link.start()
+        if self.latest is not None:
+            link.send(self.latest(codec), LANGUAGE)
+        return link
+
+    def remove(self, port: str) -> None:
+        link = self.links.pop(port, None)
+        if link is not None:
+            link.close()
+
+    def ports(self) -> List[str]:
+        return list(self.links)
+
+    def prune(self, is_present: Callable[[str], bool]) -> List[str]:
+        # Drop devices that failed or are no longer enumerated; returns the removed ports
+        removed = [port for port, link in self.links.items() if not link.healthy or not is_present(port)]
+        for port in removed:
+            self.remove(port)
+        return removed
+
+    def broadcast(self, frame_for: Callable[[object], bytes], kind: int = LANGUAGE) -> None:
+        # frame_for(codec) encodes the frame for each device's negotiated protocol
+        if kind == LANGUAGE:
+            self.latest = frame_for
+        for link in self.links.values():
+            link.send(frame_for(link.codec), kind)
+
+    def get_command(self, timeout: float = 0.0) -> Optional[str]:
+        try:
+            if timeout > 0:
+                return self.commands.get(timeout=timeout)
+            return self.commands.get_nowait()
+        except queue.Empty:
+            return None
+
+    def health(self) -> List[Dict[str, object]]:
+        return [link.health() for link in self.links.values()]
+
+    def close(self) -> None:
+        for port in list(self.links):
+            self.remove(port)
+
+
+def format_health_table(rows: List[Dict[str, object]]) -> str:
+    if not rows:
+        return "(no devices)"
+    columns = list(rows[0])
+    widths = {c: max(len(c), *(len(str(r[c])) for r in rows)) for c in columns}
+    lines = ["  ".join(c.ljust(widths[c]) for c in columns)]
+    for row in rows:
+        lines.append("  ".join(str(row[c]).ljust(widths[c]) for c in columns))
+    return "\n".join(lines)
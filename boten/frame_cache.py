@@ -0,0 +1,62 @@
+from __future__ import annotations
+from typing import Callable, Dict, Optional, Tuple
+
+from .protocol import TextCodec
+
+
+def format_language_text(display_name: str, color: str) -> str:
+    # "English (United States)" + "Red" → "Red:Eng (United States)"
+    idx = display_name.find(" ")
+    if idx != -1:
+        return color + ":" + display_name[:3] + display_name[idx:]
+    return display_name[:3]
+
+
+class FrameCache:
+    """
+    (codec version, LANGID) → (message text, encoded outbound frame), built on first use.
+    - display_name(lang_id) is the locale backend ("" when unknown); color_of(lang_id) the color lookup.
+    - invalidate() when the installed-language set or color mapping changes.
+    - get() encodes with the default codec (set_codec()) unless one is passed, so devices
+      speaking different protocol versions share the cache.
+    """
+
+    def __init__(
+        self,
+        display_name: Callable[[int], str],
+        color_of: Callable[[int], str],
+        codec=None,
+    ) -> None:
+        self.display_name = display_name
+        self.color_of = color_of
+        self.codec = codec or TextCodec()
+        self._frames: Dict[Tuple[int, int], Tuple[str, bytes]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def set_codec(self, codec) -> None:
+        self.codec = codec
+
+    def invalidate(self) -> None:
+        self._frames.clear()
+
+    def get(self, lang_id: int, codec=None) -> Tuple[str, bytes]:
+        codec = codec or self.codec
+        key = (codec.version, lang_id)
+        frame = self._frames.get(key)
+        if frame is not None:
+            self.hits += 1
+            return frame
+        self.misses += 1
+        frame = self._build(lang_id, codec)
+        self._frames[key] = frame
+        return frame
+
+    def _build(self, lang_id: int, codec) -> Tuple[str, bytes]:
+        name = self.display_name(lang_id)
+        color: Optional[str] = None
+        text = ""
+        if name:
+            color = self.color_of(lang_id)
+            text = format_language_text(name, color)
+        return text, codec.language(lang_id, color, text)
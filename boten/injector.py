@@ -0,0 +1,90 @@
+from __future__ import annotations
+import threading
+import time
+from typing import Callable, Optional
+
+from .instrumentation import metrics
+from .log import log
+
+# Pause between presses within one burst, so the OS registers each hotkey separately
+INJECT_GAP = 0.03
+
+
+class ToggleInjector:
+    """
+    Presses the layout hotkey on its own thread so the monitor loop never sleeps on input injection.
+    - request() is non-blocking and only adds to the pending toggle count.
+    - The worker takes everything pending as one burst and presses N mod layout_count() times:
+      cycling through all installed layouts is a no-op, so it is skipped.
+    """
+
+    def __init__(self, press: Callable[[], None], layout_count: Callable[[], int], gap: float = INJECT_GAP) -> None:
+        self._press = press
+        self._layout_count = layout_count
+        self.gap = gap
+        self._cond = threading.Condition()
+        self._pending = 0
+        self._busy = False
+        self._stop = False
+        self._thread: Optional[threading.Thread] = None
+        self.requested = 0
+        self.pressed = 0
+        self.bursts = 0
+        self.error: Optional[BaseException] = None
+
+    def start(self) -> None:
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._stop = False
+            self._thread = threading.Thread(target=self._run, name="toggle-injector", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stop = True
+            self._cond.notify()
+            thread, self._thread = self._thread, None
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=1)
+
+    def request(self, count: int = 1) -> None:
+        # Started on first use, so importing or constructing this has no side effects
+        if self._thread is None:
+            self.start()
+        with self._cond:
+            self._pending += count
+            self.requested += count
+            self._cond.notify()
+
+    def idle(self) -> bool:
+        # True when nothing is pending or being pressed
+        with self._cond:
+            return self._pending == 0 and not self._busy
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                self._busy = False
+                self._cond.wait_for(lambda: self._pending or self._stop)
+                if self._stop:
+                    return
+                burst, self._pending = self._pending, 0
+                self._busy = True
+            layouts = self._layout_count()
+            presses = burst % layouts if layouts > 0 else burst
+            self.bursts += 1
+            metrics.count("inject.requested", burst)
+            metrics.count("inject.coalesced", burst - presses)
+            for i in range(presses):
+                if i:
+                    time.sleep(self.gap)
+                started = time.perf_counter()
+                try:
+                    self._press()
+                except Exception as e:
+                    log.error("Toggle injection failed - %s", e)
+                    self.error = e
+                    break
+                self.pressed += 1
+                metrics.observe("inject.press", time.perf_counter() - started)
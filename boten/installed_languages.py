@@ -0,0 +1,56 @@
+from __future__ import annotations
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+
+class InstalledLanguages:
+    """
+    In-memory view of the installed keyboard layouts, diffed on every poll.
+    - poll() makes one layout-list call and returns (added, removed) LANGID sets;
+      display names are resolved only for added LANGIDs.
+    - mark_changed() (any thread, e.g. an OS settings-change signal) asks the owner to poll now;
+      on_change, if set, is called so the owner wakes up for it.
+    """
+
+    def __init__(self, list_langids: Callable[[], Iterable[int]], display_name: Callable[[int], str]) -> None:
+        self._list_langids = list_langids
+        self._display_name = display_name
+        self._installed: Set[int] = set()
+        self._order: List[int] = []  # _installed in the order the OS lists (and cycles) them
+        self.names: Dict[int, str] = {}  # installed LANGIDs that have a display name
+        self.changed = threading.Event()
+        self.on_change: Optional[Callable[[], None]] = None
+        self.polls = 0
+
+    def mark_changed(self) -> None:
+        self.changed.set()
+        if self.on_change is not None:
+            self.on_change()
+
+    def poll(self) -> Tuple[Set[int], Set[int]]:
+        self.changed.clear()
+        self.polls += 1
+        order = list(dict.fromkeys(self._list_langids()))
+        current = set(order)
+        added = current - self._installed
+        removed = self._installed - current
+        # A reorder alone (e.g. in the language settings) changes the cycle but not the file
+        self._order = order
+        if not (added or removed):
+            return added, removed
+        self._installed = current
+        for lcid in removed:
+            self.names.pop(lcid, None)
+        for lcid in added:
+            name = self._display_name(lcid)
+            if name:
+                self.names[lcid] = name
+        return added, removed
+
+    def installed(self) -> List[int]:
+        # Every installed LANGID as of the last poll, named or not, in OS order
+        return list(self._order)
+
+    def langids(self) -> List[int]:
+        # Named installed LANGIDs in file order
+        return sorted(self.names)
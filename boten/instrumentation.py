@@ -0,0 +1,143 @@
+from __future__ import annotations
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Optional
+
+from .atomic_file import atomic_write
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+# Bucket i counts durations below 2**i microseconds; the last bucket also takes everything longer
+HISTOGRAM_BUCKETS = 24
+SNAPSHOT_INTERVAL = 10.0
+# serve() listens on 127.0.0.1:METRICS_PORT
+METRICS_PORT = int(os.environ.get("BOTEN_METRICS_PORT", "47800"))
+
+
+class Histogram:
+    """Fixed-size log2 histogram of durations; observe() is a few integer ops."""
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self) -> None:
+        self.counts = [0] * HISTOGRAM_BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        index = int(seconds * 1_000_000).bit_length()
+        if index >= HISTOGRAM_BUCKETS:
+            index = HISTOGRAM_BUCKETS - 1
+        self.counts[index] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, pct: float) -> float:
+        # Upper bound of the bucket holding the pct-th observation, in seconds
+        if not self.count:
+            return 0.0
+        rank = pct / 100 * self.count
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return min((1 << index) / 1_000_000, self.max)
+        return self.max
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "count": self.count,
+            "sum_ms": round(self.total * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+            "p50_ms": round(self.percentile(50) * 1000, 3),
+            "p99_ms": round(self.percentile(99) * 1000, 3),
+            "buckets_us": {f"<{1 << i}": n for i, n in enumerate(self.counts) if n},
+        }
+
+
+class Instrumentation:
+    """
+    Process-wide counters and duration histograms.
+    Everything is a no-op while `enabled` is False; call sites that would otherwise pay
+    for perf_counter() check `metrics.enabled` first.
+    Updates are not locked: a racing increment from another thread may be lost, which is
+    acceptable for monitoring data.
+    """
+
+    def __init__(self, enabled: bool = False) -> None:
+        self.enabled = enabled
+        self.started = time.time()
+        self.counters: Dict[str, int] = {}
+        self.histograms: Dict[str, Histogram] = {}
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def count(self, name: str, n: int = 1) -> None:
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def observe(self, name: str, seconds: float) -> None:
+        if self.enabled:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(seconds)
+
+    def reset(self) -> None:
+        self.started = time.time()
+        self.counters = {}
+        self.histograms = {}
+
+    def snapshot(self) -> Dict[str, object]:
+        return {
+            "enabled": self.enabled,
+            "started": self.started,
+            "time": time.time(),
+            "counters": dict(sorted(self.counters.items())),
+            "histograms": {name: h.to_dict() for name, h in sorted(self.histograms.items())},
+        }
+
+    def write_snapshot(self, path: Path) -> None:
+        atomic_write(path, json.dumps(self.snapshot(), indent=2))
+
+    def serve(self, port: int = METRICS_PORT) -> int:
+        # GET / on 127.0.0.1:<port> returns the current snapshot; returns the bound port
+        if self._server is not None:
+            return self._server.server_address[1]
+        # Only imported when the endpoint is enabled
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        instrumentation = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                body = json.dumps(instrumentation.snapshot(), indent=2).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args) -> None:
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="metrics-endpoint", daemon=True).start()
+        return self._server.server_address[1]
+
+    def shutdown(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+# Shared by every module; main switches it on with BOTEN_METRICS=1
+metrics = Instrumentation(enabled=os.environ.get("BOTEN_METRICS") == "1")
@@ -0,0 +1,375 @@
+"""
+Local query/subscribe API for other tools (tray icon, overlay, second indicator).
+
+Newline-delimited JSON over a Unix socket (a named pipe on Windows). A client sends one request line:
+- "state": the server answers with the current state line; further requests may follow.
+- "subscribe": the current state line, then one line per change until either side closes.
+State lines look like {"seq": 3, "langid": 1037, "color": "White", "text": "White:Heb (Israel)", ...}.
+
+    python -m boten.ipc               # print the current state
+    python -m boten.ipc --subscribe   # stream changes
+"""
+from __future__ import annotations
+import json
+import os
+import sys
+import threading
+from collections import deque
+from pathlib import Path
+from typing import Deque, Dict, Iterator, List, Optional
+
+from .instrumentation import metrics
+
+SOCKET_NAME = "boten.sock"
+# Pipe names are machine-wide, so the default one gets the user and logon session appended
+PIPE_NAME = r"\\.\pipe\boten"
+# Events buffered per subscriber; a client this far behind is dropped instead of slowing the loop
+SUBSCRIBER_QUEUE = 64
+MAX_REQUEST_BYTES = 1024
+
+
+def encode_state(state: Dict[str, object]) -> bytes:
+    return (json.dumps(state, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+class IpcServer:
+    """
+    Transport-independent part of the API: the current state line and change publishing.
+    - publish() encodes each change once; every subscriber queues the same bytes object.
+    - Identical consecutive states (e.g. a resend after reconnect) are not republished.
+    - Subclasses implement start(), stop() and _broadcast().
+    """
+
+    def __init__(self, path: str, queue_size: int = SUBSCRIBER_QUEUE) -> None:
+        self.path = path
+        self.queue_size = queue_size
+        self._last: Optional[Dict[str, object]] = None
+        self._state = encode_state({"seq": 0})
+        self.published = 0
+        self.dropped = 0
+
+    def start(self) -> None:
+        raise NotImplementedError
+
+    def stop(self) -> None:
+        raise NotImplementedError
+
+    @property
+    def subscribers(self) -> int:
+        raise NotImplementedError
+
+    def state(self) -> bytes:
+        return self._state
+
+    def publish(self, state: Dict[str, object]) -> bool:
+        # Called from the monitor loop: never blocks on clients
+        if state == self._last:
+            return False
+        self._last = dict(state)
+        self.published += 1
+        data = encode_state({"seq": self.published, **state})
+        self._state = data
+        self._broadcast(data)
+        return True
+
+    def _broadcast(self, data: bytes) -> None:
+        raise NotImplementedError
+
+    def _request(self, line: bytes) -> Optional[bytes]:
+        # Reply to one request line; None for "subscribe", which the transport handles
+        request = line.strip().decode("utf-8", errors="replace")
+        if request == "state":
+            return self._state
+        if request == "subscribe":
+            return None
+        return encode_state({"error": f"unknown request: {request[:32]}"})
+
+
+class _Client:
+    __slots__ = ("sock", "inbuf", "queue", "offset", "subscribed", "writing")
+
+    def __init__(self, sock) -> None:
+        self.sock = sock
+        self.inbuf = bytearray()
+        self.queue: Deque[bytes] = deque()
+        self.offset = 0  # bytes of queue[0] already sent
+        self.subscribed = False
+        self.writing = False  # registered for EVENT_WRITE
+
+
+class UnixIpcServer(IpcServer):
+    """
+    One selector thread serves every client over non-blocking sockets.
+    publish() only hands the encoded event to that thread through a wakeup socket;
+    the thread appends it to each subscriber's bounded queue and sends what the socket accepts.
+    """
+
+    def __init__(self, path: str, queue_size: int = SUBSCRIBER_QUEUE) -> None:
+        super().__init__(path, queue_size)
+        self._lock = threading.Lock()
+        self._pending: List[bytes] = []
+        self._clients: Dict[int, _Client] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._stop = False
+
+    @property
+    def subscribers(self) -> int:
+        return sum(1 for client in list(self._clients.values()) if client.subscribed)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        # Only imported when the API is served
+        import selectors
+        import socket
+
+        if os.path.exists(self.path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.path)
+            except OSError:
+                os.unlink(self.path)  # left over from a process that did not shut down cleanly
+            else:
+                raise OSError(f"{self.path} is served by another monitor")
+            finally:
+                probe.close()
+        # The default socket lives in DATA_DIR, which nothing may have created yet on a first run
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(self.path)
+        os.chmod(self.path, 0o600)  # current user only
+        listener.listen(16)
+        listener.setblocking(False)
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._wake_w.setblocking(False)
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(listener, selectors.EVENT_READ, "listen")
+        self._selector.register(self._wake_r, selectors.EVENT_READ, "wake")
+        self._listener = listener
+        self._stop = False
+        self._thread = threading.Thread(target=self._run, name="ipc-server", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._stop = True
+        self._wake()
+        thread.join(timeout=1)
+        for client in list(self._clients.values()):
+            client.sock.close()
+        self._clients.clear()
+        self._selector.close()
+        self._listener.close()
+        self._wake_r.close()
+        self._wake_w.close()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    def _wake(self) -> None:
+        try:
+            self._wake_w.send(b"\0")
+        except (BlockingIOError, OSError):
+            pass  # already woken (buffer full) or shutting down
+
+    def _broadcast(self, data: bytes) -> None:
+        if self._thread is None:
+            return
+        with self._lock:
+            first = not self._pending
+            self._pending.append(data)
+        if first:
+            self._wake()
+
+    def _run(self) -> None:
+        import selectors
+
+        while not self._stop:
+            for key, mask in self._selector.select():
+                if key.data == "listen":
+                    self._accept()
+                elif key.data == "wake":
+                    self._drain_wake()
+                else:
+                    client = self._clients.get(key.fd)
+                    if client is None:
+                        continue
+                    if mask & selectors.EVENT_READ:
+                        self._read(client)
+                    if mask & selectors.EVENT_WRITE and key.fd in self._clients:
+                        self._flush(client)
+
+    def _accept(self) -> None:
+        import selectors
+
+        try:
+            sock, _ = self._listener.accept()
+        except (BlockingIOError, OSError):
+            return
+        sock.setblocking(False)
+        client = _Client(sock)
+        self._clients[sock.fileno()] = client
+        self._selector.register(sock, selectors.EVENT_READ, "client")
+
+    def _drain_wake(self) -> None:
+        try:
+            while self._wake_r.recv(4096):
+                pass
+        except (BlockingIOError, OSError):
+            pass
+        with self._lock:
+            pending, self._pending = self._pending, []
+        for data in pending:
+            for client in list(self._clients.values()):
+                if client.subscribed:
+                    self._enqueue(client, data)
+        for client in list(self._clients.values()):
+            if client.queue:
+                self._flush(client)
+
+    def _enqueue(self, client: _Client, data: bytes) -> None:
+        if len(client.queue) >= self.queue_size:
+            self.dropped += 1
+            metrics.count("ipc.dropped")
+            self._close(client)
+            return
+        client.queue.append(data)
+
+    def _read(self, client: _Client) -> None:
+        try:
+            data = client.sock.recv(4096)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b""
+        if not data:
+            self._close(client)
+            return
+        client.inbuf += data
+        while b"\n" in client.inbuf:
+            line, _, rest = bytes(client.inbuf).partition(b"\n")
+            client.inbuf = bytearray(rest)
+            reply = self._request(line)
+            if reply is None:
+                client.subscribed = True
+                reply = self._state
+            self._enqueue(client, reply)
+            if client.sock.fileno() < 0:
+                return  # dropped for flooding requests without reading replies
+        if len(client.inbuf) > MAX_REQUEST_BYTES:
+            self._close(client)
+            return
+        if client.queue and client.sock.fileno() in self._clients:
+            self._flush(client)
+
+    def _flush(self, client: _Client) -> None:
+        import selectors
+
+        while client.queue:
+            head = client.queue[0]
+            try:
+                sent = client.sock.send(memoryview(head)[client.offset:])
+            except BlockingIOError:
+                break
+            except OSError:
+                self._close(client)
+                return
+            client.offset += sent
+            if client.offset < len(head):
+                break
+            client.queue.popleft()
+            client.offset = 0
+        # Only ask for writability while something is left to send
+        writing = bool(client.queue)
+        if writing != client.writing:
+            client.writing = writing
+            events = selectors.EVENT_READ | (selectors.EVENT_WRITE if writing else 0)
+            self._selector.modify(client.sock, events, "client")
+
+    def _close(self, client: _Client) -> None:
+        fd = client.sock.fileno()
+        if self._clients.pop(fd, None) is None:
+            return
+        try:
+            self._selector.unregister(client.sock)
+        except (KeyError, ValueError):
+            pass
+        client.sock.close()
+
+
+def _logon_session() -> str:
+    # "<user>-<session id>": fast user switching and RDP sessions each get their own monitor
+    import ctypes
+    import getpass
+
+    session = ctypes.c_ulong(0)
+    ctypes.windll.kernel32.ProcessIdToSessionId(os.getpid(), ctypes.byref(session))
+    return f"{getpass.getuser()}-{session.value}".replace("\\", "-")
+
+
+def default_ipc_path(data_dir: Path) -> str:
+    if sys.platform == "win32":
+        return f"{PIPE_NAME}-{_logon_session()}"
+    return str(data_dir / SOCKET_NAME)
+
+
+def create_ipc_server(path: str) -> IpcServer:
+    if sys.platform == "win32":
+        # Imported here so pywin32 is only loaded on Windows
+        from .windows import PipeIpcServer
+        return PipeIpcServer(path)
+    return UnixIpcServer(path)
+
+
+def _connect(path: str):
+    # A binary file object for the socket or pipe at `path`
+    if sys.platform == "win32":
+        return open(path, "r+b", buffering=0)
+    import socket
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.connect(path)
+    return sock.makefile("rwb", buffering=0)
+
+
+def query_state(path: str) -> Dict[str, object]:
+    with _connect(path) as conn:
+        conn.write(b"state\n")
+        return json.loads(conn.readline())
+
+
+def subscribe(path: str) -> Iterator[Dict[str, object]]:
+    # Current state first, then every change; ends when the monitor closes the connection
+    with _connect(path) as conn:
+        conn.write(b"subscribe\n")
+        for line in iter(conn.readline, b""):
+            yield json.loads(line)
+
+
+def main_cli(argv: Optional[List[str]] = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--path", help="socket or pipe (default: the monitor's)")
+    parser.add_argument("--subscribe", action="store_true", help="stream changes until interrupted")
+    args = parser.parse_args(argv)
+    home = Path(os.environ.get("BOTEN_HOME") or Path.home() / "Boten")
+    path = args.path or default_ipc_path(home)
+    try:
+        if args.subscribe:
+            for state in subscribe(path):
+                print(json.dumps(state, ensure_ascii=False), flush=True)
+        else:
+            print(json.dumps(query_state(path), ensure_ascii=False))
+    except (ConnectionError, FileNotFoundError) as e:
+        print(f"Monitor not reachable at {path} - {e}", file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,117 @@
+"""
+Compact LANGID → label table compiled from language_map.LANGUAGE_MAP.
+
+Regenerate langid_table.bin after editing language_map.py:
+
+    python -m boten.langid_table
+"""
+from __future__ import annotations
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+TABLE_PATH = Path(__file__).with_name("langid_table.bin")
+# magic, format version, entry count
+TABLE_HEADER = struct.Struct("<4sHH")
+TABLE_MAGIC = b"LGID"
+TABLE_VERSION = 1
+
+
+def compile_table(mapping: Dict[int, str]) -> bytes:
+    # Header, sorted uint16 keys, count+1 uint16 offsets into the label blob, the UTF-8 blob itself
+    keys = array("H", sorted(mapping))
+    offsets = array("H", [0])
+    blob = bytearray()
+    for key in keys:
+        blob += mapping[key].encode("utf-8")
+        offsets.append(len(blob))
+    if sys.byteorder != "little":
+        keys.byteswap()
+        offsets.byteswap()
+    return TABLE_HEADER.pack(TABLE_MAGIC, TABLE_VERSION, len(keys)) + keys.tobytes() + offsets.tobytes() + bytes(blob)
+
+
+class LangIdTable:
+    """
+    Read-only view over a compiled table: a binary search over array('H') keys,
+    then one slice of the label blob. No per-entry Python objects are kept.
+    """
+
+    def __init__(self, data: bytes) -> None:
+        magic, version, count = TABLE_HEADER.unpack_from(data)
+        if magic != TABLE_MAGIC or version != TABLE_VERSION:
+            raise ValueError("not a LANGID table")
+        start = TABLE_HEADER.size
+        self.keys = array("H", data[start:start + 2 * count])
+        start += 2 * count
+        self.offsets = array("H", data[start:start + 2 * (count + 1)])
+        start += 2 * (count + 1)
+        if sys.byteorder != "little":
+            self.keys.byteswap()
+            self.offsets.byteswap()
+        self.blob = data[start:]
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __contains__(self, lang_id: int) -> bool:
+        index = bisect_left(self.keys, lang_id)
+        return index < len(self.keys) and self.keys[index] == lang_id
+
+    @property
+    def nbytes(self) -> int:
+        return sys.getsizeof(self.keys) + sys.getsizeof(self.offsets) + sys.getsizeof(self.blob)
+
+    def label(self, lang_id: int) -> str:
+        # 'EN United States', "" if unknown
+        keys = self.keys
+        index = bisect_left(keys, lang_id)
+        if index == len(keys) or keys[index] != lang_id:
+            return ""
+        return self.blob[self.offsets[index]:self.offsets[index + 1]].decode("utf-8")
+
+    def display_name(self, lang_id: int) -> str:
+        # 'EN United States' → 'English (United States)', as GetLocaleInfoEx's LOCALE_SENGLISHDISPLAYNAME,
+        # so frame_cache.format_language_text gives the same text on both paths
+        code, _, country = self.label(lang_id).partition(" ")
+        languages, countries = _display_names()
+        lang = languages.get(code, code)
+        if not country:
+            return lang
+        return f"{lang} ({countries.get(country, country)})"
+
+
+_table: Optional[LangIdTable] = None
+_names: Optional[Tuple[Dict[str, str], Dict[str, str]]] = None
+
+
+def _display_names() -> Tuple[Dict[str, str], Dict[str, str]]:
+    # Only needed when the OS has no name for a LANGID, so language_map is imported on first use
+    global _names
+    if _names is None:
+        from .language_map import COUNTRY_NAMES, LANGUAGE_NAMES
+        _names = LANGUAGE_NAMES, COUNTRY_NAMES
+    return _names
+
+
+def langid_table() -> LangIdTable:
+    # Loaded on first use; compiled in memory from LANGUAGE_MAP if the .bin is missing or unreadable
+    global _table
+    if _table is None:
+        try:
+            _table = LangIdTable(TABLE_PATH.read_bytes())
+        except (OSError, ValueError, struct.error):
+            from .language_map import LANGUAGE_MAP
+            _table = LangIdTable(compile_table(LANGUAGE_MAP))
+    return _table
+
+
+if __name__ == "__main__":
+    from .language_map import LANGUAGE_MAP
+
+    data = compile_table(LANGUAGE_MAP)
+    TABLE_PATH.write_bytes(data)
+    print(f"{TABLE_PATH.name}: {len(LANGUAGE_MAP)} entries, {len(data)} bytes")
@@ -262,3 +262,163 @@ LANGUAGE_MAP = {
     0x580A: 'ES Latin America',
     0x5C0A: 'ES Cuba',
 }
+
+# Language code → English language name, as GetLocaleInfoEx(LOCALE_SENGLISHLANGUAGENAME) returns it;
+# langid_table.display_name() pairs it with the country part of a LANGUAGE_MAP value.
+LANGUAGE_NAMES = {
+    'AF': 'Afrikaans',
+    'AM': 'Amharic',
+    'AR': 'Arabic',
+    'ARN': 'Mapudungun',
+    'AS': 'Assamese',
+    'AZ': 'Azerbaijani',
+    'BA': 'Bashkir',
+    'BE': 'Belarusian',
+    'BG': 'Bulgarian',
+    'BIN': 'Edo',
+    'BN': 'Bangla',
+    'BO': 'Tibetan',
+    'BR': 'Breton',
+    'BS': 'Bosnian',
+    'CA': 'Catalan',
+    'CHR': 'Cherokee',
+    'CO': 'Corsican',
+    'CS': 'Czech',
+    'CY': 'Welsh',
+    'DA': 'Danish',
+    'DE': 'German',
+    'DSB': 'Lower Sorbian',
+    'DV': 'Divehi',
+    'DZ': 'Dzongkha',
+    'EL': 'Greek',
+    'EN': 'English',
+    'ES': 'Spanish',
+    'ET': 'Estonian',
+    'EU': 'Basque',
+    'FA': 'Persian',
+    'FF': 'Fulah',
+    'FI': 'Finnish',
+    'FIL': 'Filipino',
+    'FO': 'Faroese',
+    'FR': 'French',
+    'FY': 'Western Frisian',
+    'GA': 'Irish',
+    'GD': 'Scottish Gaelic',
+    'GL': 'Galician',
+    'GN': 'Guarani',
+    'GSW': 'Alsatian',
+    'GU': 'Gujarati',
+    'HA': 'Hausa',
+    'HAW': 'Hawaiian',
+    'HE': 'Hebrew',
+    'HI': 'Hindi',
+    'HR': 'Croatian',
+    'HSB': 'Upper Sorbian',
+    'HU': 'Hungarian',
+    'HY': 'Armenian',
+    'IBB': 'Ibibio',
+    'ID': 'Indonesian',
+    'IG': 'Igbo',
+    'II': 'Yi',
+    'IS': 'Icelandic',
+    'IT': 'Italian',
+    'IU': 'Inuktitut',
+    'JA': 'Japanese',
+    'KA': 'Georgian',
+    'KK': 'Kazakh',
+    'KL': 'Greenlandic',
+    'KM': 'Khmer',
+    'KN': 'Kannada',
+    'KO': 'Korean',
+    'KOK': 'Konkani',
+    'KR': 'Kanuri',
+    'KS': 'Kashmiri',
+    'KU': 'Central Kurdish',
+    'KY': 'Kyrgyz',
+    'LA': 'Latin',
+    'LB': 'Luxembourgish',
+    'LO': 'Lao',
+    'LT': 'Lithuanian',
+    'LV': 'Latvian',
+    'MI': 'Maori',
+    'MK': 'Macedonian',
+    'ML': 'Malayalam',
+    'MN': 'Mongolian',
+    'MNI': 'Manipuri',
+    'MOH': 'Mohawk',
+    'MR': 'Marathi',
+    'MS': 'Malay',
+    'MT': 'Maltese',
+    'MY': 'Burmese',
+    'NB': 'Norwegian Bokmål',
+    'NE': 'Nepali',
+    'NL': 'Dutch',
+    'NN': 'Norwegian Nynorsk',
+    'NSO': 'Sesotho sa Leboa',
+    'OC': 'Occitan',
+    'OM': 'Oromo',
+    'OR': 'Odia',
+    'PA': 'Punjabi',
+    'PAP': 'Papiamento',
+    'PL': 'Polish',
+    'PS': 'Pashto',
+    'PT': 'Portuguese',
+    'QUC': "K'iche'",
+    'QUZ': 'Quechua',
+    'RM': 'Romansh',
+    'RO': 'Romanian',
+    'RU': 'Russian',
+    'RW': 'Kinyarwanda',
+    'SA': 'Sanskrit',
+    'SAH': 'Sakha',
+    'SD': 'Sindhi',
+    'SE': 'Northern Sami',
+    'SI': 'Sinhala',
+    'SK': 'Slovak',
+    'SL': 'Slovenian',
+    'SMA': 'Southern Sami',
+    'SMJ': 'Lule Sami',
+    'SMN': 'Inari Sami',
+    'SMS': 'Skolt Sami',
+    'SO': 'Somali',
+    'SQ': 'Albanian',
+    'SR': 'Serbian',
+    'ST': 'Sesotho',
+    'SV': 'Swedish',
+    'SW': 'Kiswahili',
+    'SYR': 'Syriac',
+    'TA': 'Tamil',
+    'TE': 'Telugu',
+    'TG': 'Tajik',
+    'TH': 'Thai',
+    'TI': 'Tigrinya',
+    'TK': 'Turkmen',
+    'TN': 'Setswana',
+    'TR': 'Turkish',
+    'TS': 'Xitsonga',
+    'TT': 'Tatar',
+    'TZM': 'Central Atlas Tamazight',
+    'UG': 'Uyghur',
+    'UK': 'Ukrainian',
+    'UR': 'Urdu',
+    'UZ': 'Uzbek',
+    'VE': 'Venda',
+    'VI': 'Vietnamese',
+    'WO': 'Wolof',
+    'XH': 'isiXhosa',
+    'YI': 'Yiddish',
+    'YO': 'Yoruba',
+    'ZH': 'Chinese',
+    'ZU': 'isiZulu',
+}
+
+# Country parts cut short by the 16-character limit above, in full for display names
+COUNTRY_NAMES = {
+    'North Macedon': 'North Macedonia',
+    'United Kingdo': 'United Kingdom',
+    'United State': 'United States',
+    'Bosnia & Herz': 'Bosnia & Herzegovina',
+    'Dominican Rep': 'Dominican Republic',
+    'Trinidad & To': 'Trinidad & Tobago',
+    'United Arab E': 'United Arab Emirates',
+}
@@ -0,0 +1,97 @@
+from __future__ import annotations
+import sys
+import threading
+import time
+from typing import Callable, List, Optional
+
+from .trace import recorder
+
+
+class LanguageSource:
+    """
+    Reports the active keyboard LANGID and wakes the consumer only when it changes.
+    - Producers call _publish() from any thread.
+    - The consumer calls wait(timeout) and gets the new LANGID, or None when idle.
+    - subscribe(callback) is called on every change (and resend()), so a consumer can block
+      on one wakeup shared with its other event sources instead of polling wait(0).
+    - signals_layout_changes is True when the source reports installed-layout changes itself.
+    """
+
+    signals_layout_changes = False
+
+    def __init__(self) -> None:
+        self._changed = threading.Event()
+        self._lock = threading.Lock()
+        self._langid: Optional[int] = None
+        self.changed_at = 0.0  # perf_counter() of the last published change
+        self.wakeups = 0       # number of changes handed to the consumer
+        self._listeners: List[Callable[[], None]] = []
+
+    def start(self) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+    def subscribe(self, callback: Callable[[], None]) -> None:
+        self._listeners.append(callback)
+
+    def _notify(self) -> None:
+        for callback in self._listeners:
+            callback()
+
+    def current(self) -> Optional[int]:
+        return self._langid
+
+    def wait(self, timeout: float = 0.0) -> Optional[int]:
+        # timeout == 0 is a non-blocking check of the change flag
+        if not self._changed.wait(timeout):
+            return None
+        with self._lock:
+            self._changed.clear()
+            langid = self._langid
+        self.wakeups += 1
+        return langid
+
+    def resend(self) -> None:
+        # Force the next wait() to report the current LANGID again (e.g. after a serial error)
+        if self._langid is not None:
+            self._changed.set()
+            self._notify()
+
+    def assume(self, langid: int) -> None:
+        # Optimistic update after requesting a layout switch; the next real sample confirms or corrects it
+        self._publish(langid)
+
+    def _publish(self, langid: int) -> None:
+        with self._lock:
+            if langid == self._langid:
+                return
+            self._langid = langid
+            self.changed_at = time.perf_counter()
+            self._changed.set()
+        self._notify()
+        recorder.langid(langid)
+
+
+class FakeLanguageSource(LanguageSource):
+    """Deterministic source for tests and non-Windows hosts: changes only when told to."""
+
+    def __init__(self, initial: Optional[int] = None) -> None:
+        super().__init__()
+        if initial is not None:
+            self._publish(initial)
+
+    def set_langid(self, langid: int) -> None:
+        self._publish(langid)
+
+
+def create_language_source(
+    on_device_change: Optional[Callable[[], None]] = None,
+    on_layouts_change: Optional[Callable[[], None]] = None,
+) -> LanguageSource:
+    if sys.platform == "win32":
+        # Imported here so ctypes/pywin32 are only loaded on Windows
+        from .windows import WindowsLanguageSource
+        return WindowsLanguageSource(on_device_change, on_layouts_change)
+    return FakeLanguageSource()
@@ -0,0 +1,60 @@
+from __future__ import annotations
+import time
+from typing import Callable, Iterable, List, Optional
+
+from .instrumentation import metrics
+from .log import log
+
+
+class LayoutSwitcher:
+    """
+    Direct layout activation: a toggle or a "select layout K" command becomes one
+    activate(lang_id) call instead of a series of simulated Alt+Shift presses.
+    - Targets are positions in the installed LANGID list as the OS returns it (GetKeyboardLayoutList
+      order, duplicates dropped), which is the order the hotkey cycles in.
+    - activate() returns False when the backend cannot switch directly; the caller falls back to the hotkey.
+    """
+
+    def __init__(self, installed: Callable[[], Iterable[int]], activate: Callable[[int], bool]) -> None:
+        self._installed = installed
+        self._activate = activate
+        self.activations = 0
+        self.failures = 0
+
+    def layouts(self) -> List[int]:
+        return list(dict.fromkeys(self._installed()))
+
+    def target(self, current: Optional[int], steps: int = 1) -> Optional[int]:
+        # Layout `steps` positions after `current`; an unknown current layout counts as position -1
+        layouts = self.layouts()
+        if not layouts:
+            return None
+        index = layouts.index(current) if current in layouts else -1
+        return layouts[(index + steps) % len(layouts)]
+
+    def layout_at(self, index: int) -> Optional[int]:
+        layouts = self.layouts()
+        return layouts[index] if 0 <= index < len(layouts) else None
+
+    def steps_to(self, current: Optional[int], index: int) -> int:
+        # Hotkey presses needed to get from `current` to layout `index`
+        layouts = self.layouts()
+        if not 0 <= index < len(layouts):
+            return 0
+        position = layouts.index(current) if current in layouts else -1
+        return (index - position) % len(layouts)
+
+    def activate(self, lang_id: int) -> bool:
+        started = time.perf_counter()
+        try:
+            ok = self._activate(lang_id)
+        except Exception as e:
+            log.error("Layout activation failed - %s", e)
+            ok = False
+        if ok:
+            self.activations += 1
+            metrics.observe("switch.activate", time.perf_counter() - started)
+        else:
+            self.failures += 1
+            metrics.count("switch.failures")
+        return ok
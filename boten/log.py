@@ -0,0 +1,310 @@
+"""
+Leveled logging for the monitor, written off the loop thread.
+
+    from .log import log
+    log.info("Language changed to: %s", text)
+
+Lines look like "2026-01-31 12:00:00.123 INFO  Language changed to: ..." and go to stdout and,
+with BOTEN_LOG_FILE set, to a rotating file. BOTEN_LOG_LEVEL picks the level (default INFO;
+DEBUG adds every state machine transition).
+"""
+from __future__ import annotations
+import math
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from pathlib import Path
+from typing import Callable, Deque, List, Optional, Tuple
+
+from .instrumentation import metrics
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+LEVEL_NAMES = {DEBUG: "DEBUG", INFO: "INFO", WARNING: "WARN", ERROR: "ERROR"}
+LEVELS = {"DEBUG": DEBUG, "INFO": INFO, "WARN": WARNING, "WARNING": WARNING, "ERROR": ERROR}
+
+# Records waiting for the writer; when full, new records are dropped and counted instead of blocking
+LOG_QUEUE_SIZE = 4096
+# Identical lines allowed per REPEAT_WINDOW; the rest are counted and written once as "message ×N"
+REPEAT_LIMIT = 5
+REPEAT_WINDOW = 10.0
+# Distinct messages tracked for repeats; the oldest is forgotten first
+MAX_REPEAT_KEYS = 256
+# A rotating log file is renamed to .1 (.1 to .2, ...) when a write would take it past this
+LOG_FILE_MAX_BYTES = 1_000_000
+LOG_FILE_BACKUPS = 3
+
+
+def parse_level(name: str, default: int = INFO) -> int:
+    # "debug", "WARNING", "20", ...; anything else keeps the default
+    name = name.strip().upper()
+    if name.isdigit():
+        return int(name)
+    return LEVELS.get(name, default)
+
+
+class StreamSink:
+    """Writes to `stream`, or to whatever sys.stdout is at the time (so redirect_stdout works)."""
+
+    def __init__(self, stream=None) -> None:
+        self.stream = stream
+
+    def write(self, text: str) -> None:
+        stream = self.stream or sys.stdout
+        try:
+            stream.write(text)
+        except UnicodeEncodeError:
+            # Legacy console code pages cannot show every layout name (or "×")
+            encoding = getattr(stream, "encoding", None) or "ascii"
+            stream.write(text.encode(encoding, errors="replace").decode(encoding))
+        stream.flush()
+
+    def close(self) -> None:
+        pass
+
+
+class RotatingFileSink:
+    """UTF-8 log file, opened on first write and rotated at max_bytes, keeping `backups` old files."""
+
+    def __init__(self, path: Path, max_bytes: int = LOG_FILE_MAX_BYTES, backups: int = LOG_FILE_BACKUPS) -> None:
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.rotations = 0
+        self._file = None
+        self._size = 0
+
+    def _open(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._size = self._file.tell()
+
+    def _rotate(self) -> None:
+        self._file.close()
+        for i in range(self.backups - 1, 0, -1):
+            older = self.path.with_name(f"{self.path.name}.{i}")
+            if older.exists():
+                os.replace(older, self.path.with_name(f"{self.path.name}.{i + 1}"))
+        if self.backups > 0:
+            os.replace(self.path, self.path.with_name(f"{self.path.name}.1"))
+        else:
+            self.path.unlink()
+        self.rotations += 1
+        self._open()
+
+    def write(self, text: str) -> None:
+        if self._file is None:
+            self._open()
+        data = text.encode("utf-8")
+        if self._size and self._size + len(data) > self.max_bytes:
+            self._rotate()
+        self._file.write(text)
+        self._file.flush()
+        self._size += len(data)
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class Logger:
+    """
+    Log records are queued by the caller and formatted and written by one background thread,
+    so a slow console, pipe or disk never blocks the serial and language paths.
+    - debug()/info()/warning()/error() check the level and append (time, level, message, args);
+      "%" formatting happens on the writer thread.
+    - A message repeated more than REPEAT_LIMIT times within REPEAT_WINDOW is collapsed:
+      the extra copies become one "message ×N" line when the window closes or on flush().
+    - With background = False records are formatted and written on the caller's thread
+      (the synchronous baseline in bench.py).
+    """
+
+    def __init__(
+        self,
+        level: int = INFO,
+        sinks: Optional[List[object]] = None,
+        queue_size: int = LOG_QUEUE_SIZE,
+        repeat_limit: int = REPEAT_LIMIT,
+        repeat_window: float = REPEAT_WINDOW,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.level = level
+        self.sinks = [StreamSink()] if sinks is None else list(sinks)
+        self.queue_size = queue_size
+        self.repeat_limit = repeat_limit
+        self.repeat_window = repeat_window
+        self.background = True
+        self._clock = clock
+        self._queue: Deque[Tuple[float, int, str, tuple]] = deque()
+        self._wake = threading.Event()
+        self._idle = threading.Condition()
+        self._busy = False
+        self._stop = False
+        self._thread: Optional[threading.Thread] = None
+        self._write_lock = threading.Lock()
+        # (level, text) -> [window start, lines written in the window, collapsed count, last time]
+        self._repeats: "OrderedDict[Tuple[int, str], list]" = OrderedDict()
+        self.written = 0
+        self.collapsed = 0
+        self.dropped = 0
+        self.errors = 0
+
+    def start(self) -> None:
+        with self._idle:
+            if self._thread is not None:
+                return
+            self._stop = False
+            self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        # Writes everything queued and every pending "×N" line, then closes the sinks
+        with self._idle:
+            thread, self._thread = self._thread, None
+            self._stop = True
+        if thread is not None:
+            self._wake.set()
+            thread.join(timeout=2)
+        with self._write_lock:
+            self._drain()
+            self._expire(float("inf"))
+            for sink in self.sinks:
+                sink.close()
+
+    def enabled_for(self, level: int) -> bool:
+        return level >= self.level
+
+    def log(self, level: int, message: str, *args) -> None:
+        if level < self.level:
+            return
+        if not self.background:
+            with self._write_lock:
+                self._queue.append((self._clock(), level, message, args))
+                self._drain()
+            return
+        if len(self._queue) >= self.queue_size:
+            self.dropped += 1
+            metrics.count("log.dropped")
+            return
+        self._queue.append((self._clock(), level, message, args))
+        # Started on first use, so importing this has no side effects
+        if self._thread is None:
+            self.start()
+        self._wake.set()
+
+    def debug(self, message: str, *args) -> None:
+        self.log(DEBUG, message, *args)
+
+    def info(self, message: str, *args) -> None:
+        self.log(INFO, message, *args)
+
+    def warning(self, message: str, *args) -> None:
+        self.log(WARNING, message, *args)
+
+    def error(self, message: str, *args) -> None:
+        self.log(ERROR, message, *args)
+
+    def flush(self, timeout: float = 1.0) -> bool:
+        # Waits until everything queued so far has been written, then writes the pending "×N" lines,
+        # so none of them reaches whatever sys.stdout is later; False on timeout
+        written = not self._queue
+        if self._thread is not None:
+            self._wake.set()
+            with self._idle:
+                written = self._idle.wait_for(lambda: not self._queue and not self._busy, timeout)
+        with self._write_lock:
+            self._expire(math.inf)
+        return written
+
+    def _run(self) -> None:
+        while True:
+            # Woken per record; the timeout closes repeat windows while nothing is logged
+            self._wake.wait(1.0)
+            self._wake.clear()
+            with self._idle:
+                self._busy = True
+            with self._write_lock:
+                self._drain()
+                self._expire(self._clock())
+            with self._idle:
+                self._busy = False
+                self._idle.notify_all()
+                if self._stop and not self._queue:
+                    return
+
+    def _drain(self) -> None:
+        lines: List[str] = []
+        queue = self._queue
+        while queue:
+            created, level, message, args = queue.popleft()
+            text = self._format(message, args)
+            key = (level, text)
+            entry = self._repeats.get(key)
+            if entry is not None and created - entry[0] < self.repeat_window:
+                entry[3] = created
+                if entry[1] >= self.repeat_limit:
+                    entry[2] += 1
+                    self.collapsed += 1
+                    continue
+                entry[1] += 1
+            else:
+                if entry is not None:
+                    self._summarize(key, entry, lines)
+                self._repeats[key] = [created, 1, 0, created]
+                self._repeats.move_to_end(key)
+                if len(self._repeats) > MAX_REPEAT_KEYS:
+                    old_key, old_entry = self._repeats.popitem(last=False)
+                    self._summarize(old_key, old_entry, lines)
+            lines.append(self._line(created, level, text))
+        self._write(lines)
+
+    def _expire(self, now: float) -> None:
+        # Close repeat windows that ended; entries are in window-start order
+        lines: List[str] = []
+        while self._repeats:
+            key, entry = next(iter(self._repeats.items()))
+            if now - entry[0] < self.repeat_window:
+                break
+            del self._repeats[key]
+            self._summarize(key, entry, lines)
+        self._write(lines)
+
+    def _summarize(self, key: Tuple[int, str], entry: list, lines: List[str]) -> None:
+        if entry[2]:
+            level, text = key
+            lines.append(self._line(entry[3], level, f"{text} ×{entry[2]}"))
+
+    @staticmethod
+    def _format(message: str, args: tuple) -> str:
+        if not args:
+            return str(message)
+        try:
+            return message % args
+        except (TypeError, ValueError):
+            return " ".join([str(message), *map(str, args)])
+
+    @staticmethod
+    def _line(created: float, level: int, text: str) -> str:
+        stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(created))
+        return f"{stamp}.{int(created % 1 * 1000):03d} {LEVEL_NAMES.get(level, level):<5} {text}\n"
+
+    def _write(self, lines: List[str]) -> None:
+        if not lines:
+            return
+        text = "".join(lines)
+        for sink in self.sinks:
+            try:
+                sink.write(text)
+            except Exception:
+                # A broken console must not take the writer thread down
+                self.errors += 1
+        self.written += len(lines)
+
+
+# Shared by every module; main sets the level and adds the file sink
+log = Logger()
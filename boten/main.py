@@ -0,0 +1,653 @@
+from __future__ import annotations
+import os
+import threading
+import time
+
+from pathlib import Path
+from typing import Dict, Optional, List
+
+from .color_allocator import ColorAllocator, parse_palette
+from .atomic_file import atomic_write
+from .color_index import LANGUAGE_NOT_FOUND, LanguageColorIndex
+from .device_registry import DeviceRegistry
+from .reconnect import RECONNECT_POLL, ReconnectScheduler
+from .connection import ConnectionManager
+from .fanout import DeviceHub, format_health_table
+from .write_scheduler import KEEP_ALIVE, LANGUAGE
+from .frame_cache import FrameCache
+from .injector import ToggleInjector
+from .installed_languages import InstalledLanguages
+from .instrumentation import METRICS_PORT, SNAPSHOT_INTERVAL, metrics
+from .ipc import IpcServer, create_ipc_server, default_ipc_path
+from .langid_table import langid_table
+from .layout_switch import LayoutSwitcher
+from .log import INFO, RotatingFileSink, log, parse_level
+from .language_source import LanguageSource, create_language_source
+from .os_backend import LOCALE_SENGLISHDISPLAYNAME, LOCALE_SNAME, OsBackend, create_backend
+from .protocol import TEXT_TOGGLE, TextCodec, negotiate, parse_select_layout
+from .trace import TracedPort, recorder
+from .wakeup import Wakeup
+
+
+# State machine:
+NONE = 1
+INITIALIZE = 2
+GET_LANG_STATE = 3
+SEND_SERIAL_TO_ARDUINO = 4
+GET_PORT_STATE_AND_ESTABLISH = 5
+ERROR_STATE = 10
+
+STATE_NAMES = {
+    INITIALIZE: "INITIALIZE",
+    GET_LANG_STATE: "GET_LANG_STATE",
+    SEND_SERIAL_TO_ARDUINO: "SEND_SERIAL_TO_ARDUINO",
+    GET_PORT_STATE_AND_ESTABLISH: "GET_PORT_STATE_AND_ESTABLISH",
+}
+
+# Serial port definitions
+BAUD_RATE = 9600
+ARDUINO_PORT_DESCRIPTION = "USB-SERIAL CH340"
+SERIAL_TIMEOUT = 0.01
+KEEP_ALIVE_TIMER = 1
+LANG_MAPPING_CHANGE_TIMER = 5
+# Safety-net interval when the language source signals layout-list changes itself
+LANG_MAPPING_FALLBACK_TIMER = 60
+
+# "loop" runs the original state machine, "async" the task-based engine
+ENGINE_MODE = os.environ.get("BOTEN_ENGINE", "loop")
+# "text" keeps the line protocol, "binary" offers the binary protocol in a handshake
+WIRE_PROTOCOL = os.environ.get("BOTEN_PROTOCOL", "text")
+# "os" asks the OS for locale names (compiled table as fallback), "table" never makes an OS call
+LABEL_SOURCE = os.environ.get("BOTEN_LABELS", "os")
+# "hotkey" cycles layouts with simulated Alt+Shift, "direct" activates the target layout itself
+TOGGLE_MODE = os.environ.get("BOTEN_TOGGLE", "hotkey")
+
+# BOTEN_HOME relocates the data files (benchmarks and simulations use a temporary directory)
+DATA_DIR = Path(os.environ.get("BOTEN_HOME") or Path.home() / "Boten")
+# OUTPUT_PATH = Path("installed_languages.txt")  # Allocation mapping fIle name
+OUTPUT_PATH = DATA_DIR / "installed_languages.txt"  # Allocation mapping fIle name
+STATE_PATH = DATA_DIR / "color_allocations.json"
+# Periodic instrumentation snapshot (BOTEN_METRICS=1); also served on 127.0.0.1:BOTEN_METRICS_PORT
+METRICS_PATH = DATA_DIR / "metrics.json"
+# Binary record of serial traffic and language events for replay.py; off unless set
+TRACE_PATH = os.environ.get("BOTEN_TRACE")
+# Local query/subscribe API for other tools (see ipc.py); BOTEN_IPC=0 turns it off
+IPC_ENABLED = os.environ.get("BOTEN_IPC", "1") != "0"
+IPC_PATH = os.environ.get("BOTEN_IPC_PATH") or default_ipc_path(DATA_DIR)
+# DEBUG adds every state machine transition; BOTEN_LOG_FILE also writes a rotating log file
+LOG_LEVEL = parse_level(os.environ.get("BOTEN_LOG_LEVEL", "INFO"))
+LOG_PATH = os.environ.get("BOTEN_LOG_FILE")
+
+log.level = LOG_LEVEL
+if LOG_PATH:
+    log.sinks.append(RotatingFileSink(Path(LOG_PATH)))
+
+# LANGID → color view of OUTPUT_PATH, so hot-loop lookups do no file I/O
+language_color_index = LanguageColorIndex(OUTPUT_PATH)
+
+# Matching serial devices, re-enumerated on TTL expiry or hotplug only
+port_registry = DeviceRegistry(ARDUINO_PORT_DESCRIPTION)
+
+# Paces connect attempts with backoff; a matching port appearing makes the next one immediate
+reconnect = ReconnectScheduler()
+port_registry.subscribe(lambda ports: reconnect.wake())
+
+# The idle monitor loop blocks here; language changes, inbound commands, device failures,
+# hotplug and layout-list changes set it, and its timeout is the loop's next timer
+loop_wakeup = Wakeup()
+port_registry.on_hotplug(loop_wakeup.set)
+
+# Keyboard/locale/input calls: WinAPI on Windows, an in-memory fake elsewhere
+os_backend: OsBackend = create_backend()
+
+# Configuration
+DEFAULT_COLOR_POOL: List[str] = ["Red", "Green", "Blue", "White", "Cyan", "Yellow", "Magenta"]
+# BOTEN_PALETTE: comma-separated colors ("#FF8000,..." for RGB LEDs) or "rgb:<n>" for n generated hues
+COLOR_POOL: List[str] = parse_palette(os.environ.get("BOTEN_PALETTE", ""), DEFAULT_COLOR_POOL)
+
+# In-memory id→color mapping persisted write-behind to STATE_PATH
+color_allocator = ColorAllocator(STATE_PATH, COLOR_POOL)
+
+def allocate_color(identifier) -> Optional[str]:
+    return color_allocator.allocate(identifier)
+
+def release_color(identifier) -> bool:
+    return color_allocator.release(identifier)
+
+def _get_locale_info_ex(locale_name: str, field: int) -> str:
+    return os_backend.locale_info(locale_name, field)
+
+def _lcid_to_locale_name(lcid: int) -> str:
+    return os_backend.lcid_to_locale_name(lcid)
+
+def _installed_langids() -> list[int]:
+    return os_backend.installed_langids()
+
+def language_color_allocation(lcid: int):
+    # Retrieve the allocated color from file - keep Language color for-ever
+    language_color = retrieve_saved_language_color(lcid)
+    if language_color == LANGUAGE_NOT_FOUND:
+        allocated_new_color = allocate_color(lcid)
+        language_color = allocated_new_color
+        log.info("--- Allocate new color = %s", allocated_new_color)
+
+    return language_color
+
+def _installed_display_name(lcid: int) -> str:
+    # English display name written to the mapping file, "" to leave the LANGID out
+    if LABEL_SOURCE == "table":
+        return langid_table().display_name(lcid)
+    name = _lcid_to_locale_name(lcid)
+    eng_display = ""
+    if name:
+        eng_display = _get_locale_info_ex(name, LOCALE_SENGLISHDISPLAYNAME)
+        if not eng_display:
+            eng_display = _get_locale_info_ex(name, LOCALE_SNAME)
+    if not eng_display:
+        # WinAPI knows nothing about this LANGID (e.g. a custom layout); use the compiled table
+        eng_display = langid_table().display_name(lcid)
+    return eng_display
+
+# Installed LANGIDs with their names; locale calls are made only for newly installed ones
+installed_languages = InstalledLanguages(_installed_langids, _installed_display_name)
+installed_languages.on_change = loop_wakeup.set
+
+def build_lines() -> list[str]:
+    langids = installed_languages.langids()
+    colors = {lcid: language_color_allocation(lcid) for lcid in langids}
+    # LRU eviction moves colors between languages; those override what the file still says
+    for key, color in color_allocator.take_recolored().items():
+        if int(key) in colors:
+            colors[int(key)] = color
+    return [f"{lcid}:{installed_languages.names[lcid]}:{colors[lcid]}" for lcid in langids]
+
+def save_language_color_mapping_if_changed() -> None:
+    # Pick up external edits to the file (mtime/size change) before allocating
+    reloaded = language_color_index.refresh()
+    if reloaded:
+        language_frames.invalidate()
+
+    # Steady state is one layout-list call and one stat(); the file is rewritten only on a change
+    added, removed = installed_languages.poll()
+    if reloaded:
+        # First load or external edit: entries for layouts that are no longer installed go too
+        removed |= language_color_index.ids() - set(installed_languages.names)
+    if not (added or removed or reloaded or color_allocator.recolored):
+        return
+
+    # All allocations and releases below are flushed to STATE_PATH once, before OUTPUT_PATH is written
+    with color_allocator.transaction():
+        if removed:
+            log.info("$$$ Removed languages = %s", sorted(removed))
+        for lcid in removed:
+            release_color(lcid)
+        lines = build_lines()
+
+    new_content = "\n".join(lines) + ("\n" if lines else "")
+    if reloaded and OUTPUT_PATH.read_text(encoding="utf-8") == new_content:
+        return
+    for line in lines:
+        log.info(line)
+    atomic_write(OUTPUT_PATH, new_content)
+    language_color_index.update(lines)
+    language_frames.invalidate()
+
+def retrieve_saved_language_color(language_id: int):
+    return language_color_index.lookup(language_id)
+
+def note_language_seen(lang_id: int) -> None:
+    # LRU recency; a language left without a color takes back the least recently used one
+    if color_allocator.touch(lang_id):
+        save_language_color_mapping_if_changed()
+
+# Created by the monitor when IPC_ENABLED (the Windows transport is only imported then)
+ipc_server: Optional[IpcServer] = None
+
+def start_ipc_server() -> None:
+    global ipc_server
+    if not IPC_ENABLED:
+        return
+    if ipc_server is None:
+        ipc_server = create_ipc_server(IPC_PATH)
+    try:
+        ipc_server.start()
+    except OSError as e:
+        log.warning("IPC API not available - %s", e)
+
+def start_metrics_server() -> None:
+    # The snapshot file keeps working when the HTTP endpoint cannot bind
+    if not metrics.enabled:
+        return
+    try:
+        metrics.serve(METRICS_PORT)
+    except OSError as e:
+        log.warning("Metrics endpoint not available on port %d - %s", METRICS_PORT, e)
+
+def publish_language_state(lang_id: int, text: str) -> None:
+    # One encoded event per change, shared by every subscriber
+    if ipc_server is None:
+        return
+    color = retrieve_saved_language_color(lang_id)
+    ipc_server.publish({
+        "langid": lang_id,
+        "color": None if color in (LANGUAGE_NOT_FOUND, "None") else color,
+        "text": text,
+    })
+
+def seen_language_frame(lang_id: int, codec=None):
+    note_language_seen(lang_id)
+    frame = language_frames.get(lang_id, codec)
+    publish_language_state(lang_id, frame[0])
+    return frame
+
+# Get keyboard language
+def get_current_keyboard_language():
+    return format_keyboard_language(os_backend.foreground_langid())
+
+# Locale backend for the frame cache: English display name of a LANGID, "" if unknown
+def _locale_display_name(lang_id: int) -> str:
+    if LABEL_SOURCE == "table":
+        return langid_table().display_name(lang_id)
+    return os_backend.display_name(lang_id) or langid_table().display_name(lang_id)
+
+# Encoded outbound frame per LANGID; invalidated when installed languages or colors change
+language_frames = FrameCache(_locale_display_name, retrieve_saved_language_color)
+
+# Build the "Color:Lan (Country)" message for a LANGID
+def format_keyboard_language(lang_id: int):
+    return language_frames.get(lang_id)[0]
+
+def _press_language_hotkey():
+    # Press Alt+Shift (runs on the injector thread)
+    recorder.inject()
+    os_backend.press_language_hotkey()
+
+# Toggle bursts are coalesced and pressed off the loop thread
+toggle_injector = ToggleInjector(_press_language_hotkey, lambda: len(_installed_langids()))
+
+def _activate_layout(lang_id: int) -> bool:
+    recorder.inject()
+    return os_backend.activate_layout(lang_id)
+
+def _switchable_langids() -> list[int]:
+    # In-memory list from the last mapping refresh; the OS is only asked before the first one
+    return installed_languages.installed() or _installed_langids()
+
+# Direct layout activation (TOGGLE_MODE "direct")
+layout_switcher = LayoutSwitcher(_switchable_langids, _activate_layout)
+
+def pc_increment_language_state(steps: int = 1, current: Optional[int] = None) -> Optional[int]:
+    # Returns the LANGID activated in direct mode, None when the hotkey injector handles the toggle
+    if TOGGLE_MODE == "direct":
+        if current is None:
+            current = os_backend.foreground_langid()
+        target = layout_switcher.target(current, steps)
+        if target is not None and layout_switcher.activate(target):
+            return target
+    # Non-blocking: the injector presses Alt+Shift on its own thread
+    toggle_injector.request(steps)
+    return None
+
+def pc_select_language(index: int, current: Optional[int] = None) -> Optional[int]:
+    # "Select layout K" from the device; the hotkey path reaches it by cycling forward
+    if current is None:
+        current = os_backend.foreground_langid()
+    target = layout_switcher.layout_at(index)
+    if target is None:
+        log.warning("No installed layout at index %d", index)
+        return None
+    if target == current:
+        return None
+    if TOGGLE_MODE == "direct" and layout_switcher.activate(target):
+        return target
+    toggle_injector.request(layout_switcher.steps_to(current, index))
+    return None
+
+def _open_arduino_port(port_name: str):
+    import serial
+    return serial.Serial(port_name, BAUD_RATE, timeout=SERIAL_TIMEOUT)
+
+def _open_port(port_name: str):
+    # While tracing, every byte to and from the device goes through the recorder
+    conn = _open_arduino_port(port_name)
+    return TracedPort(conn, port_name) if recorder.enabled else conn
+
+def get_port_state_and_establish():
+    status = "Unavailable"
+    arduino_state = 0
+
+    port_registry.refresh(force=True)
+    ports = port_registry.devices()
+    if not ports:
+        return status, arduino_state
+
+    # Probe all candidates in parallel; ready on the device's handshake, BOOT_TIMEOUT as fallback
+    winner, results = ConnectionManager(_open_port).connect(ports)
+    for result in results:
+        description = port_registry.describe(result.port)
+        log.info("port state & establish %s - %s - %s", result.port, description, result.status)
+
+    if winner is not None:
+        status = "Available"
+        arduino_state = winner.conn
+    return status, arduino_state
+
+def get_port_state(port_name: Optional[str] = None):
+    # O(1) between registry refreshes; port_name narrows the check to the connected device
+    if port_registry.is_present(port_name):
+        return "Available"
+    return "Unavailable"
+
+def establish_wire_codec(arduino_serial_conn):
+    if WIRE_PROTOCOL != "binary":
+        return TextCodec()
+    codec = negotiate(arduino_serial_conn, COLOR_POOL)
+    log.info("Wire protocol version = %d", codec.version)
+    return codec
+
+def debug_print(debug_current_state_machine, debug_prev_state_machine, print_str):
+    if debug_current_state_machine != debug_prev_state_machine:
+        debug_prev_state_machine = debug_current_state_machine
+        recorder.state(debug_current_state_machine)
+        log.debug(print_str)
+    return debug_prev_state_machine
+
+def establish_devices(hub: DeviceHub, initial_lang_id: Optional[int] = None) -> str:
+    # Connect every matching device the hub does not drive yet. With nothing broadcast so far,
+    # initial_lang_id is sent as soon as the first device is up; later ones get it from the hub.
+    status = "Unavailable"
+    port_registry.refresh(force=True)
+    ports = [port for port in port_registry.devices() if port not in hub.links]
+    if ports:
+        # Probe all new candidates in parallel; each is added on its own handshake or BOOT_TIMEOUT
+        manager = ConnectionManager(_open_port)
+        for result in manager.connect_all(ports):
+            try:
+                hub.add(result.port, result.conn, establish_wire_codec(result.conn))
+            except OSError as e:
+                # Unplugged between the probe and now (serial.SerialException is an OSError)
+                result.status = "Busy or Unavailable"
+                log.warning("Device %s lost while connecting - %s", result.port, e)
+                try:
+                    result.conn.close()
+                except Exception:
+                    pass
+                continue
+            metrics.count("devices.connected")
+            if hub.latest is None and initial_lang_id is not None:
+                hub.broadcast(lambda codec, lang_id=initial_lang_id: language_frames.get(lang_id, codec)[1], LANGUAGE)
+        for result in manager.results:
+            description = port_registry.describe(result.port)
+            log.info("port state & establish %s - %s - %s", result.port, description, result.status)
+        # Only built when INFO lines are written; the log call alone would format it every time
+        if log.enabled_for(INFO):
+            log.info("%s", format_health_table(hub.health()))
+
+    if hub.links:
+        status = "Available"
+    return status
+
+def monitor_language_and_send(
+    language_source: Optional[LanguageSource] = None,
+    stop: Optional[threading.Event] = None,
+    stats: Optional[Dict[str, int]] = None,
+):
+    # stop ends the loop from another thread (set loop_wakeup too, so an idle loop notices at once);
+    # stats["iterations"] counts loop passes and stats["blocked"] the seconds spent idle in between
+    if language_source is None:
+        language_source = create_language_source(
+            on_device_change=port_registry.notify_hotplug,
+            on_layouts_change=installed_languages.mark_changed,
+        )
+    language_source.subscribe(loop_wakeup.set)
+    language_source.start()
+    # With an OS layout-list signal the timer is only a safety net
+    mapping_interval = LANG_MAPPING_FALLBACK_TIMER if language_source.signals_layout_changes else LANG_MAPPING_CHANGE_TIMER
+    tracing = bool(TRACE_PATH) and not recorder.enabled
+    if tracing:
+        recorder.start(Path(TRACE_PATH))
+    start_metrics_server()
+    start_ipc_server()
+    metrics_next_snapshot = time.perf_counter() + SNAPSHOT_INTERVAL
+
+    prev_state_machine = NONE
+    state_machine = INITIALIZE
+    # Every connected device gets each frame through its own write queue
+    hub = DeviceHub(keep_alive_interval=KEEP_ALIVE_TIMER, on_event=loop_wakeup.set)
+    next_send = time.perf_counter()
+    lang_map_next_check = time.perf_counter()
+    last_lang = None
+    message_lang_id = None
+
+    while state_machine != ERROR_STATE and not (stop is not None and stop.is_set()):
+        if stats is not None:
+            stats["iterations"] = stats.get("iterations", 0) + 1
+            stats["blocked"] = loop_wakeup.blocked
+        # Sampled once per pass so toggling metrics.enabled mid-pass is safe
+        instrumented = metrics.enabled
+        if instrumented:
+            pass_started = time.perf_counter()
+            pass_state = state_machine
+
+        if state_machine == INITIALIZE:
+            # Debug prints
+            prev_state_machine = debug_print(state_machine, prev_state_machine, "INITIALIZE")
+            state_machine = GET_PORT_STATE_AND_ESTABLISH
+
+        elif state_machine == GET_LANG_STATE:
+            prev_state_machine = debug_print(state_machine, prev_state_machine, "GET_LANG_STATE")
+
+            # Check serial port status: drop failed/unplugged devices, probe newly plugged ones
+            for port in hub.prune(port_registry.is_present):
+                log.info("Device removed: %s", port)
+                metrics.count("devices.removed")
+                if log.enabled_for(INFO):
+                    log.info("%s", format_health_table(hub.health()))
+            if not hub.links and reconnect.set_connected(False):
+                log.info("Arduino connected status = %s", "Unavailable")
+            new_ports = any(port not in hub.links for port in port_registry.devices())
+            if hub.links and not (new_ports and reconnect.due()):
+                # Non-blocking: the source only flags a LANGID when the foreground window or layout changed;
+                # the loop blocks on loop_wakeup at the end of the pass instead
+                lang_id = language_source.wait(0)
+                current_lang = last_lang if lang_id is None else seen_language_frame(lang_id)[0]
+                if current_lang != last_lang:
+                    log.info("Language changed to: %s", current_lang)
+                    message_lang_id = lang_id
+                    last_lang = current_lang
+                    state_machine = SEND_SERIAL_TO_ARDUINO
+                else:
+                    # Language was not changed - Re-read it
+                    state_machine = GET_LANG_STATE
+            else:
+                state_machine = GET_PORT_STATE_AND_ESTABLISH
+
+        elif state_machine == SEND_SERIAL_TO_ARDUINO:
+            # Debug prints
+            prev_state_machine = debug_print(state_machine, prev_state_machine, "SEND_SERIAL_TO_ARDUINO")
+
+            # Send language to every Arduino, encoded for its protocol version
+            # Bound now: the hub keeps this for devices that connect later
+            hub.broadcast(lambda codec, lang_id=message_lang_id: language_frames.get(lang_id, codec)[1], LANGUAGE)
+            log.info("NEW Language Sent to Arduino: %s", last_lang)
+            state_machine = GET_LANG_STATE
+
+        elif state_machine == GET_PORT_STATE_AND_ESTABLISH:
+            # Debug prints
+            prev_state_machine = debug_print(state_machine, prev_state_machine, "GET_PORT_STATE_AND_ESTABLISH")
+
+            if not reconnect.due():
+                # Backing off: the registry refresh notices a replugged port, which wakes the scheduler
+                port_registry.devices()
+                reconnect.wait(RECONNECT_POLL)
+                state_machine = GET_LANG_STATE if hub.links else GET_PORT_STATE_AND_ESTABLISH
+            else:
+                connected_before = set(hub.links)
+                initial_lang_id = language_source.current() if hub.latest is None else None
+                status = establish_devices(hub, initial_lang_id)
+                # An attempt failed if no device is up or a matching port could not be connected
+                if status != "Available" or any(port not in hub.links for port in port_registry.devices()):
+                    delay = reconnect.failed()
+                    metrics.count("reconnect.failures")
+                    # Log the first failure and then only every 2**n-th, so an unplugged device stays quiet
+                    if reconnect.failures & (reconnect.failures - 1) == 0:
+                        log.warning("No Arduino connected (%d attempts), retrying in %.1f s", reconnect.failures, delay)
+                else:
+                    reconnect.succeeded()
+                if reconnect.set_connected(status == "Available"):
+                    log.info("Arduino connected status = %s", status)
+                    if status == "Available":
+                        metrics.observe("reconnect.downtime", reconnect.last_outage)
+                        log.info("Connection stats: %s", reconnect.stats())
+                if status == "Available":
+                    if set(hub.links) - connected_before and hub.latest is None:
+                        # Nothing sent yet: read the current language. Otherwise the hub already
+                        # gave each new device one frame with the latest state.
+                        last_lang = None
+                        language_source.resend()
+                    elif initial_lang_id is not None and hub.latest is not None:
+                        # establish_devices() sent it to the first device that came up
+                        last_lang = seen_language_frame(initial_lang_id)[0]
+                        log.info("NEW Language Sent to Arduino: %s", last_lang)
+                    state_machine = GET_LANG_STATE
+                else:
+                    state_machine = GET_PORT_STATE_AND_ESTABLISH
+        else:
+            log.error("State machine error")
+
+        if instrumented:
+            metrics.observe("state." + STATE_NAMES.get(pass_state, str(pass_state)), time.perf_counter() - pass_started)
+
+        try:
+            # Receive language change from any Arduino
+            if hub.links:
+                # Non-blocking: each queued command has also set loop_wakeup
+                line = hub.get_command()
+                while line is not None:
+                    activated = None
+                    if line == TEXT_TOGGLE:
+                        log.info("Toggle = %s", line)
+                        activated = pc_increment_language_state(current=language_source.current())
+                    else:
+                        index = parse_select_layout(line)
+                        if index is not None:
+                            log.info("Select layout = %d", index)
+                            activated = pc_select_language(index, language_source.current())
+                    if activated is not None:
+                        # Optimistic: the next pass sends the new layout without waiting for the OS to report it
+                        language_source.assume(activated)
+                    line = hub.get_command()
+
+            # Send KEEP_ALIVE message to the Arduino side
+            now = time.perf_counter()
+            # Check if it's time to send the next message
+            if now >= next_send:
+                next_send = now + KEEP_ALIVE_TIMER
+                # Skipped per device when other traffic went out within KEEP_ALIVE_TIMER
+                hub.broadcast(lambda codec: codec.keep_alive(), KEEP_ALIVE)
+
+        # Exception handling
+        except Exception as e:
+            log.error("Exception handling - %s", e)
+            metrics.count("exceptions." + type(e).__name__)
+            last_lang = 0
+            language_source.resend()
+            port_registry.notify_hotplug()
+
+        # Persist stray color allocations after the debounce interval
+        color_allocator.flush_if_due()
+
+        # Update Language to color mapping file
+        # Check if it's time to check language mapping file should be updated
+        now = time.perf_counter()
+        if now >= lang_map_next_check or installed_languages.changed.is_set():
+            lang_map_next_check = now + mapping_interval
+            save_language_color_mapping_if_changed()
+            metrics.observe("mapping.refresh", time.perf_counter() - now)
+
+        if instrumented:
+            metrics.observe("loop.pass", time.perf_counter() - pass_started)
+            if now >= metrics_next_snapshot:
+                metrics_next_snapshot = now + SNAPSHOT_INTERVAL
+                metrics.write_snapshot(METRICS_PATH)
+
+        if state_machine == GET_LANG_STATE and hub.links:
+            # Idle: sleep until an event source fires or the next timer is due
+            timeout = min(next_send, lang_map_next_check) - time.perf_counter()
+            if instrumented:
+                timeout = min(timeout, metrics_next_snapshot - time.perf_counter())
+            flush_in = color_allocator.flush_due_in()
+            if flush_in is not None:
+                timeout = min(timeout, flush_in)
+            # Without a hotplug signal, a new device is only seen when the enumeration expires
+            timeout = min(timeout, port_registry.expires_in())
+            if any(port not in hub.links for port in port_registry.devices()):
+                timeout = min(timeout, reconnect.remaining())
+            if timeout > 0 and not (stop is not None and stop.is_set()):
+                loop_wakeup.wait(timeout)
+
+    hub.close()
+    toggle_injector.stop()
+    language_source.stop()
+    if ipc_server is not None:
+        ipc_server.stop()
+    if tracing:
+        recorder.stop()
+    # Queued lines reach the console (or a caller's redirected stdout) before returning
+    log.flush()
+
+async def monitor_language_and_send_async(language_source: Optional[LanguageSource] = None):
+    # asyncio and the engine are only imported in async mode, keeping the default startup lean
+    import asyncio
+    from .engine import AsyncEngine, PySerialTransport
+
+    if language_source is None:
+        language_source = create_language_source(
+            on_device_change=port_registry.notify_hotplug,
+            on_layouts_change=installed_languages.mark_changed,
+        )
+    language_source.start()
+    start_ipc_server()
+
+    while True:
+        while not reconnect.due():
+            port_registry.devices()
+            await asyncio.to_thread(reconnect.wait, RECONNECT_POLL)
+        status, arduino_serial_conn = await asyncio.to_thread(get_port_state_and_establish)
+        if reconnect.set_connected(status == "Available"):
+            log.info("Arduino connected status = %s", status)
+        if status != "Available":
+            delay = reconnect.failed()
+            if reconnect.failures & (reconnect.failures - 1) == 0:
+                log.warning("No Arduino connected (%d attempts), retrying in %.1f s", reconnect.failures, delay)
+            continue
+        reconnect.succeeded()
+
+        wire_codec = await asyncio.to_thread(establish_wire_codec, arduino_serial_conn)
+        language_frames.set_codec(wire_codec)
+        # With protocol v2 the framer turns acks into "ACK <seq>" lines for the engine's AckTracker
+        engine = AsyncEngine(
+            PySerialTransport(arduino_serial_conn, framer=wire_codec.framer()),
+            language_source,
+            seen_language_frame,
+            pc_increment_language_state,
+            refresh_mapping=save_language_color_mapping_if_changed,
+            keep_alive_interval=KEEP_ALIVE_TIMER,
+            refresh_interval=LANG_MAPPING_CHANGE_TIMER,
+            codec=wire_codec,
+            on_select=pc_select_language,
+        )
+        try:
+            await engine.run()
+        except Exception as e:
+            log.error("Exception handling - %s", e)
+        reconnect.set_connected(False)
+        port_registry.notify_hotplug()
+
+def run() -> None:
+    # Entry point for `python -m boten` and the `boten` console script
+    if ENGINE_MODE == "async":
+        import asyncio
+        asyncio.run(monitor_language_and_send_async())
+    else:
+        monitor_language_and_send()
@@ -0,0 +1,123 @@
+from __future__ import annotations
+import sys
+import time
+from typing import Dict, List, Optional
+
+from .langid_table import langid_table
+
+# GetLocaleInfoEx fields
+LOCALE_ILANGUAGE            = 0x00000001  # hex LANGID string, e.g. "0409"
+LOCALE_SENGLISHDISPLAYNAME  = 0x00000072  # "English (United States)"
+LOCALE_SNAME                = 0x0000005C  # "en-US" (fallback)
+
+BUF_LEN = 40  # LOCALE_NAME_MAX_LENGTH
+
+# How long Alt+Shift is held down when cycling the layout
+HOTKEY_HOLD = 0.05
+
+
+class OsBackend:
+    """Keyboard-layout, locale and input-injection calls the monitor makes to the OS."""
+
+    def installed_langids(self) -> List[int]:
+        raise NotImplementedError
+
+    def lcid_to_locale_name(self, lcid: int) -> str:
+        raise NotImplementedError
+
+    def locale_info(self, locale_name: str, field: int) -> str:
+        raise NotImplementedError
+
+    def display_name(self, lang_id: int) -> str:
+        # English display name of a LANGID, "" if unknown
+        raise NotImplementedError
+
+    def foreground_langid(self) -> int:
+        raise NotImplementedError
+
+    def press_language_hotkey(self) -> None:
+        raise NotImplementedError
+
+    def activate_layout(self, lang_id: int) -> bool:
+        # Switch the foreground window straight to an installed layout; False if unsupported or not installed
+        return False
+
+
+class FakeBackend(OsBackend):
+    """
+    Deterministic in-memory OS for tests and benchmarks on any platform.
+    - Installed layouts and display names come from the constructor (defaults from the compiled LANGUAGE_MAP table).
+    - press_language_hotkey() cycles to the next installed layout in list order, publishes it to
+      `language_source` (a FakeLanguageSource) and records the injection time.
+    - activate_layout() is the fake layout manager: it switches at once and records the activation time.
+    - `calls` counts simulated OS round trips.
+    """
+
+    def __init__(
+        self,
+        installed: Optional[List[int]] = None,
+        names: Optional[Dict[int, str]] = None,
+        language_source=None,
+        hotkey_hold: float = HOTKEY_HOLD,
+    ) -> None:
+        self.installed = list(installed or [0x0409])
+        self.names = names
+        self.language_source = language_source
+        self.hotkey_hold = hotkey_hold
+        self.current = self.installed[0]
+        self.injections: List[float] = []
+        self.activations: List[float] = []
+        self.calls = 0
+        if language_source is not None:
+            language_source.set_langid(self.current)
+
+    def installed_langids(self) -> List[int]:
+        self.calls += 1
+        return list(dict.fromkeys(self.installed))
+
+    def lcid_to_locale_name(self, lcid: int) -> str:
+        self.calls += 1
+        return f"x-{lcid:04x}" if self.display_name(lcid) else ""
+
+    def locale_info(self, locale_name: str, field: int) -> str:
+        self.calls += 1
+        if field == LOCALE_SENGLISHDISPLAYNAME:
+            return self.display_name(int(locale_name[2:], 16))
+        return locale_name
+
+    def display_name(self, lang_id: int) -> str:
+        self.calls += 1
+        if self.names is not None:
+            return self.names.get(lang_id, "")
+        return langid_table().display_name(lang_id)
+
+    def foreground_langid(self) -> int:
+        self.calls += 1
+        return self.current
+
+    def press_language_hotkey(self) -> None:
+        self.injections.append(time.perf_counter())
+        time.sleep(self.hotkey_hold)
+        installed = list(dict.fromkeys(self.installed))
+        index = installed.index(self.current) if self.current in installed else -1
+        self.current = installed[(index + 1) % len(installed)]
+        if self.language_source is not None:
+            self.language_source.set_langid(self.current)
+
+    def activate_layout(self, lang_id: int) -> bool:
+        self.calls += 1
+        if lang_id not in self.installed:
+            return False
+        self.activations.append(time.perf_counter())
+        self.current = lang_id
+        if self.language_source is not None:
+            self.language_source.set_langid(self.current)
+        return True
+
+
+def create_backend() -> OsBackend:
+    if sys.platform == "win32":
+        # Imported here so ctypes/pywin32 are only loaded on Windows
+        from .windows import WindowsBackend
+        return WindowsBackend()
+    return FakeBackend()
@@ -0,0 +1,258 @@
+from __future__ import annotations
+import struct
+import time
+from typing import Callable, List, NamedTuple, Optional, Sequence, Tuple
+
+from .langid_table import langid_table
+from .serial_reader import LineFramer
+
+# Version offered in the handshake; 0 means "text protocol".
+# 2 adds sequence-numbered state frames that the device acknowledges (see acks.py)
+PROTOCOL_VERSION = 2
+NEGOTIATION_TIMEOUT = 0.5
+
+# Binary opcodes (one byte each)
+OP_KEEP_ALIVE = 0x01
+OP_TOGGLE = 0x02
+OP_LANGUAGE = 0x03
+OP_SELECT_LAYOUT = 0x04  # device → PC, followed by the layout index (u8), as in SELECT_LAYOUT <k>
+OP_STATE = 0x05          # v2, PC → device: flags (u8), seq (u16 LE), then an OP_LANGUAGE frame
+OP_ACK = 0x06            # v2, device → PC: seq (u16 LE) of a received OP_STATE
+
+STATE_HEADER = struct.Struct("<BBH")
+ACK_FRAME = struct.Struct("<BH")
+# OP_STATE flags: the device takes this frame whatever seq it saw last (first frame on a connection)
+FLAG_RESYNC = 0x01
+
+# OP_LANGUAGE payload: LANGID (u16 LE), color index (u8), label length (u8), label (UTF-8)
+LANGUAGE_HEADER = struct.Struct("<BHBB")
+MAX_LABEL_BYTES = 16
+NO_COLOR = 0xFF
+
+TEXT_KEEP_ALIVE = b"KEEP_ALIVE\n"
+TEXT_TOGGLE = "LANGUAGE_TOGGLE"
+# "SELECT_LAYOUT <k>": activate the k-th installed layout, 0-based, in GetKeyboardLayoutList order
+# with duplicates dropped (the order the hotkey cycles in; see layout_switch.LayoutSwitcher)
+TEXT_SELECT_LAYOUT = "SELECT_LAYOUT"
+TEXT_ACK = "ACK"
+
+
+def parse_select_layout(line: str) -> Optional[int]:
+    # Layout index of a "SELECT_LAYOUT <k>" command line, None for any other line
+    command, _, arg = line.partition(" ")
+    if command != TEXT_SELECT_LAYOUT or not arg.strip().isdigit():
+        return None
+    return int(arg)
+
+
+class Frame(NamedTuple):
+    opcode: int
+    langid: Optional[int] = None
+    color_index: Optional[int] = None
+    label: Optional[str] = None
+    layout_index: Optional[int] = None
+    seq: Optional[int] = None
+    flags: int = 0
+
+
+def _label_bytes(label: str) -> bytes:
+    # Truncate on a character boundary so the label stays valid UTF-8
+    data = label.encode("utf-8")
+    while len(data) > MAX_LABEL_BYTES:
+        label = label[:-1]
+        data = label.encode("utf-8")
+    return data
+
+
+def encode_language(langid: int, color_index: Optional[int], label: str) -> bytes:
+    data = _label_bytes(label)
+    index = NO_COLOR if color_index is None else color_index
+    return LANGUAGE_HEADER.pack(OP_LANGUAGE, langid & 0xFFFF, index, len(data)) + data
+
+
+def encode_state(seq: int, language_frame: bytes, flags: int = 0) -> bytes:
+    return STATE_HEADER.pack(OP_STATE, flags, seq & 0xFFFF) + language_frame
+
+
+def encode_ack(seq: int) -> bytes:
+    return ACK_FRAME.pack(OP_ACK, seq & 0xFFFF)
+
+
+def seq_newer(seq: int, than: int) -> bool:
+    # 16-bit serial number arithmetic: True if seq follows `than` (within half the range)
+    return 0 < (seq - than) & 0xFFFF < 0x8000
+
+
+class TextCodec:
+    """The original line protocol: "Color:Lan (Country)\\n" and KEEP_ALIVE lines."""
+
+    version = 0
+    acked = False
+
+    def keep_alive(self) -> bytes:
+        return TEXT_KEEP_ALIVE
+
+    def language(self, langid: int, color: Optional[str], text: str) -> bytes:
+        return (text + "\n").encode("utf-8")
+
+    def framer(self) -> LineFramer:
+        return LineFramer()
+
+
+class BinaryCodec:
+    """Version 1 binary framing: one-byte keep-alive/toggle, compact language frames."""
+
+    version = 1
+    acked = False
+
+    def __init__(self, color_pool: Sequence[str]) -> None:
+        # Palettes larger than the u8 index field send the rest as NO_COLOR
+        self._color_index = {color: i for i, color in enumerate(color_pool) if i < NO_COLOR}
+
+    def keep_alive(self) -> bytes:
+        return bytes((OP_KEEP_ALIVE,))
+
+    def language(self, langid: int, color: Optional[str], text: str) -> bytes:
+        # Prefer the short compiled LANGUAGE_MAP label; fall back to the text after the color prefix
+        label = langid_table().label(langid) or text.split(":", 1)[-1]
+        return encode_language(langid, self._color_index.get(color), label)
+
+    def framer(self) -> "BinaryFramer":
+        return BinaryFramer()
+
+
+class AckedBinaryCodec(BinaryCodec):
+    """
+    Version 2: the same frames, but the device acknowledges language updates.
+    language() still returns the plain OP_LANGUAGE frame (shared through the frame cache);
+    each device link wraps it in OP_STATE with its own sequence number (acks.AckTracker).
+    """
+
+    version = 2
+    acked = True
+
+    def framer(self, on_ack: Optional[Callable[[int], None]] = None) -> "BinaryFramer":
+        return BinaryFramer(on_ack)
+
+
+class FrameDecoder:
+    """
+    Reference decoder for the binary protocol; accepts arbitrary chunking.
+    Unknown opcodes are skipped one byte at a time and counted in `errors`.
+    """
+
+    def __init__(self) -> None:
+        self._buf = bytearray()
+        self.errors = 0
+
+    def _language(self, buf: bytearray, pos: int) -> Tuple[Optional[Frame], int]:
+        # OP_LANGUAGE frame at pos: (frame, end); (None, -1) if incomplete, (None, pos) if malformed
+        if buf[pos] != OP_LANGUAGE:
+            return None, pos
+        if len(buf) - pos < LANGUAGE_HEADER.size:
+            return None, -1
+        _, langid, index, length = LANGUAGE_HEADER.unpack_from(buf, pos)
+        if length > MAX_LABEL_BYTES:
+            return None, pos
+        end = pos + LANGUAGE_HEADER.size + length
+        if len(buf) < end:
+            return None, -1
+        label = bytes(buf[pos + LANGUAGE_HEADER.size:end]).decode("utf-8", errors="replace")
+        return Frame(OP_LANGUAGE, langid, None if index == NO_COLOR else index, label), end
+
+    def feed(self, data: bytes) -> List[Frame]:
+        buf = self._buf
+        buf += data
+        frames: List[Frame] = []
+        pos = 0
+        while pos < len(buf):
+            opcode = buf[pos]
+            if opcode in (OP_KEEP_ALIVE, OP_TOGGLE):
+                frames.append(Frame(opcode))
+                pos += 1
+            elif opcode == OP_SELECT_LAYOUT:
+                if len(buf) - pos < 2:
+                    break
+                frames.append(Frame(opcode, layout_index=buf[pos + 1]))
+                pos += 2
+            elif opcode == OP_ACK:
+                if len(buf) - pos < ACK_FRAME.size:
+                    break
+                frames.append(Frame(opcode, seq=ACK_FRAME.unpack_from(buf, pos)[1]))
+                pos += ACK_FRAME.size
+            elif opcode in (OP_LANGUAGE, OP_STATE):
+                start = pos + STATE_HEADER.size if opcode == OP_STATE else pos
+                if len(buf) <= start:
+                    break
+                frame, end = self._language(buf, start)
+                if end < 0:
+                    break
+                if frame is None:
+                    self.errors += 1
+                    pos += 1
+                    continue
+                if opcode == OP_STATE:
+                    _, flags, seq = STATE_HEADER.unpack_from(buf, pos)
+                    frame = frame._replace(opcode=OP_STATE, seq=seq, flags=flags)
+                frames.append(frame)
+                pos = end
+            else:
+                self.errors += 1
+                pos += 1
+        del buf[:pos]
+        return frames
+
+
+class BinaryFramer:
+    """
+    LineFramer-compatible adapter: turns inbound binary frames into command lines.
+    Acks go to on_ack(seq) when set (the device link's tracker), else become "ACK <seq>" lines.
+    """
+
+    _commands = {OP_TOGGLE: TEXT_TOGGLE.encode(), OP_KEEP_ALIVE: b"KEEP_ALIVE"}
+
+    def __init__(self, on_ack: Optional[Callable[[int], None]] = None) -> None:
+        self.decoder = FrameDecoder()
+        self.on_ack = on_ack
+
+    def feed(self, data: bytes) -> List[bytes]:
+        lines = []
+        for frame in self.decoder.feed(data):
+            if frame.opcode == OP_ACK:
+                if self.on_ack is not None:
+                    self.on_ack(frame.seq)
+                else:
+                    lines.append(f"{TEXT_ACK} {frame.seq}".encode("ascii"))
+            elif frame.opcode == OP_SELECT_LAYOUT:
+                lines.append(f"{TEXT_SELECT_LAYOUT} {frame.layout_index}".encode("ascii"))
+            elif frame.opcode in self._commands:
+                lines.append(self._commands[frame.opcode])
+        return lines
+
+
+def negotiate(conn, color_pool: Sequence[str], timeout: float = NEGOTIATION_TIMEOUT):
+    """
+    Offer PROTOCOL_VERSION with "PROTO?<v>" and wait for "PROTO <v>" from the device.
+    Firmware that does not answer within the timeout keeps the text protocol.
+    Must run before a SerialReader is attached to the connection.
+    """
+    saved_timeout = conn.timeout
+    conn.timeout = timeout
+    try:
+        conn.write(f"PROTO?{PROTOCOL_VERSION}\n".encode("ascii"))
+        deadline = time.perf_counter() + timeout
+        while time.perf_counter() < deadline:
+            line = conn.readline().decode("utf-8", errors="replace").strip()
+            if line.startswith("PROTO "):
+                try:
+                    version = int(line[6:])
+                except ValueError:
+                    break
+                if version >= 2:
+                    return AckedBinaryCodec(color_pool)
+                if version == 1:
+                    return BinaryCodec(color_pool)
+                break
+    finally:
+        conn.timeout = saved_timeout
+    return TextCodec()
@@ -0,0 +1,110 @@
+from __future__ import annotations
+import random
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+# First retry delay after a failed connect, doubled per failure up to the cap
+RECONNECT_BASE_DELAY = 0.25
+RECONNECT_MAX_DELAY = 8.0
+# Each delay is shortened by up to this fraction, so several PCs/devices do not retry in lockstep
+RECONNECT_JITTER = 0.2
+# Longest single wait while backing off, so the loop stays responsive to stop/timers
+RECONNECT_POLL = 0.1
+
+
+class ReconnectScheduler:
+    """
+    Decides when the next connect attempt may run and keeps link uptime/downtime stats.
+    - failed() schedules the next attempt with capped exponential backoff and jitter.
+    - wake() (any thread) makes the next attempt immediate, e.g. when a matching port appears.
+    - set_connected() records link transitions for stats().
+    """
+
+    def __init__(
+        self,
+        base: float = RECONNECT_BASE_DELAY,
+        cap: float = RECONNECT_MAX_DELAY,
+        jitter: float = RECONNECT_JITTER,
+        clock: Callable[[], float] = time.monotonic,
+        rng: Optional[random.Random] = None,
+    ) -> None:
+        self.base = base
+        self.cap = cap
+        self.jitter = jitter
+        self._clock = clock
+        self._rng = rng or random.Random()
+        self._woken = threading.Event()
+        self._next_attempt = clock()
+        self.failures = 0  # consecutive failed attempts
+        self.attempts = 0
+        self.connected = False
+        self.outages = 0
+        self.longest_outage = 0.0
+        self.last_outage = 0.0
+        self._since = clock()
+        self._uptime = 0.0
+        self._downtime = 0.0
+
+    def due(self) -> bool:
+        if self._woken.is_set():
+            self._woken.clear()
+            self._next_attempt = self._clock()
+        return self._clock() >= self._next_attempt
+
+    def remaining(self) -> float:
+        return max(0.0, self._next_attempt - self._clock())
+
+    def wait(self, timeout: float) -> bool:
+        # Blocks until the next attempt is due, wake() is called, or timeout; returns due()
+        self._woken.wait(min(timeout, self.remaining()))
+        return self.due()
+
+    def wake(self) -> None:
+        # A new port is worth trying right away; backoff restarts from the base delay
+        self.failures = 0
+        self._woken.set()
+
+    def failed(self) -> float:
+        # Returns the delay until the next attempt
+        self.attempts += 1
+        # The exponent stops growing long after the cap is reached, so 2 ** n never overflows a float
+        delay = min(self.cap, self.base * (2 ** min(self.failures, 16)))
+        delay *= 1 - self.jitter * self._rng.random()
+        self.failures += 1
+        self._next_attempt = self._clock() + delay
+        return delay
+
+    def succeeded(self) -> None:
+        self.attempts += 1
+        self.failures = 0
+        self._next_attempt = self._clock()
+
+    def set_connected(self, connected: bool) -> bool:
+        # Returns True on a transition; the length of a finished outage is in last_outage
+        if connected == self.connected:
+            return False
+        now = self._clock()
+        elapsed = now - self._since
+        if self.connected:
+            self._uptime += elapsed
+            self.outages += 1
+        else:
+            self._downtime += elapsed
+            self.last_outage = elapsed
+            self.longest_outage = max(self.longest_outage, elapsed)
+        self.connected = connected
+        self._since = now
+        return True
+
+    def stats(self) -> Dict[str, float]:
+        current = self._clock() - self._since
+        return {
+            "connected": self.connected,
+            "uptime": round(self._uptime + (current if self.connected else 0.0), 1),
+            "downtime": round(self._downtime + (0.0 if self.connected else current), 1),
+            "outages": self.outages,
+            "longest_outage": round(self.longest_outage, 1),
+            "attempts": self.attempts,
+            "failures": self.failures,
+        }
@@ -0,0 +1,204 @@
+"""
+Replays a BOTEN_TRACE recording through main.monitor_language_and_send with fake backends:
+recorded LANGID changes drive a FakeLanguageSource, recorded device bytes are fed to
+FakeSerialPorts, and what the loop writes is compared with what it wrote in the field.
+
+    python -m boten.replay trace.bin            # real speed
+    python -m boten.replay trace.bin --fast     # as fast as the loop keeps up
+"""
+from __future__ import annotations
+import argparse
+import contextlib
+import io
+import json
+import os
+import struct
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Dict, List, Optional, Tuple
+
+from .connection import FakeSerialPort
+from .language_source import FakeLanguageSource
+from .os_backend import FakeBackend
+from .protocol import OP_KEEP_ALIVE, TEXT_KEEP_ALIVE
+from .trace import INJECT, LANGID, OPEN, SERIAL_IN, SERIAL_OUT, TraceRecord, read_trace
+
+# How long the feeder waits for the loop to open a port the trace says was opened
+OPEN_TIMEOUT = 5.0
+# Loop passes to let through after each input in fast mode, so every input is handled in order;
+# capped because a pass can itself be waiting for the next input (e.g. a READY handshake)
+FAST_SETTLE_PASSES = 2
+FAST_SETTLE_TIMEOUT = 0.05
+# Time to let the last outputs drain before stopping
+DRAIN_TIME = 0.3
+
+
+def _is_keep_alive(data: bytes) -> bool:
+    return data == TEXT_KEEP_ALIVE or data == bytes((OP_KEEP_ALIVE,))
+
+
+def change_to_send(changes: List[float], writes: List[Tuple[float, bytes]]) -> List[float]:
+    # For each LANGID change, the delay until the next non-keep-alive frame went out
+    writes = sorted(w for w in writes if not _is_keep_alive(w[1]))
+    latencies = []
+    index = 0
+    for changed in sorted(changes):
+        while index < len(writes) and writes[index][0] < changed:
+            index += 1
+        if index < len(writes):
+            latencies.append(writes[index][0] - changed)
+    return latencies
+
+
+def summarize(changes: List[float], writes: List[Tuple[float, bytes]], injections: int) -> Dict[str, object]:
+    latencies = sorted(change_to_send(changes, writes))
+    return {
+        "langid_changes": len(changes),
+        "frames_out": sum(1 for _, data in writes if not _is_keep_alive(data)),
+        "keep_alives_out": sum(1 for _, data in writes if _is_keep_alive(data)),
+        "injections": injections,
+        "change_to_send_p50_ms": round(latencies[len(latencies) // 2] * 1000, 3) if latencies else None,
+        "change_to_send_max_ms": round(latencies[-1] * 1000, 3) if latencies else None,
+    }
+
+
+def recorded_summary(records: List[TraceRecord]) -> Dict[str, object]:
+    changes = [r.time for r in records if r.kind == LANGID]
+    writes = [(r.time, r.data) for r in records if r.kind == SERIAL_OUT]
+    return summarize(changes, writes, sum(1 for r in records if r.kind == INJECT))
+
+
+class _ReplayDevices:
+    """Enumerator and port factory for main: one FakeSerialPort per open, in order per port name."""
+
+    def __init__(self, names: List[str], description: str) -> None:
+        self.names = names
+        self.description = description
+        self.opened: Dict[str, List[FakeSerialPort]] = {name: [] for name in names}
+        self._cond = threading.Condition()
+
+    def enumerate(self):
+        return [SimpleNamespace(device=name, description=self.description) for name in self.names]
+
+    def open(self, name: str) -> FakeSerialPort:
+        port = FakeSerialPort(name, handshake=False)
+        with self._cond:
+            self.opened.setdefault(name, []).append(port)
+            self._cond.notify_all()
+        return port
+
+    def session(self, name: str, index: int, timeout: float) -> Optional[FakeSerialPort]:
+        # The index-th port the loop opened for `name`, waiting for it if needed
+        with self._cond:
+            self._cond.wait_for(lambda: len(self.opened.get(name, [])) > index, timeout)
+            ports = self.opened.get(name, [])
+            return ports[index] if len(ports) > index else None
+
+
+def replay(main, path: Path, speed: float = 1.0) -> Dict[str, object]:
+    """
+    Feed the trace at `path` through main's loop; speed 1.0 is real time, 0 as fast as possible.
+    Returns the recorded and replayed summaries side by side.
+    main must have been imported with BOTEN_HOME pointing at a scratch directory.
+    """
+    records = list(read_trace(path))
+    names: Dict[int, str] = {}
+    layouts: List[int] = []
+    # (time, kind, port name, open index, data) of every input, in trace order
+    inputs: List[Tuple[float, int, str, int, bytes]] = []
+    opens: Dict[str, int] = {}
+    sessions: Dict[int, int] = {}
+    for record in records:
+        if record.kind == OPEN:
+            name = record.data.decode("utf-8")
+            names[record.port] = name
+            sessions[record.port] = opens.get(name, 0)
+            opens[name] = sessions[record.port] + 1
+        elif record.kind == SERIAL_IN and record.port in names:
+            inputs.append((record.time, SERIAL_IN, names[record.port], sessions[record.port], record.data))
+        elif record.kind == LANGID:
+            (lang_id,) = struct.unpack("<H", record.data)
+            if lang_id not in layouts:
+                layouts.append(lang_id)
+            inputs.append((record.time, LANGID, "", 0, record.data))
+
+    language_source = FakeLanguageSource()
+    backend = FakeBackend(layouts or None, language_source=language_source, hotkey_hold=0.0)
+    devices = _ReplayDevices(sorted(set(names.values())), main.ARDUINO_PORT_DESCRIPTION)
+    main.os_backend = backend
+    main.port_registry._enumerator = devices.enumerate
+    main.port_registry.notify_hotplug()
+    main._open_arduino_port = devices.open
+
+    stop = threading.Event()
+    stats: Dict[str, int] = {"iterations": 0}
+    output = io.StringIO()
+
+    def run() -> None:
+        with contextlib.redirect_stdout(output):
+            main.monitor_language_and_send(language_source, stop, stats)
+
+    loop = threading.Thread(target=run, name="replay-monitor", daemon=True)
+    started = time.perf_counter()
+    loop.start()
+    changes: List[float] = []
+    missed = 0
+    try:
+        for at, kind, name, index, data in inputs:
+            if speed > 0:
+                delay = started + at / speed - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            if kind == LANGID:
+                language_source.set_langid(struct.unpack("<H", data)[0])
+                changes.append(time.perf_counter() - started)
+            else:
+                port = devices.session(name, index, OPEN_TIMEOUT)
+                if port is None:
+                    missed += 1
+                    continue
+                port.feed(data)
+            if speed <= 0:
+                target = stats["iterations"] + FAST_SETTLE_PASSES
+                deadline = time.perf_counter() + FAST_SETTLE_TIMEOUT
+                while stats["iterations"] < target and time.perf_counter() < deadline:
+                    time.sleep(0.0005)
+        time.sleep(DRAIN_TIME)
+    finally:
+        stop.set()
+        loop.join(timeout=5)
+
+    writes = [
+        (written_at - started, data)
+        for ports in devices.opened.values()
+        for port in ports
+        for written_at, data in zip(port.write_times, port.written)
+    ]
+    replayed = summarize(changes, writes, len(backend.injections))
+    replayed["inputs_missed"] = missed
+    replayed["duration_s"] = round(time.perf_counter() - started, 3)
+    return {"trace": str(path), "speed": speed, "recorded": recorded_summary(records), "replayed": replayed}
+
+
+def main_cli(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("trace", help="file written with BOTEN_TRACE")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed factor (1.0 = real time)")
+    parser.add_argument("--fast", action="store_true", help="replay as fast as possible")
+    args = parser.parse_args(argv)
+
+    # main reads BOTEN_HOME at import time, so the scratch directory must be set first
+    os.environ["BOTEN_HOME"] = tempfile.mkdtemp(prefix="boten-replay-")
+    os.environ.pop("BOTEN_TRACE", None)
+    from . import main
+
+    print(json.dumps(replay(main, Path(args.trace), 0.0 if args.fast else args.speed), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,130 @@
+from __future__ import annotations
+import queue
+import threading
+import time
+from typing import Callable, List, Optional
+
+from .instrumentation import metrics
+
+# Longest line kept while waiting for its newline; longer garbage is discarded
+MAX_LINE_LENGTH = 256
+# Parsed commands waiting for the main loop
+INBOUND_QUEUE_SIZE = 64
+# Blocking read timeout of the reader thread when nothing is waiting
+READER_TIMEOUT = 0.1
+
+
+class LineFramer:
+    """
+    Incremental newline framing over one reusable bytearray.
+    feed() appends a chunk and returns every complete line, stripped, with no per-byte copies.
+    """
+
+    def __init__(self, max_line: int = MAX_LINE_LENGTH) -> None:
+        self.max_line = max_line
+        self._buf = bytearray()
+        self.overlong = 0  # lines discarded for exceeding max_line
+
+    def feed(self, data: bytes) -> List[bytes]:
+        buf = self._buf
+        buf += data
+        lines: List[bytes] = []
+        start = 0
+        while True:
+            end = buf.find(b"\n", start)
+            if end < 0:
+                break
+            if end - start <= self.max_line:
+                lines.append(bytes(buf[start:end]).strip())
+            else:
+                self.overlong += 1
+            start = end + 1
+        if start:
+            del buf[:start]
+        if len(buf) > self.max_line:
+            buf.clear()
+            self.overlong += 1
+        return lines
+
+
+class SerialReader:
+    """
+    Dedicated thread that bulk-reads a serial connection and queues parsed commands.
+    - Reads whatever is waiting in one call (or blocks for one byte up to READER_TIMEOUT).
+    - Commands go to a bounded queue; when it is full the newest command is dropped and counted.
+    - A read failure stops the thread and is kept in `error` for the consumer to raise.
+    """
+
+    def __init__(
+        self,
+        conn,
+        queue_size: int = INBOUND_QUEUE_SIZE,
+        framer=None,
+        commands: Optional[queue.Queue] = None,
+        on_event: Optional[Callable[[], None]] = None,
+    ) -> None:
+        self.conn = conn
+        # Called after a command is queued or the read fails, to wake a consumer blocked elsewhere
+        self.on_event = on_event
+        # Several readers may share one queue (see fanout.DeviceHub)
+        self.commands: queue.Queue = commands if commands is not None else queue.Queue(maxsize=queue_size)
+        # Anything with feed(bytes) -> list of command lines (LineFramer, protocol.BinaryFramer)
+        self.framer = framer or LineFramer()
+        self.error: Optional[BaseException] = None
+        self.bytes_read = 0
+        self.received = 0
+        self.dropped = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self.conn.timeout = READER_TIMEOUT
+        self._thread = threading.Thread(target=self._run, name="serial-reader", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=READER_TIMEOUT * 5)
+        self._thread = None
+
+    def _run(self) -> None:
+        try:
+            while not self._stop.is_set():
+                waiting = self.conn.in_waiting
+                started = time.perf_counter()
+                data = self.conn.read(waiting or 1)
+                if not data:
+                    continue
+                if waiting:
+                    # Only reads of already-buffered data say something about read cost
+                    metrics.observe("serial.read", time.perf_counter() - started)
+                metrics.count("serial.read_bytes", len(data))
+                self.bytes_read += len(data)
+                for line in self.framer.feed(data):
+                    if not line:
+                        continue
+                    self.received += 1
+                    try:
+                        self.commands.put_nowait(line.decode("utf-8", errors="replace"))
+                    except queue.Full:
+                        self.dropped += 1
+                        metrics.count("serial.inbound_dropped")
+                    if self.on_event is not None:
+                        self.on_event()
+        except Exception as e:
+            # Unplugged device or closed port: hand the failure to the consumer
+            self.error = e
+            if self.on_event is not None:
+                self.on_event()
+
+    def get(self, timeout: float = 0.0) -> Optional[str]:
+        # Raises the reader's failure, if any, once the queue is drained
+        try:
+            if timeout > 0:
+                return self.commands.get(timeout=timeout)
+            return self.commands.get_nowait()
+        except queue.Empty:
+            if self.error is not None:
+                raise self.error
+            return None
@@ -0,0 +1,232 @@
+from __future__ import annotations
+import contextlib
+import fcntl
+import io
+import os
+import select
+import struct
+import termios
+import threading
+import time
+import tty
+from types import SimpleNamespace
+from typing import Dict, List, Optional, Tuple
+
+from .connection import DEVICE_READY_LINE
+from .language_source import FakeLanguageSource
+from .os_backend import FakeBackend
+from .serial_reader import LineFramer
+
+
+class PtyPort:
+    """serial.Serial-like wrapper around a pty slave fd, so the monitor needs no pyserial on Linux."""
+
+    def __init__(self, path: str, timeout: Optional[float] = None) -> None:
+        self.port = path
+        self.timeout = timeout
+        self.write_timeout: Optional[float] = None
+        self.fd = os.open(path, os.O_RDWR | os.O_NOCTTY)
+        tty.setraw(self.fd)
+        self.is_open = True
+
+    @property
+    def in_waiting(self) -> int:
+        buf = fcntl.ioctl(self.fd, termios.FIONREAD, b"\0\0\0\0")
+        return struct.unpack("I", buf)[0]
+
+    def _readable(self, timeout: Optional[float]) -> bool:
+        if not self.is_open:
+            raise OSError("port closed")
+        return bool(select.select([self.fd], [], [], timeout)[0])
+
+    def read(self, size: int = 1) -> bytes:
+        data = b""
+        deadline = None if self.timeout is None else time.perf_counter() + self.timeout
+        while len(data) < size:
+            remaining = None if deadline is None else max(0.0, deadline - time.perf_counter())
+            if not self._readable(remaining):
+                break
+            chunk = os.read(self.fd, size - len(data))
+            if not chunk:
+                # Readable but empty: the device side hung up (pyserial raises SerialException here)
+                raise OSError("device disconnected")
+            data += chunk
+        return data
+
+    def readline(self) -> bytes:
+        data = b""
+        while not data.endswith(b"\n"):
+            chunk = self.read(1)
+            if not chunk:
+                break
+            data += chunk
+        return data
+
+    def write(self, data: bytes) -> int:
+        if not self.is_open:
+            raise OSError("port closed")
+        if self.write_timeout is not None and not select.select([], [self.fd], [], self.write_timeout)[1]:
+            raise TimeoutError("write timeout")
+        return os.write(self.fd, data)
+
+    def close(self) -> None:
+        if self.is_open:
+            self.is_open = False
+            os.close(self.fd)
+
+
+class FakeArduino:
+    """
+    Device side of a pty pair: records every line the PC sends (with arrival time)
+    and can send lines back. send_ready() emulates the sketch's boot handshake.
+    """
+
+    def __init__(self) -> None:
+        self.master, slave = os.openpty()
+        tty.setraw(slave)
+        self.path = os.ttyname(slave)
+        self._slave = slave  # kept open so the pty survives PC-side reconnects
+        self.received: List[Tuple[float, bytes]] = []
+        self.bytes_received = 0
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="fake-arduino", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        framer = LineFramer()
+        while not self._stop.is_set():
+            if not select.select([self.master], [], [], 0.05)[0]:
+                continue
+            try:
+                data = os.read(self.master, 4096)
+            except OSError:
+                return
+            now = time.perf_counter()
+            with self._cond:
+                self.bytes_received += len(data)
+                for line in framer.feed(data):
+                    self.received.append((now, line))
+                self._cond.notify_all()
+
+    def send(self, data: bytes) -> float:
+        sent_at = time.perf_counter()
+        os.write(self.master, data)
+        return sent_at
+
+    def send_ready(self) -> None:
+        self.send(DEVICE_READY_LINE + b"\n")
+
+    def wait_for(self, predicate, start: int = 0, timeout: float = 2.0) -> Optional[Tuple[float, bytes]]:
+        # First received (time, line) at index >= start matching predicate(line)
+        deadline = time.perf_counter() + timeout
+        with self._cond:
+            while True:
+                for item in self.received[start:]:
+                    if predicate(item[1]):
+                        return item
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+
+    def clear(self) -> None:
+        # Forget received lines (long runs would otherwise keep every keep-alive)
+        with self._cond:
+            self.received.clear()
+
+    def close(self) -> None:
+        # Unplugs the device for good: the PC side sees a hang-up; safe to call twice
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._thread.join(timeout=1)
+        os.close(self.master)
+        os.close(self._slave)
+
+
+class Simulation:
+    """
+    Runs main.monitor_language_and_send in a thread against fake OS and serial backends:
+    FakeBackend + FakeLanguageSource for the keyboard, FakeArduino pty pairs for the devices.
+    main must have been imported with BOTEN_HOME pointing at a scratch directory.
+    """
+
+    def __init__(self, main, devices: int = 1, layouts: Optional[List[int]] = None, quiet: bool = True) -> None:
+        self.main = main
+        self.quiet = quiet
+        self.language_source = FakeLanguageSource()
+        self.backend = FakeBackend(layouts or [0x0409, 0x040D], language_source=self.language_source)
+        self.arduinos: List[FakeArduino] = [FakeArduino() for _ in range(devices)]
+        self.present: Dict[str, FakeArduino] = {a.path: a for a in self.arduinos}
+        self.ports: List[PtyPort] = []
+        self.stats: Dict[str, int] = {"iterations": 0}
+        self.stop_event = threading.Event()
+        self.output: Optional[io.StringIO] = None  # captured stdout when quiet
+        self._thread: Optional[threading.Thread] = None
+
+    def _enumerate(self):
+        return [
+            SimpleNamespace(device=path, description=self.main.ARDUINO_PORT_DESCRIPTION)
+            for path in self.present
+        ]
+
+    def _open(self, path: str) -> PtyPort:
+        if path not in self.present:
+            raise OSError(f"{path} is unplugged")
+        port = PtyPort(path, timeout=self.main.SERIAL_TIMEOUT)
+        self.ports.append(port)
+        self.present[path].send_ready()
+        return port
+
+    def _run(self) -> None:
+        sink = self.output = io.StringIO() if self.quiet else None
+        with contextlib.redirect_stdout(sink) if sink is not None else contextlib.nullcontext():
+            self.main.monitor_language_and_send(self.language_source, self.stop_event, self.stats)
+
+    def start(self) -> None:
+        self.main.os_backend = self.backend
+        self.main.port_registry._enumerator = self._enumerate
+        self.main.port_registry.notify_hotplug()
+        self.main._open_arduino_port = self._open
+        self._thread = threading.Thread(target=self._run, name="monitor", daemon=True)
+        self._thread.start()
+
+    def wait_connected(self, count: Optional[int] = None, timeout: float = 5.0) -> bool:
+        # True once `count` devices (default: all present) have received the first language frame
+        count = len(self.present) if count is None else count
+        deadline = time.perf_counter() + timeout
+        while time.perf_counter() < deadline:
+            ready = sum(1 for a in self.present.values() if any(b":" in line for _, line in a.received))
+            if ready >= count:
+                return True
+            time.sleep(0.01)
+        return False
+
+    def unplug(self, arduino: FakeArduino) -> None:
+        self.present.pop(arduino.path, None)
+        self.main.port_registry.notify_hotplug()
+
+    def replug(self, arduino: FakeArduino) -> None:
+        self.present[arduino.path] = arduino
+        self.main.port_registry.notify_hotplug()
+
+    def trim(self) -> None:
+        # Drop the harness's own history (closed ports, received lines, injection times) so long
+        # runs only measure what the monitor keeps
+        self.ports = [port for port in self.ports if port.is_open]
+        for arduino in self.arduinos:
+            arduino.clear()
+        del self.backend.injections[:]
+        del self.backend.activations[:]
+        if self.output is not None:
+            self.output.seek(0)
+            self.output.truncate()
+
+    def stop(self) -> None:
+        self.stop_event.set()
+        self.main.loop_wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        for arduino in self.arduinos:
+            arduino.close()
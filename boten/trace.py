@@ -0,0 +1,196 @@
+"""
+Compact append-only binary trace of serial traffic and language events, for turning
+field timing reports into replayable regression cases (see replay.py).
+
+Enable with BOTEN_TRACE=<path>. After a 5-byte header each record is:
+kind (1 byte), microseconds since the previous record (varint), payload length (varint), payload.
+"""
+from __future__ import annotations
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import BinaryIO, Callable, Dict, Iterator, NamedTuple, Optional
+
+TRACE_MAGIC = b"BTRC\x01"
+# Buffered records reach the file at least this often
+TRACE_FLUSH_INTERVAL = 1.0
+
+# Record kinds
+OPEN = 1        # payload: port id, port name
+SERIAL_IN = 2   # payload: port id, bytes read from the device
+SERIAL_OUT = 3  # payload: port id, bytes written to the device
+LANGID = 4      # payload: uint16 LANGID reported by the language source
+INJECT = 5      # no payload: Alt+Shift injected
+STATE = 6       # payload: state machine value entered
+
+KIND_NAMES = {OPEN: "open", SERIAL_IN: "in", SERIAL_OUT: "out", LANGID: "langid", INJECT: "inject", STATE: "state"}
+
+
+class TraceRecord(NamedTuple):
+    time: float  # seconds since the trace started
+    kind: int
+    port: int    # port id for OPEN/SERIAL_*, -1 otherwise
+    data: bytes  # port name for OPEN, bytes for SERIAL_*, raw payload otherwise
+
+
+def _varint(n: int) -> bytes:
+    out = bytearray()
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+    return bytes(out)
+
+
+class TraceRecorder:
+    """
+    Process-wide trace writer; every method is a no-op until start().
+    Records are written from any thread under one lock and flushed every TRACE_FLUSH_INTERVAL.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.records = 0
+        self._file: Optional[BinaryIO] = None
+        self._lock = threading.Lock()
+        self._clock: Callable[[], float] = time.perf_counter
+        self._last_us = 0
+        self._started = 0.0
+        self._next_flush = 0.0
+        self._ports: Dict[str, int] = {}
+
+    def start(self, path: Path, clock: Callable[[], float] = time.perf_counter) -> None:
+        self.stop()
+        self._file = open(path, "wb")
+        self._file.write(TRACE_MAGIC)
+        self._clock = clock
+        self._started = clock()
+        self._next_flush = self._started + TRACE_FLUSH_INTERVAL
+        self._last_us = 0
+        self._ports = {}
+        self.records = 0
+        self.enabled = True
+
+    def stop(self) -> None:
+        with self._lock:
+            self.enabled = False
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+
+    def _write(self, kind: int, payload: bytes = b"") -> None:
+        with self._lock:
+            if self._file is None:
+                return
+            now = self._clock()
+            elapsed_us = int((now - self._started) * 1_000_000)
+            delta = max(0, elapsed_us - self._last_us)
+            self._last_us += delta
+            self._file.write(bytes((kind,)) + _varint(delta) + _varint(len(payload)) + payload)
+            self.records += 1
+            if now >= self._next_flush:
+                self._next_flush = now + TRACE_FLUSH_INTERVAL
+                self._file.flush()
+
+    def open_port(self, port: str) -> int:
+        # Port ids are stable per name for the whole trace
+        port_id = self._ports.setdefault(port, len(self._ports) & 0xFF)
+        if self.enabled:
+            self._write(OPEN, bytes((port_id,)) + port.encode("utf-8"))
+        return port_id
+
+    def serial_in(self, port_id: int, data: bytes) -> None:
+        if self.enabled and data:
+            self._write(SERIAL_IN, bytes((port_id,)) + data)
+
+    def serial_out(self, port_id: int, data: bytes) -> None:
+        if self.enabled and data:
+            self._write(SERIAL_OUT, bytes((port_id,)) + data)
+
+    def langid(self, lang_id: int) -> None:
+        if self.enabled:
+            self._write(LANGID, struct.pack("<H", lang_id & 0xFFFF))
+
+    def inject(self) -> None:
+        if self.enabled:
+            self._write(INJECT)
+
+    def state(self, state: int) -> None:
+        if self.enabled:
+            self._write(STATE, bytes((state & 0xFF,)))
+
+
+class TracedPort:
+    """serial.Serial proxy that records every byte read and written; everything else passes through."""
+
+    def __init__(self, conn, port: str, trace: Optional[TraceRecorder] = None) -> None:
+        object.__setattr__(self, "_conn", conn)
+        object.__setattr__(self, "_trace", trace or recorder)
+        object.__setattr__(self, "_port_id", (trace or recorder).open_port(port))
+
+    def __getattr__(self, name: str):
+        return getattr(self._conn, name)
+
+    def __setattr__(self, name: str, value) -> None:
+        setattr(self._conn, name, value)
+
+    def read(self, size: int = 1) -> bytes:
+        data = self._conn.read(size)
+        self._trace.serial_in(self._port_id, data)
+        return data
+
+    def readline(self) -> bytes:
+        data = self._conn.readline()
+        self._trace.serial_in(self._port_id, data)
+        return data
+
+    def write(self, data: bytes) -> int:
+        n = self._conn.write(data)
+        self._trace.serial_out(self._port_id, data)
+        return n
+
+
+def read_trace(path: Path) -> Iterator[TraceRecord]:
+    data = Path(path).read_bytes()
+    if not data.startswith(TRACE_MAGIC):
+        raise ValueError(f"{path} is not a trace file")
+    pos = len(TRACE_MAGIC)
+    elapsed_us = 0
+
+    def varint() -> int:
+        nonlocal pos
+        value = shift = 0
+        while True:
+            byte = data[pos]
+            pos += 1
+            value |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return value
+            shift += 7
+
+    while pos < len(data):
+        try:
+            kind = data[pos]
+            pos += 1
+            elapsed_us += varint()
+            length = varint()
+        except IndexError:
+            return  # record cut short by a crash; everything before it is intact
+        payload = data[pos:pos + length]
+        if len(payload) < length:
+            return
+        pos += length
+        if kind in (OPEN, SERIAL_IN, SERIAL_OUT):
+            yield TraceRecord(elapsed_us / 1_000_000, kind, payload[0], payload[1:])
+        else:
+            yield TraceRecord(elapsed_us / 1_000_000, kind, -1, payload)
+
+
+# Shared by every module; main starts it when BOTEN_TRACE is set
+recorder = TraceRecorder()
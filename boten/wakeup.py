@@ -0,0 +1,33 @@
+from __future__ import annotations
+import threading
+import time
+from typing import Optional
+
+
+class Wakeup:
+    """
+    The one thing the idle monitor loop blocks on.
+    - set() may be called from any thread: language change, inbound command, device failure,
+      hotplug, layout-list change, stop.
+    - wait(timeout) returns at once if set() was called since the last wait, otherwise blocks
+      until set() or until timeout, which the loop sets to its next timer (keep-alive, refresh).
+    - wakeups counts returns from wait(); blocked is the total time spent waiting.
+    """
+
+    def __init__(self) -> None:
+        self._event = threading.Event()
+        self.wakeups = 0
+        self.blocked = 0.0
+
+    def set(self) -> None:
+        self._event.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        # True when woken by set(), False when the timeout (the next timer) expired
+        started = time.perf_counter()
+        fired = self._event.wait(timeout)
+        # Cleared before the caller looks at its sources, so a set() from now on is never lost
+        self._event.clear()
+        self.blocked += time.perf_counter() - started
+        self.wakeups += 1
+        return fired
@@ -0,0 +1,406 @@
+"""
+Windows implementations of the OS backend, language source and IPC server.
+Only imported by create_backend()/create_language_source()/create_ipc_server() on win32.
+"""
+from __future__ import annotations
+import ctypes
+import queue
+import threading
+import time
+from typing import Callable, List, Optional, Set
+
+from .instrumentation import metrics
+from .ipc import MAX_REQUEST_BYTES, SUBSCRIBER_QUEUE, IpcServer
+from .language_source import LanguageSource
+from .os_backend import BUF_LEN, HOTKEY_HOLD, LOCALE_SENGLISHDISPLAYNAME, OsBackend
+
+# Shell hook notifications (RegisterShellHookWindow)
+HSHELL_WINDOWACTIVATED = 4
+HSHELL_LANGUAGE = 8
+HSHELL_RUDEAPPACTIVATED = 0x8004
+
+# WinEvent hook for foreground window changes
+EVENT_SYSTEM_FOREGROUND = 0x0003
+WINEVENT_OUTOFCONTEXT = 0x0000
+
+WM_DEVICECHANGE = 0x0219
+WM_SETTINGCHANGE = 0x001A
+WM_INPUTLANGCHANGEREQUEST = 0x0050
+WM_QUIT = 0x0012
+QS_ALLINPUT = 0x04FF
+WAIT_OBJECT_0 = 0x00000000
+WAIT_TIMEOUT = 0x00000102
+
+# CreateNamedPipe: fails with ERROR_ACCESS_DENIED if the pipe name already has an instance,
+# i.e. another monitor serves it
+FILE_FLAG_FIRST_PIPE_INSTANCE = 0x00080000
+ERROR_ACCESS_DENIED = 5
+ERROR_PIPE_CONNECTED = 535
+
+# Installed keyboard layouts (Preload, Substitutes) live under this HKCU key; adding, removing or
+# reordering layouts rewrites it. A hidden window never gets WM_INPUTLANGCHANGE (only the focused
+# window's thread does), so the registry change notification is the layout-list signal.
+KEYBOARD_LAYOUT_KEY = "Keyboard Layout"
+
+# Safety net: some windows (consoles, elevated apps) never broadcast HSHELL_LANGUAGE,
+# so the hook thread re-samples the layout at this interval. The main loop is only
+# woken when the sampled value actually differs.
+LANGUAGE_RESAMPLE_INTERVAL = 1.0
+
+
+class WindowsBackend(OsBackend):
+    """WinAPI implementation; the DLLs and pywin32 are only loaded when this is constructed."""
+
+    def __init__(self) -> None:
+        from ctypes import wintypes
+
+        self.user32 = ctypes.WinDLL("user32", use_last_error=True)
+        self.kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+
+        # Signatures
+        self.user32.GetKeyboardLayoutList.argtypes = [wintypes.INT, ctypes.POINTER(ctypes.c_void_p)]
+        self.user32.GetKeyboardLayoutList.restype  = wintypes.UINT
+
+        self.user32.GetForegroundWindow.restype = wintypes.HWND
+        self.user32.PostMessageW.argtypes = [wintypes.HWND, wintypes.UINT, wintypes.WPARAM, wintypes.LPARAM]
+        self.user32.PostMessageW.restype  = wintypes.BOOL
+
+        self.kernel32.LCIDToLocaleName.argtypes = [wintypes.LCID, wintypes.LPWSTR, ctypes.c_int, wintypes.DWORD]
+        self.kernel32.LCIDToLocaleName.restype  = ctypes.c_int
+
+        self.kernel32.GetLocaleInfoEx.argtypes = [wintypes.LPCWSTR, wintypes.DWORD, wintypes.LPWSTR, ctypes.c_int]
+        self.kernel32.GetLocaleInfoEx.restype  = ctypes.c_int
+
+    def _layout_handles(self) -> List[int]:
+        count = self.user32.GetKeyboardLayoutList(0, None)
+        arr_type = ctypes.c_void_p * count
+        arr = arr_type()
+        self.user32.GetKeyboardLayoutList(count, arr)
+        return [int(hkl or 0) for hkl in arr]
+
+    def installed_langids(self) -> List[int]:
+        # GetKeyboardLayoutList order, which Alt+Shift cycles in; one entry per LANGID
+        return list(dict.fromkeys(hkl & 0xFFFF for hkl in self._layout_handles()))
+
+    def lcid_to_locale_name(self, lcid: int) -> str:
+        buf = ctypes.create_unicode_buffer(BUF_LEN)
+        n = self.kernel32.LCIDToLocaleName(lcid, buf, BUF_LEN, 0)
+        return buf.value if n > 0 else ""
+
+    def locale_info(self, locale_name: str, field: int) -> str:
+        buf = ctypes.create_unicode_buffer(BUF_LEN)
+        n = self.kernel32.GetLocaleInfoEx(locale_name, field, buf, BUF_LEN)
+        return buf.value if n > 0 else ""
+
+    def display_name(self, lang_id: int) -> str:
+        buf = ctypes.create_unicode_buffer(BUF_LEN)
+        if self.kernel32.GetLocaleInfoW(lang_id, LOCALE_SENGLISHDISPLAYNAME, buf, BUF_LEN) > 0:
+            return buf.value
+        return ""
+
+    def foreground_langid(self) -> int:
+        import win32gui
+        import win32process
+
+        hwnd = win32gui.GetForegroundWindow()
+        thread_id = win32process.GetWindowThreadProcessId(hwnd)[0]
+        layout_id = self.user32.GetKeyboardLayout(thread_id)
+        return layout_id & 0xFFFF
+
+    def press_language_hotkey(self) -> None:
+        import win32api
+
+        # Press Alt+Shift
+        win32api.keybd_event(0x12, 0, 0, 0)  # Alt
+        win32api.keybd_event(0x10, 0, 0, 0)  # Shift
+        time.sleep(HOTKEY_HOLD)
+        win32api.keybd_event(0x10, 0, 2, 0)  # Shift up
+        win32api.keybd_event(0x12, 0, 2, 0)  # Alt up
+
+    def activate_layout(self, lang_id: int) -> bool:
+        # ActivateKeyboardLayout only affects the calling thread, so ask the foreground window to switch
+        hkl = next((h for h in self._layout_handles() if h & 0xFFFF == lang_id), None)
+        hwnd = self.user32.GetForegroundWindow()
+        if hkl is None or not hwnd:
+            return False
+        return bool(self.user32.PostMessageW(hwnd, WM_INPUTLANGCHANGEREQUEST, 0, hkl))
+
+
+class WindowsLanguageSource(LanguageSource):
+    """
+    Event-driven source backed by a hidden shell-hook window.
+    - HSHELL_LANGUAGE fires on input language changes.
+    - HSHELL_WINDOWACTIVATED and EVENT_SYSTEM_FOREGROUND fire on foreground changes.
+    The layout is sampled on those events only; WM_DEVICECHANGE is forwarded to on_device_change.
+    Changes under HKCU\\Keyboard Layout (layouts added, removed or reordered) and WM_SETTINGCHANGE
+    are forwarded to on_layouts_change.
+    """
+
+    signals_layout_changes = True
+
+    def __init__(
+        self,
+        on_device_change: Optional[Callable[[], None]] = None,
+        on_layouts_change: Optional[Callable[[], None]] = None,
+    ) -> None:
+        super().__init__()
+        self.on_device_change = on_device_change
+        self.on_layouts_change = on_layouts_change
+        self._thread: Optional[threading.Thread] = None
+        self._thread_id = 0
+        self._ready = threading.Event()
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="language-source", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        ctypes.WinDLL("user32").PostThreadMessageW(self._thread_id, WM_QUIT, 0, 0)
+        self._thread.join(timeout=1)
+        self._thread = None
+
+    def _sample(self) -> None:
+        hwnd = self._user32.GetForegroundWindow()
+        thread_id = self._user32.GetWindowThreadProcessId(hwnd, None)
+        layout_id = self._user32.GetKeyboardLayout(thread_id)
+        self._publish((layout_id or 0) & 0xFFFF)
+
+    def _run(self) -> None:
+        import win32api
+        import win32con
+        import win32event
+        import win32gui
+        from ctypes import wintypes
+
+        user32 = ctypes.WinDLL("user32", use_last_error=True)
+        user32.GetForegroundWindow.restype = wintypes.HWND
+        user32.GetWindowThreadProcessId.argtypes = [wintypes.HWND, ctypes.POINTER(wintypes.DWORD)]
+        user32.GetWindowThreadProcessId.restype = wintypes.DWORD
+        user32.GetKeyboardLayout.argtypes = [wintypes.DWORD]
+        user32.GetKeyboardLayout.restype = ctypes.c_void_p
+        self._user32 = user32
+        self._thread_id = win32api.GetCurrentThreadId()
+
+        shell_hook_msg = win32gui.RegisterWindowMessage("SHELLHOOK")
+
+        def wnd_proc(hwnd, msg, wparam, lparam):
+            if msg == shell_hook_msg:
+                if wparam in (HSHELL_LANGUAGE, HSHELL_WINDOWACTIVATED, HSHELL_RUDEAPPACTIVATED):
+                    self._sample()
+                return 0
+            if msg == WM_DEVICECHANGE:
+                if self.on_device_change is not None:
+                    self.on_device_change()
+                return 1
+            if msg == WM_SETTINGCHANGE and self.on_layouts_change is not None:
+                self.on_layouts_change()
+            return win32gui.DefWindowProc(hwnd, msg, wparam, lparam)
+
+        wc = win32gui.WNDCLASS()
+        wc.lpszClassName = "BotenLanguageSource"
+        wc.lpfnWndProc = wnd_proc
+        wc.hInstance = win32api.GetModuleHandle(None)
+        win32gui.RegisterClass(wc)
+        # Shell hooks are only delivered to top-level windows, so this one is created hidden
+        hwnd = win32gui.CreateWindow(wc.lpszClassName, "", 0, 0, 0, 0, 0, 0, 0, wc.hInstance, None)
+        user32.RegisterShellHookWindow(hwnd)
+
+        WinEventProc = ctypes.WINFUNCTYPE(
+            None, wintypes.HANDLE, wintypes.DWORD, wintypes.HWND,
+            wintypes.LONG, wintypes.LONG, wintypes.DWORD, wintypes.DWORD,
+        )
+        # Keep a reference for the lifetime of the hook
+        self._win_event_proc = WinEventProc(lambda *args: self._sample())
+        hook = user32.SetWinEventHook(
+            EVENT_SYSTEM_FOREGROUND, EVENT_SYSTEM_FOREGROUND, 0,
+            self._win_event_proc, 0, 0, WINEVENT_OUTOFCONTEXT,
+        )
+
+        # Auto-reset event signalled by the registry; the notification is one-shot, so it is re-armed
+        layouts_key = win32api.RegOpenKeyEx(win32con.HKEY_CURRENT_USER, KEYBOARD_LAYOUT_KEY, 0, win32con.KEY_NOTIFY)
+        layouts_changed = win32event.CreateEvent(None, False, False, None)
+        notify_filter = win32con.REG_NOTIFY_CHANGE_NAME | win32con.REG_NOTIFY_CHANGE_LAST_SET
+
+        def watch_layouts() -> None:
+            win32api.RegNotifyChangeKeyValue(layouts_key, True, notify_filter, layouts_changed, True)
+
+        watch_layouts()
+        handles = (wintypes.HANDLE * 1)(int(layouts_changed))
+
+        self._sample()
+        self._ready.set()
+
+        timeout_ms = int(LANGUAGE_RESAMPLE_INTERVAL * 1000)
+        try:
+            while True:
+                rc = user32.MsgWaitForMultipleObjects(1, handles, False, timeout_ms, QS_ALLINPUT)
+                if rc == WAIT_TIMEOUT:
+                    self._sample()
+                    continue
+                if rc == WAIT_OBJECT_0:
+                    watch_layouts()
+                    if self.on_layouts_change is not None:
+                        self.on_layouts_change()
+                    continue
+                # PumpWaitingMessages returns non-zero once WM_QUIT was received
+                if win32gui.PumpWaitingMessages():
+                    break
+        finally:
+            layouts_changed.Close()
+            layouts_key.Close()
+            user32.UnhookWinEvent(hook)
+            user32.DeregisterShellHookWindow(hwnd)
+            win32gui.DestroyWindow(hwnd)
+            win32gui.UnregisterClass(wc.lpszClassName, wc.hInstance)
+
+
+class _PipeClient:
+    def __init__(self, handle) -> None:
+        self.handle = handle
+        self.queue: "queue.Queue[Optional[bytes]]" = queue.Queue()
+        self.dropped = False
+
+
+class PipeIpcServer(IpcServer):
+    """
+    Named-pipe transport: an accept thread plus one thread per connected client.
+    publish() only puts the shared encoded event on each subscriber's queue; a subscriber
+    whose queue is full is dropped, so a stuck client never blocks the monitor loop.
+    """
+
+    def __init__(self, path: str, queue_size: int = SUBSCRIBER_QUEUE) -> None:
+        super().__init__(path, queue_size)
+        self._lock = threading.Lock()
+        self._subscribers: Set[_PipeClient] = set()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = False
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscribers)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        # Created here, so a second monitor fails at start like the Unix server does
+        try:
+            first = self._create_instance(first=True)
+        except Exception as e:
+            if getattr(e, "winerror", None) == ERROR_ACCESS_DENIED:
+                raise OSError(f"{self.path} is served by another monitor") from e
+            raise OSError(f"cannot create {self.path} - {e}") from e
+        self._stop = False
+        self._thread = threading.Thread(target=self._accept_loop, args=(first,), name="ipc-server", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        import win32file
+
+        thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._stop = True
+        # Unblock ConnectNamedPipe with a throwaway connection
+        try:
+            win32file.CloseHandle(win32file.CreateFile(
+                self.path, win32file.GENERIC_READ, 0, None, win32file.OPEN_EXISTING, 0, None))
+        except Exception:
+            pass
+        thread.join(timeout=1)
+        with self._lock:
+            subscribers, self._subscribers = self._subscribers, set()
+        for client in subscribers:
+            client.queue.put(None)
+
+    def _broadcast(self, data: bytes) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for client in subscribers:
+            if client.queue.qsize() >= self.queue_size:
+                self._drop(client)
+            else:
+                client.queue.put_nowait(data)
+
+    def _drop(self, client: _PipeClient) -> None:
+        with self._lock:
+            if client not in self._subscribers:
+                return
+            self._subscribers.discard(client)
+        self.dropped += 1
+        metrics.count("ipc.dropped")
+        client.dropped = True
+        client.queue.put(None)
+
+    def _create_instance(self, first: bool = False):
+        import win32pipe
+
+        return win32pipe.CreateNamedPipe(
+            self.path,
+            win32pipe.PIPE_ACCESS_DUPLEX | (FILE_FLAG_FIRST_PIPE_INSTANCE if first else 0),
+            win32pipe.PIPE_TYPE_BYTE | win32pipe.PIPE_READMODE_BYTE | win32pipe.PIPE_WAIT
+            | win32pipe.PIPE_REJECT_REMOTE_CLIENTS,
+            win32pipe.PIPE_UNLIMITED_INSTANCES, 65536, 65536, 0, None,
+        )
+
+    def _accept_loop(self, handle) -> None:
+        import win32pipe
+
+        while not self._stop:
+            if handle is None:
+                handle = self._create_instance()
+            try:
+                win32pipe.ConnectNamedPipe(handle, None)
+            except Exception as e:
+                # ERROR_PIPE_CONNECTED: the client connected between create and connect
+                if getattr(e, "winerror", None) != ERROR_PIPE_CONNECTED:
+                    handle.Close()
+                    handle = None
+                    continue
+            if self._stop:
+                handle.Close()
+                return
+            threading.Thread(target=self._serve, args=(_PipeClient(handle),), name="ipc-client", daemon=True).start()
+            handle = None
+        if handle is not None:
+            handle.Close()
+
+    def _serve(self, client: _PipeClient) -> None:
+        import win32file
+        import win32pipe
+
+        try:
+            inbuf = b""
+            while True:
+                _, data = win32file.ReadFile(client.handle, 4096)
+                inbuf += data
+                while b"\n" in inbuf:
+                    line, _, inbuf = inbuf.partition(b"\n")
+                    reply = self._request(line)
+                    if reply is None:
+                        # Subscribed: from here on this thread only writes
+                        with self._lock:
+                            self._subscribers.add(client)
+                        win32file.WriteFile(client.handle, self._state)
+                        while True:
+                            event = client.queue.get()
+                            if event is None:
+                                return
+                            win32file.WriteFile(client.handle, event)
+                    win32file.WriteFile(client.handle, reply)
+                if len(inbuf) > MAX_REQUEST_BYTES:
+                    return
+        except Exception:
+            pass  # client went away
+        finally:
+            with self._lock:
+                self._subscribers.discard(client)
+            try:
+                win32pipe.DisconnectNamedPipe(client.handle)
+            except Exception:
+                pass
+            client.handle.Close()
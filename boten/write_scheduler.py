@@ -0,0 +1,89 @@
+from __future__ import annotations
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Optional, Tuple
+
+# Frame kinds, in priority order
+LANGUAGE = 0
+CONTROL = 1
+KEEP_ALIVE = 2
+
+# Control frames waiting for one device; when full the oldest is dropped
+CONTROL_QUEUE_SIZE = 16
+
+
+class WriteScheduler:
+    """
+    Outbound slots for one device, drained by its writer thread.
+    - LANGUAGE: a single slot; a newer frame supersedes one that was not written yet.
+    - CONTROL: bounded FIFO for frames that must all go out.
+    - KEEP_ALIVE: a single slot, and skipped entirely when a language or control frame was
+      written in the last keep_alive_interval (the device already knows the link is alive).
+    next() hands out the highest-priority pending frame.
+    """
+
+    def __init__(self, keep_alive_interval: float, clock: Callable[[], float] = time.monotonic) -> None:
+        self.keep_alive_interval = keep_alive_interval
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._language: Optional[bytes] = None
+        self._control: Deque[bytes] = deque(maxlen=CONTROL_QUEUE_SIZE)
+        self._keep_alive: Optional[bytes] = None
+        self.last_sent = float("-inf")
+        self.superseded = 0
+        self.suppressed = 0
+        self.control_dropped = 0
+
+    def submit(self, frame: bytes, kind: int = CONTROL) -> None:
+        with self._cond:
+            if kind == LANGUAGE:
+                if self._language is not None:
+                    self.superseded += 1
+                self._language = frame
+            elif kind == KEEP_ALIVE:
+                if self._clock() - self.last_sent < self.keep_alive_interval or self._keep_alive is not None:
+                    self.suppressed += 1
+                    return
+                self._keep_alive = frame
+            else:
+                if len(self._control) == self._control.maxlen:
+                    self.control_dropped += 1
+                self._control.append(frame)
+            self._cond.notify()
+
+    def _pop(self) -> Optional[Tuple[int, bytes]]:
+        if self._language is not None:
+            frame, self._language = self._language, None
+            return LANGUAGE, frame
+        if self._control:
+            return CONTROL, self._control.popleft()
+        if self._keep_alive is not None:
+            frame, self._keep_alive = self._keep_alive, None
+            return KEEP_ALIVE, frame
+        return None
+
+    def next(self, timeout: float) -> Optional[Tuple[int, bytes]]:
+        # (kind, frame) of the most important pending frame, or None after timeout
+        with self._cond:
+            item = self._pop()
+            if item is None and self._cond.wait(timeout):
+                item = self._pop()
+            return item
+
+    def requeue(self, kind: int, frame: bytes) -> None:
+        # Put back a language frame whose write timed out, unless a newer one already arrived
+        if kind != LANGUAGE:
+            return
+        with self._cond:
+            if self._language is None:
+                self._language = frame
+
+    def sent(self, kind: int = CONTROL) -> None:
+        # Only real traffic makes a keep-alive redundant; a keep-alive must not suppress the next one
+        if kind != KEEP_ALIVE:
+            self.last_sent = self._clock()
+
+    def pending(self) -> int:
+        with self._cond:
+            return (self._language is not None) + len(self._control) + (self._keep_alive is not None)
@@ -0,0 +1,333 @@
+"""
+Soak test: runs the real monitor loop for a long time against the pty-based fake Arduino
+and fake keyboard backends, with timers accelerated, while injecting unplug/replug cycles,
+installed-layout churn and toggle bursts. Samples RSS, tracemalloc, per-type object counts,
+open file descriptors, threads and loop-pass intervals, and fails when any of them grows
+past its threshold. The JSON report can be compared across releases like bench.py's.
+
+    python soak.py --minutes 30 --output soak.json
+    python soak.py --minutes 5 --compare soak.json
+"""
+from __future__ import annotations
+import argparse
+import collections
+import contextlib
+import gc
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from typing import Dict, List, Optional
+
+from bench import compare, git_commit, percentile
+
+# Timers are divided by this, so one soak minute covers SPEEDUP minutes of keep-alives,
+# mapping refreshes, write-behind flushes and reconnect backoff
+SPEEDUP = 20.0
+# Growth allowed between the post-warm-up baseline and the last sample
+MAX_RSS_GROWTH_MB = 8.0
+MAX_OBJECT_GROWTH = 1000   # per type
+MAX_FD_GROWTH = 2          # a reconnect in progress may hold one extra port
+MAX_THREAD_GROWTH = 2
+MAX_LOOP_GAP_MS = 500.0    # backoff waits are RECONNECT_POLL (100 ms) per pass
+TOP_ALLOCATIONS = 10
+
+
+class _LineCounter(io.TextIOBase):
+    """stdout replacement for long runs: counts log lines and keeps none of them."""
+
+    def __init__(self) -> None:
+        self.lines = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        self.lines += text.count("\n")
+        return len(text)
+
+
+def rss_bytes() -> int:
+    # Current resident set size; peak RSS where /proc is not available
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def open_fds() -> int:
+    for path in ("/proc/self/fd", "/dev/fd"):
+        try:
+            return len(os.listdir(path))
+        except OSError:
+            continue
+    return -1
+
+
+def object_counts() -> Dict[str, int]:
+    gc.collect()
+    return dict(collections.Counter(type(o).__qualname__ for o in gc.get_objects()))
+
+
+class LoopWatcher:
+    """
+    Polls the loop's pass counter and records the interval between passes, less the time the
+    loop spent blocked waiting for an event (an idle loop passes only on events and timers).
+    """
+
+    def __init__(self, stats: Dict[str, int], poll: float = 0.001) -> None:
+        self.stats = stats
+        self.poll = poll
+        self.gaps: List[float] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="soak-watcher", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join(timeout=1)
+
+    def take(self) -> List[float]:
+        with self._lock:
+            gaps, self.gaps = self.gaps, []
+        return gaps
+
+    def _run(self) -> None:
+        iterations = self.stats.get("iterations", 0)
+        blocked = self.stats.get("blocked", 0.0)
+        last = time.perf_counter()
+        while not self._stop.wait(self.poll):
+            current = self.stats.get("iterations", 0)
+            if current != iterations:
+                now = time.perf_counter()
+                current_blocked = self.stats.get("blocked", 0.0)
+                busy = max(0.0, now - last - (current_blocked - blocked))
+                with self._lock:
+                    self.gaps.append(busy / max(1, current - iterations))
+                iterations, blocked, last = current, current_blocked, now
+
+
+def accelerate(main, speedup: float) -> None:
+    from boten import color_allocator
+
+    main.KEEP_ALIVE_TIMER = main.KEEP_ALIVE_TIMER / speedup
+    main.LANG_MAPPING_CHANGE_TIMER = main.LANG_MAPPING_CHANGE_TIMER / speedup
+    main.port_registry.ttl = main.port_registry.ttl / speedup
+    main.reconnect.base = main.reconnect.base / speedup
+    main.reconnect.cap = main.reconnect.cap / speedup
+    main.color_allocator.flush_delay = main.color_allocator.flush_delay / speedup
+    color_allocator.RECENCY_FLUSH_DELAY = color_allocator.RECENCY_FLUSH_DELAY / speedup
+
+
+class Churn:
+    """The injected workload: step() runs one cycle; counts holds what was injected."""
+
+    def __init__(self, sim, rng: random.Random, pool: List[int]) -> None:
+        self.sim = sim
+        self.rng = rng
+        self.pool = pool
+        self.counts = collections.Counter()
+
+    def step(self, cycle: int) -> None:
+        sim, rng = self.sim, self.rng
+        arduino = sim.arduinos[0]
+        backend = sim.backend
+        # Toggle burst from the device
+        arduino.send(b"LANGUAGE_TOGGLE\n" * rng.randint(1, 5))
+        self.counts["toggles"] += 1
+        # Foreground window switches to another installed layout
+        sim.language_source.set_langid(rng.choice(backend.installed))
+        self.counts["language_changes"] += 1
+        if cycle % 5 == 4:
+            # Layout churn: install one, uninstall another, keeping 2..8 installed
+            missing = [lang_id for lang_id in self.pool if lang_id not in backend.installed]
+            if missing and len(backend.installed) < 8:
+                backend.installed.append(rng.choice(missing))
+            if len(backend.installed) > 2 and rng.random() < 0.6:
+                removed = rng.choice([i for i in backend.installed if i != backend.current])
+                backend.installed.remove(removed)
+            sim.main.installed_languages.mark_changed()
+            self.counts["layout_churn"] += 1
+        if cycle % 7 == 6:
+            sim.unplug(arduino)
+            time.sleep(0.05 + rng.random() * 0.2)
+            start = len(arduino.received)
+            sim.replug(arduino)
+            if arduino.wait_for(lambda line: b":" in line, start=start, timeout=5.0) is None:
+                self.counts["replug_timeouts"] += 1
+            self.counts["replugs"] += 1
+
+
+def sample(elapsed: float, watcher: LoopWatcher, sink: _LineCounter, sim) -> Dict[str, object]:
+    gaps = watcher.take()
+    traced, _ = tracemalloc.get_traced_memory()
+    return {
+        "elapsed_s": round(elapsed, 1),
+        "rss_bytes": rss_bytes(),
+        "traced_bytes": traced,
+        "fds": open_fds(),
+        "threads": threading.active_count(),
+        "objects": sum(object_counts().values()),
+        "loop_passes": len(gaps),
+        "loop_gap_p50_ms": round(percentile(gaps, 50) * 1000, 3),
+        "loop_gap_p99_ms": round(percentile(gaps, 99) * 1000, 3),
+        "loop_gap_max_ms": round(max(gaps) * 1000, 3) if gaps else float("nan"),
+        "log_lines": sink.lines,
+        "iterations": sim.stats["iterations"],
+    }
+
+
+def soak(minutes: float, warmup: float = 30.0, interval: float = 10.0, cycle: float = 0.25,
+         speedup: float = SPEEDUP, seed: int = 1) -> Dict[str, object]:
+    # main reads BOTEN_HOME at import time, so the scratch directory must be set first
+    os.environ["BOTEN_HOME"] = tempfile.mkdtemp(prefix="boten-soak-")
+    os.environ.pop("BOTEN_TRACE", None)
+    from boten import main
+    from boten.language_map import LANGUAGE_MAP
+    from boten.simulation import Simulation
+
+    rng = random.Random(seed)
+    accelerate(main, speedup)
+    tracemalloc.start()
+    sink = _LineCounter()
+    sim = Simulation(main, devices=1, layouts=[0x0409, 0x040D, 0x0419], quiet=False)
+    churn = Churn(sim, rng, list(LANGUAGE_MAP)[:40])
+    watcher = LoopWatcher(sim.stats)
+    samples: List[Dict[str, object]] = []
+    baseline_objects: Dict[str, int] = {}
+    baseline_snapshot = None
+    with contextlib.redirect_stdout(sink):
+        sim.start()
+        if not sim.wait_connected():
+            raise RuntimeError("simulated device never received a language frame")
+        watcher.start()
+        started = time.perf_counter()
+        next_sample = started + warmup
+        end = started + warmup + minutes * 60
+        cycles = 0
+        try:
+            while time.perf_counter() < end:
+                churn.step(cycles)
+                cycles += 1
+                time.sleep(cycle)
+                now = time.perf_counter()
+                if now < next_sample:
+                    continue
+                next_sample = now + interval
+                # Sampled while connected, so open ports and threads are comparable
+                sim.trim()
+                sim.wait_connected(timeout=2.0)
+                time.sleep(cycle)
+                samples.append(sample(now - started, watcher, sink, sim))
+                if baseline_snapshot is None:
+                    baseline_objects = object_counts()
+                    baseline_snapshot = tracemalloc.take_snapshot()
+            # Final sample under the same conditions as the others
+            sim.trim()
+            sim.wait_connected(timeout=2.0)
+            time.sleep(cycle)
+            samples.append(sample(time.perf_counter() - started, watcher, sink, sim))
+            final_objects = object_counts()
+            final_snapshot = tracemalloc.take_snapshot()
+        finally:
+            watcher.stop()
+            sim.stop()
+            tracemalloc.stop()
+
+    first, last = samples[0], samples[-1]
+    growth = {
+        name: final_objects.get(name, 0) - count
+        for name, count in baseline_objects.items()
+    }
+    growth.update({name: count for name, count in final_objects.items() if name not in baseline_objects})
+    top_growth = sorted(((n, g) for n, g in growth.items() if g > 0), key=lambda item: -item[1])[:TOP_ALLOCATIONS]
+    allocations = [
+        {"where": str(stat.traceback[0]), "size_diff": stat.size_diff, "count_diff": stat.count_diff}
+        for stat in final_snapshot.compare_to(baseline_snapshot, "lineno")[:TOP_ALLOCATIONS]
+        if stat.size_diff > 0
+    ]
+    worst_gap = max(s["loop_gap_max_ms"] for s in samples[1:] or samples)
+    hours = (last["elapsed_s"] - first["elapsed_s"]) / 3600 or float("nan")
+    metrics = {
+        "soak_minutes": minutes,
+        "simulated_minutes": round(minutes * speedup, 1),
+        "cycles": cycles,
+        **{f"injected_{name}": count for name, count in sorted(churn.counts.items())},
+        "rss_growth_mb": round((last["rss_bytes"] - first["rss_bytes"]) / 2**20, 3),
+        "traced_growth_kb": round((last["traced_bytes"] - first["traced_bytes"]) / 1024, 1),
+        "fd_growth": last["fds"] - first["fds"],
+        "thread_growth": last["threads"] - first["threads"],
+        "object_growth": last["objects"] - first["objects"],
+        "max_type_growth": top_growth[0][1] if top_growth else 0,
+        "loop_gap_p50_ms": percentile([s["loop_gap_p50_ms"] for s in samples], 50),
+        "loop_gap_p99_ms": max(s["loop_gap_p99_ms"] for s in samples),
+        "loop_gap_max_ms": worst_gap,
+        "log_lines_per_sim_hour": round((last["log_lines"] - first["log_lines"]) / hours / speedup, 1),
+    }
+    failures = []
+    if metrics["rss_growth_mb"] > MAX_RSS_GROWTH_MB:
+        failures.append(f"RSS grew {metrics['rss_growth_mb']} MB (limit {MAX_RSS_GROWTH_MB})")
+    for name, count in top_growth:
+        if count > MAX_OBJECT_GROWTH:
+            failures.append(f"{name} objects grew by {count} (limit {MAX_OBJECT_GROWTH})")
+    if metrics["fd_growth"] > MAX_FD_GROWTH:
+        failures.append(f"open file descriptors grew by {metrics['fd_growth']} (limit {MAX_FD_GROWTH})")
+    if metrics["thread_growth"] > MAX_THREAD_GROWTH:
+        failures.append(f"threads grew by {metrics['thread_growth']} (limit {MAX_THREAD_GROWTH})")
+    if worst_gap > MAX_LOOP_GAP_MS:
+        failures.append(f"loop pass took {worst_gap} ms (limit {MAX_LOOP_GAP_MS})")
+    if churn.counts["replug_timeouts"]:
+        failures.append(f"{churn.counts['replug_timeouts']} replugs never got a language frame")
+    return {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "config": {"minutes": minutes, "warmup_s": warmup, "interval_s": interval, "cycle_s": cycle,
+                   "speedup": speedup, "seed": seed},
+        "metrics": metrics,
+        "failures": failures,
+        "top_type_growth": dict(top_growth),
+        "top_allocation_growth": allocations,
+        "samples": samples,
+    }
+
+
+def main_cli(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--minutes", type=float, default=10.0, help="soak length after warm-up")
+    parser.add_argument("--warmup", type=float, default=30.0, help="seconds before the baseline sample")
+    parser.add_argument("--interval", type=float, default=10.0, help="seconds between samples")
+    parser.add_argument("--speedup", type=float, default=SPEEDUP, help="timer acceleration factor")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write the report as JSON to this file")
+    parser.add_argument("--compare", help="earlier report to compare against")
+    args = parser.parse_args(argv)
+
+    report = soak(args.minutes, args.warmup, args.interval, speedup=args.speedup, seed=args.seed)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            print(compare(json.load(f), report))
+    else:
+        print(json.dumps({k: report[k] for k in ("metrics", "failures", "top_type_growth")}, indent=2))
+    for failure in report["failures"]:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    return 1 if report["failures"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,6 @@
+import os
+import tempfile
+
+# boten.main reads BOTEN_HOME at import time; every test that imports it shares this scratch directory
+os.environ["BOTEN_HOME"] = tempfile.mkdtemp(prefix="boten-test-")
+os.environ["BOTEN_IPC"] = "0"
@@ -0,0 +1,143 @@
+import time
+
+import pytest
+
+from boten.acks import AckTracker
+from boten.device_sim import SimulatedDevice
+from boten.fanout import DeviceHub
+from boten.protocol import FLAG_RESYNC, FrameDecoder, encode_language, negotiate
+from boten.write_scheduler import LANGUAGE
+
+POOL = ["Red"]
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def decode(frame: bytes):
+    return FrameDecoder().feed(frame)[0]
+
+
+def language(langid: int) -> bytes:
+    return encode_language(langid, 0, f"L{langid:x}")
+
+
+def test_outstanding_frame_is_resent_with_backoff_until_acked():
+    clock = FakeClock()
+    # Binary fractions, so the fake clock lands exactly on each deadline
+    acks = AckTracker(timeout=0.125, max_timeout=0.5, clock=clock)
+    frame = acks.stamp(language(0x0409))
+    assert acks.due() is None  # not written yet
+    acks.sent(frame)
+    for backoff in (0.125, 0.25, 0.5, 0.5):
+        clock.now += backoff - 1 / 64
+        assert acks.due() is None
+        clock.now += 1 / 64
+        assert acks.due() is frame
+        acks.sent(frame)
+    assert acks.retransmits == 4
+    assert acks.ack(decode(frame).seq)
+    clock.now += 10
+    assert acks.due() is None
+    assert not acks.outstanding
+
+
+def test_stale_and_duplicate_acks_are_ignored():
+    acks = AckTracker(clock=FakeClock())
+    first = decode(acks.stamp(language(0x0409))).seq
+    second = decode(acks.stamp(language(0x040D))).seq
+    assert not acks.ack(first)  # the superseded frame
+    assert acks.outstanding
+    assert acks.ack(second)
+    assert not acks.ack(second)  # a duplicate, e.g. for a retransmit
+    assert acks.acked == 1 and acks.stale_acks == 2 and acks.last_acked == second
+
+
+def test_frames_carry_resync_until_the_first_ack():
+    acks = AckTracker(clock=FakeClock())
+    first = decode(acks.stamp(language(0x0409)))
+    superseding = decode(acks.stamp(language(0x040D)))
+    assert first.flags & FLAG_RESYNC and superseding.flags & FLAG_RESYNC
+    acks.ack(superseding.seq)
+    assert not decode(acks.stamp(language(0x0419))).flags & FLAG_RESYNC
+    # A new connection has a new tracker, so it starts with resync again
+    assert decode(AckTracker().stamp(language(0x0419))).flags & FLAG_RESYNC
+
+
+def broadcast(hub: DeviceHub, langid: int) -> None:
+    hub.broadcast(lambda codec: codec.language(langid, "Red", f"Red:L{langid:x}"), LANGUAGE)
+
+
+def wait_acked(link, timeout: float = 5.0) -> bool:
+    deadline = time.perf_counter() + timeout
+    while link.acks.outstanding:
+        if time.perf_counter() >= deadline:
+            return False
+        time.sleep(0.001)
+    return True
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_lossy_link_converges_without_regressions(seed):
+    device = SimulatedDevice("SIM", loss=0.3, ack_loss=0.1, duplicate=0.3, ack_latency=0.001, seed=seed)
+    hub = DeviceHub()
+    try:
+        hub.add(device.port, device, negotiate(device, POOL))
+        link = hub.links[device.port]
+        for langid in range(0x0400, 0x040A):
+            broadcast(hub, langid)
+            assert device.wait_for(langid, 5.0) is not None
+            assert wait_acked(link)
+        assert device.lost + device.acks_lost > 0
+        assert link.acks.retransmits > 0
+        assert device.regressions() == 0
+    finally:
+        hub.close()
+
+
+def test_duplicates_are_acked_but_not_applied_again():
+    device = SimulatedDevice("SIM", duplicate=1.0, seed=4)
+    hub = DeviceHub()
+    try:
+        hub.add(device.port, device, negotiate(device, POOL))
+        for langid in (0x0409, 0x040D, 0x0419):
+            broadcast(hub, langid)
+            assert device.wait_for(langid, 2.0) is not None
+            assert wait_acked(hub.links[device.port])
+        # A resync frame is taken whatever its seq, so only the duplicates after it are rejected
+        assert device.rejected == 2
+        assert [shown.langid for shown in device.shown if not shown.resync] == [0x040D, 0x0419]
+        assert device.regressions() == 0
+        assert hub.links[device.port].acks.stale_acks == 3
+    finally:
+        hub.close()
+
+
+def test_reconnect_takes_exactly_one_resync_frame():
+    device = SimulatedDevice("SIM", ack_latency=0.001, seed=5)
+    hub = DeviceHub()
+    try:
+        hub.add(device.port, device, negotiate(device, POOL))
+        for langid in (0x0409, 0x040D):
+            broadcast(hub, langid)
+            assert device.wait_for(langid, 2.0) is not None
+        assert wait_acked(hub.links[device.port])
+        # Away while the PC moves on: the device keeps the seq of the last state it saw
+        hub.remove(device.port)
+        for langid in (0x0419, 0x0407, 0x040C):
+            broadcast(hub, langid)
+        device.reconnect()
+        hub.add(device.port, device, negotiate(device, POOL))
+        assert device.wait_for(0x040C, 2.0) is not None
+        assert wait_acked(hub.links[device.port])
+        time.sleep(0.05)
+        assert device.since_reconnect == 1
+        assert device.shown[-1].resync
+        assert device.regressions() == 0
+    finally:
+        hub.close()
@@ -0,0 +1,60 @@
+import json
+
+from boten.color_allocator import ColorAllocator
+
+POOL = ["Red", "Green", "Blue"]
+
+
+def test_released_color_is_reused(tmp_path):
+    allocator = ColorAllocator(tmp_path / "colors.json", POOL)
+    assert [allocator.allocate(lcid) for lcid in (0x0409, 0x040D, 0x0419)] == POOL
+    assert allocator.release(0x040D)
+    # The freed color is the only free one, so the next new layout gets it
+    assert allocator.allocate(0x0407) == "Green"
+    assert allocator.mapping() == {"1033": "Red", "1031": "Green", "1049": "Blue"}
+
+
+def test_lowest_free_color_is_reused_first(tmp_path):
+    allocator = ColorAllocator(tmp_path / "colors.json", POOL)
+    for lcid in (1, 2, 3):
+        allocator.allocate(lcid)
+    allocator.release(3)
+    allocator.release(1)
+    assert allocator.allocate(4) == "Red"
+    assert allocator.allocate(5) == "Blue"
+
+
+def test_int_and_str_ids_are_the_same_key(tmp_path):
+    allocator = ColorAllocator(tmp_path / "colors.json", POOL)
+    color = allocator.allocate(0x0409)
+    assert allocator.allocate("1033") == color
+    # release() gets string ids from the mapping file
+    assert allocator.release("1033")
+    assert not allocator.release(0x0409)
+
+
+def test_reuse_survives_a_reload(tmp_path):
+    path = tmp_path / "colors.json"
+    allocator = ColorAllocator(path, POOL)
+    with allocator.transaction():
+        for lcid in (1, 2, 3):
+            allocator.allocate(lcid)
+        allocator.release(2)
+    reloaded = ColorAllocator(path, POOL)
+    assert reloaded.allocate(4) == "Green"
+
+
+def test_old_format_is_read_and_converted(tmp_path):
+    path = tmp_path / "colors.json"
+    old = {"1033": "Green", "1037": "Red", "1049": None}
+    path.write_text(json.dumps(old), encoding="utf-8")
+    allocator = ColorAllocator(path, POOL)
+    assert allocator.mapping() == old
+
+    # Converted on load, without waiting for a mutation to be flushed
+    state = json.loads(path.read_text(encoding="utf-8"))
+    assert state["colors"] == old
+    # Ids from the old file were never seen, so they are the least recent, in file order
+    assert list(state["last_seen"]) == ["1033", "1037", "1049"]
+    assert ColorAllocator(path, POOL).mapping() == old
+    assert allocator.allocate(0x0407) == "Blue"
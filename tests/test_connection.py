@@ -0,0 +1,57 @@
+import time
+
+from boten.connection import ConnectionManager, FakeSerialPort
+
+
+class VanishingPort(FakeSerialPort):
+    # Opens, then fails on the first read, as an adapter unplugged mid-handshake does
+    def readline(self) -> bytes:
+        raise OSError("device disconnected")
+
+
+def opener(ports):
+    def open_port(name: str):
+        return ports[name]
+    return open_port
+
+
+def test_port_failing_during_the_handshake_is_closed_and_not_handed_out():
+    ports = {"COM3": VanishingPort("COM3"), "COM4": FakeSerialPort("COM4", boot_delay=0.05)}
+    manager = ConnectionManager(opener(ports), boot_timeout=0.5)
+    winner, results = manager.connect(["COM3", "COM4"])
+    assert winner.port == "COM4" and winner.handshake
+    failed = next(r for r in results if r.port == "COM3")
+    assert failed.status == "Busy or Unavailable"
+    assert failed.conn is None
+    assert not ports["COM3"].is_open
+
+
+def test_connect_all_skips_a_port_failing_during_the_handshake():
+    ports = {"COM3": VanishingPort("COM3"), "COM4": FakeSerialPort("COM4")}
+    manager = ConnectionManager(opener(ports), boot_timeout=0.5)
+    assert [r.port for r in manager.connect_all(["COM3", "COM4"])] == ["COM4"]
+    assert not ports["COM3"].is_open
+
+
+def test_connect_all_yields_the_fastest_device_first():
+    ports = {
+        "COM3": FakeSerialPort("COM3", boot_delay=0.6),
+        "COM4": FakeSerialPort("COM4", boot_delay=0.05),
+        "COM5": FakeSerialPort("COM5", handshake=False),
+    }
+    manager = ConnectionManager(opener(ports), boot_timeout=1.0)
+    started = time.perf_counter()
+    arrivals = [(r.port, time.perf_counter() - started) for r in manager.connect_all(["COM3", "COM4", "COM5"])]
+    assert [port for port, _ in arrivals] == ["COM4", "COM3", "COM5"]
+    # Not held back by the slower device or by the one without a handshake
+    assert arrivals[0][1] < 0.3
+
+
+def test_connect_all_stopped_early_closes_the_ports_it_did_not_hand_out():
+    ports = {"COM3": FakeSerialPort("COM3", boot_delay=0.05), "COM4": FakeSerialPort("COM4", handshake=False)}
+    manager = ConnectionManager(opener(ports), boot_timeout=1.0)
+    results = manager.connect_all(["COM3", "COM4"])
+    assert next(results).port == "COM3"
+    results.close()
+    assert ports["COM3"].is_open
+    assert not ports["COM4"].is_open
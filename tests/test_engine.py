@@ -0,0 +1,181 @@
+import asyncio
+
+from boten.engine import AsyncEngine, MemoryTransport
+from boten.language_source import FakeLanguageSource
+from boten.protocol import FLAG_RESYNC, OP_STATE, AckedBinaryCodec, FrameDecoder
+
+POOL = ["Red", "Green", "Blue"]
+
+
+def run(coro):
+    return asyncio.run(asyncio.wait_for(coro, 5.0))
+
+
+def states(transport: MemoryTransport) -> list:
+    decoder = FrameDecoder()
+    frames = [frame for data in transport.written for frame in decoder.feed(data)]
+    return [frame for frame in frames if frame.opcode == OP_STATE]
+
+
+def acked_engine(transport: MemoryTransport, source: FakeLanguageSource) -> AsyncEngine:
+    codec = AckedBinaryCodec(POOL)
+
+    def frame_of(lang_id: int):
+        return f"Red:{lang_id:04X}", codec.language(lang_id, "Red", f"Red:{lang_id:04X}")
+
+    # Keep-alives far apart, so only state frames and their retransmits are written
+    return AsyncEngine(transport, source, frame_of, lambda: None, keep_alive_interval=60.0, codec=codec)
+
+
+async def until(predicate, timeout: float = 2.0) -> bool:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        if asyncio.get_running_loop().time() >= deadline:
+            return False
+        await asyncio.sleep(0.005)
+    return True
+
+
+def test_acked_protocol_resends_until_acked():
+    transport = MemoryTransport()
+    engine = acked_engine(transport, FakeLanguageSource(0x0409))
+
+    async def scenario():
+        task = asyncio.create_task(engine.run())
+        assert await until(lambda: len(states(transport)) >= 2)
+        first = states(transport)[0]
+        assert first.flags & FLAG_RESYNC and first.langid == 0x0409
+        assert all(frame.seq == first.seq for frame in states(transport))
+        transport.feed(f"ACK {first.seq}".encode("ascii"))
+        assert await until(lambda: not engine.acks.outstanding)
+        sent = len(transport.written)
+        await asyncio.sleep(0.4)
+        transport.close()
+        await task
+        return sent
+
+    sent = run(scenario())
+    # Nothing more once acked
+    assert len(transport.written) == sent
+    assert engine.acks.acked == 1
+    assert engine.acks.retransmits >= 1
+
+
+def test_acked_protocol_ignores_a_stale_ack_and_stamps_the_next_change():
+    transport = MemoryTransport()
+    source = FakeLanguageSource(0x0409)
+    engine = acked_engine(transport, source)
+
+    async def scenario():
+        task = asyncio.create_task(engine.run())
+        assert await until(lambda: states(transport))
+        first = states(transport)[0]
+        transport.feed(f"ACK {first.seq}".encode("ascii"))
+        assert await until(lambda: not engine.acks.outstanding)
+        source.set_langid(0x040D)
+        assert await until(lambda: states(transport)[-1].langid == 0x040D)
+        second = states(transport)[-1]
+        transport.feed(f"ACK {first.seq}".encode("ascii"))
+        await asyncio.sleep(0.05)
+        outstanding = engine.acks.outstanding
+        transport.close()
+        await task
+        return first, second, outstanding
+
+    first, second, outstanding = run(scenario())
+    assert second.seq == first.seq + 1
+    # Resync is only needed until the device acked once on this connection
+    assert not second.flags & FLAG_RESYNC
+    assert outstanding
+    assert engine.acks.stale_acks == 1
+
+
+class StallingTransport(MemoryTransport):
+    # Writes block while `flowing` is clear, as on a device that stopped reading its USB buffer
+    def __init__(self) -> None:
+        super().__init__()
+        self.flowing = asyncio.Event()
+        self.flowing.set()
+
+    async def write(self, data: bytes) -> None:
+        await self.flowing.wait()
+        await super().write(data)
+
+
+def test_engine_sends_the_current_language_changes_and_keep_alives():
+    transport = MemoryTransport()
+    source = FakeLanguageSource(0x0409)
+    engine = AsyncEngine(
+        transport, source, lambda lang_id: (f"Red:{lang_id:04X}", f"Red:{lang_id:04X}\n".encode()),
+        lambda: None, keep_alive_interval=0.05,
+    )
+
+    async def scenario():
+        task = asyncio.create_task(engine.run())
+        assert await until(lambda: b"Red:0409\n" in transport.written)
+        source.set_langid(0x040D)
+        source.set_langid(0x040D)  # unchanged: not sent again
+        assert await until(lambda: b"Red:040D\n" in transport.written)
+        await asyncio.sleep(0.2)
+        transport.close()
+        await task
+
+    run(scenario())
+    languages = [data for data in transport.written if data != b"KEEP_ALIVE\n"]
+    assert languages == [b"Red:0409\n", b"Red:040D\n"]
+    assert transport.written.count(b"KEEP_ALIVE\n") >= 3
+
+
+def test_engine_handles_toggle_and_select_lines():
+    transport = MemoryTransport()
+    source = FakeLanguageSource(0x0409)
+    selected = []
+    engine = AsyncEngine(
+        transport, source, lambda lang_id: (f"{lang_id:04X}", b"x\n"), lambda: 0x040D,
+        keep_alive_interval=60.0, on_select=lambda index: selected.append(index) or 0x0419,
+    )
+
+    async def scenario():
+        task = asyncio.create_task(engine.run())
+        await until(lambda: transport.written)
+        transport.feed(b"LANGUAGE_TOGGLE")
+        assert await until(lambda: source.current() == 0x040D)
+        transport.feed(b"SELECT_LAYOUT 2")
+        assert await until(lambda: source.current() == 0x0419)
+        transport.feed(b"garbage")  # ignored
+        transport.close()
+        await task
+
+    run(scenario())
+    assert selected == [2]
+
+
+def test_reader_and_watcher_keep_running_while_the_transport_is_stalled():
+    transport = StallingTransport()
+    source = FakeLanguageSource(0x0409)
+    toggled = []
+    engine = AsyncEngine(
+        transport, source, lambda lang_id: (f"Red:{lang_id:04X}", f"Red:{lang_id:04X}\n".encode()),
+        lambda: toggled.append(True), keep_alive_interval=0.05,
+    )
+
+    async def scenario():
+        task = asyncio.create_task(engine.run())
+        assert await until(lambda: b"Red:0409\n" in transport.written)
+        transport.flowing.clear()
+        queued = engine.outbound.qsize()
+        transport.feed(b"LANGUAGE_TOGGLE")
+        assert await until(lambda: toggled)
+        source.set_langid(0x040D)
+        assert await until(lambda: engine.last_lang == "Red:040D")
+        await asyncio.sleep(0.3)
+        # Keep-alives kept being produced on schedule although nothing could be written
+        produced = engine.outbound.qsize() - queued
+        transport.flowing.set()
+        assert await until(lambda: b"Red:040D\n" in transport.written)
+        transport.close()
+        await task
+        return produced
+
+    assert run(scenario()) >= 5
+    assert toggled == [True]
@@ -0,0 +1,68 @@
+import time
+
+import pytest
+
+from boten import main
+from boten.connection import FakeSerialPort
+from boten.fanout import DeviceHub
+
+
+class FixedPorts:
+    # Stands in for the DeviceRegistry: these ports are always enumerated
+    def __init__(self, ports) -> None:
+        self.ports = list(ports)
+
+    def refresh(self, force: bool = False) -> None:
+        pass
+
+    def devices(self):
+        return list(self.ports)
+
+    def describe(self, device: str) -> str:
+        return "Arduino Leonardo"
+
+
+class GonePort(FakeSerialPort):
+    # Passed the probe, then unplugged: reconfiguring it fails as pyserial's SerialException does
+    @property
+    def write_timeout(self):
+        return None
+
+    @write_timeout.setter
+    def write_timeout(self, value) -> None:
+        if value is not None:
+            raise OSError("device reports readiness to read but returned no data")
+
+
+@pytest.fixture
+def hub(monkeypatch):
+    def use(ports):
+        monkeypatch.setattr(main, "port_registry", FixedPorts(ports))
+        monkeypatch.setattr(main, "_open_port", lambda name: ports[name])
+        return hub
+
+    hub = DeviceHub()
+    hub.use = use
+    yield hub
+    hub.close()
+
+
+def test_first_device_gets_the_language_before_the_slowest_is_ready(hub):
+    ports = {"COM3": FakeSerialPort("COM3", boot_delay=0.6), "COM4": FakeSerialPort("COM4", boot_delay=0.05)}
+    hub.use(ports)
+    started = time.perf_counter()
+    assert main.establish_devices(hub, 0x0409) == "Available"
+    expected = main.language_frames.get(0x0409)[1]
+    assert ports["COM4"].write_times[ports["COM4"].written.index(expected)] - started < 0.3
+    deadline = time.perf_counter() + 1.0
+    while expected not in ports["COM3"].written and time.perf_counter() < deadline:
+        time.sleep(0.001)
+    assert ports["COM3"].written.count(expected) == 1
+
+
+def test_device_lost_before_it_reaches_the_hub_is_skipped(hub):
+    ports = {"COM3": GonePort("COM3"), "COM4": FakeSerialPort("COM4")}
+    hub.use(ports)
+    assert main.establish_devices(hub) == "Available"
+    assert hub.ports() == ["COM4"]
+    assert not ports["COM3"].is_open
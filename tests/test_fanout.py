@@ -0,0 +1,93 @@
+import time
+
+import pytest
+
+from boten.connection import FakeSerialPort
+from boten.fanout import DeviceHub
+from boten.protocol import TextCodec
+from boten.write_scheduler import LANGUAGE
+
+PORTS = ("COM3", "COM4", "COM5")
+
+
+def wait_until(predicate, timeout: float = 2.0) -> bool:
+    deadline = time.perf_counter() + timeout
+    while not predicate():
+        if time.perf_counter() >= deadline:
+            return False
+        time.sleep(0.001)
+    return True
+
+
+def frame(text: str):
+    return lambda codec: f"{text}\n".encode("utf-8")
+
+
+@pytest.fixture
+def hub():
+    events = []
+    hub = DeviceHub(on_event=lambda: events.append(time.perf_counter()))
+    hub.events = events
+    hub.fakes = {}
+    for port in PORTS:
+        fake = FakeSerialPort(port, handshake=False)
+        hub.fakes[port] = fake
+        hub.add(port, fake, TextCodec())
+    yield hub
+    hub.close()
+
+
+def test_broadcast_reaches_every_device(hub):
+    hub.broadcast(frame("Red:Eng (United States)"), LANGUAGE)
+    for fake in hub.fakes.values():
+        assert wait_until(lambda: b"Red:Eng (United States)\n" in fake.written)
+
+
+def test_commands_from_every_device_are_merged(hub):
+    for fake in hub.fakes.values():
+        fake.feed(b"LANGUAGE_TOGGLE\n")
+    commands = [hub.get_command(timeout=2.0) for _ in PORTS]
+    assert commands == ["LANGUAGE_TOGGLE"] * len(PORTS)
+    assert hub.events
+
+
+def test_a_failed_device_does_not_stop_the_others(hub):
+    hub.fakes["COM4"].close()
+    hub.broadcast(frame("Blue:Heb (Israel)"), LANGUAGE)
+    assert wait_until(lambda: not hub.links["COM4"].healthy)
+    assert hub.events
+    for port in ("COM3", "COM5"):
+        assert wait_until(lambda: b"Blue:Heb (Israel)\n" in hub.fakes[port].written)
+        assert hub.links[port].healthy
+
+    assert hub.prune(lambda port: True) == ["COM4"]
+    hub.broadcast(frame("Red:Eng (United States)"), LANGUAGE)
+    for port in ("COM3", "COM5"):
+        assert wait_until(lambda: b"Red:Eng (United States)\n" in hub.fakes[port].written)
+
+
+def test_removed_device_stops_receiving_while_the_others_continue(hub):
+    hub.broadcast(frame("Red:Eng (United States)"), LANGUAGE)
+    assert wait_until(lambda: all(fake.written for fake in hub.fakes.values()))
+    hub.remove("COM3")
+    assert hub.ports() == ["COM4", "COM5"]
+    removed = list(hub.fakes["COM3"].written)
+
+    hub.broadcast(frame("Blue:Heb (Israel)"), LANGUAGE)
+    for port in ("COM4", "COM5"):
+        assert wait_until(lambda: b"Blue:Heb (Israel)\n" in hub.fakes[port].written)
+    assert hub.fakes["COM3"].written == removed
+
+
+def test_device_added_later_gets_only_the_latest_state(hub):
+    hub.broadcast(frame("Red:Eng (United States)"), LANGUAGE)
+    hub.broadcast(frame("Blue:Heb (Israel)"), LANGUAGE)
+    assert wait_until(lambda: all(b"Blue:Heb (Israel)\n" in fake.written for fake in hub.fakes.values()))
+    sent = {port: len(fake.written) for port, fake in hub.fakes.items()}
+
+    late = FakeSerialPort("COM6", handshake=False)
+    hub.add("COM6", late, TextCodec())
+    assert wait_until(lambda: late.written)
+    time.sleep(0.05)
+    assert late.written == [b"Blue:Heb (Israel)\n"]
+    assert {port: len(fake.written) for port, fake in hub.fakes.items()} == sent
@@ -0,0 +1,36 @@
+import sys
+
+import pytest
+
+from boten import ipc
+from boten.ipc import UnixIpcServer, query_state
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="Unix socket server")
+
+
+def test_server_creates_a_missing_data_directory(tmp_path):
+    path = tmp_path / "first-run" / "Boten" / "boten.sock"
+    server = UnixIpcServer(str(path))
+    server.start()
+    try:
+        server.publish({"langid": 0x0409, "color": "Red", "text": "Red:Eng (United States)"})
+        assert query_state(str(path))["langid"] == 0x0409
+    finally:
+        server.stop()
+
+
+def test_second_server_refuses_a_served_socket(tmp_path):
+    path = str(tmp_path / "boten.sock")
+    server = UnixIpcServer(path)
+    server.start()
+    try:
+        with pytest.raises(OSError, match="served by another monitor"):
+            UnixIpcServer(path).start()
+    finally:
+        server.stop()
+
+
+def test_default_pipe_name_is_per_user_and_session(monkeypatch, tmp_path):
+    monkeypatch.setattr(ipc.sys, "platform", "win32")
+    monkeypatch.setattr(ipc, "_logon_session", lambda: "alice-2")
+    assert ipc.default_ipc_path(tmp_path) == r"\\.\pipe\boten-alice-2"
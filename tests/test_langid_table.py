@@ -0,0 +1,48 @@
+import pytest
+
+from boten.frame_cache import format_language_text
+from boten.langid_table import langid_table
+from boten.language_map import COUNTRY_NAMES, LANGUAGE_MAP, LANGUAGE_NAMES
+
+# GetLocaleInfoEx(name, LOCALE_SENGLISHDISPLAYNAME) on Windows 10/11
+WINAPI_DISPLAY_NAMES = {
+    0x0409: "English (United States)",
+    0x0809: "English (United Kingdom)",
+    0x040D: "Hebrew (Israel)",
+    0x0419: "Russian (Russia)",
+    0x0407: "German (Germany)",
+    0x040C: "French (France)",
+    0x0C0A: "Spanish (Spain)",
+    0x0410: "Italian (Italy)",
+    0x0401: "Arabic (Saudi Arabia)",
+    0x0411: "Japanese (Japan)",
+    0x0412: "Korean (Korea)",
+    0x0415: "Polish (Poland)",
+    0x0416: "Portuguese (Brazil)",
+    0x0422: "Ukrainian (Ukraine)",
+    0x041F: "Turkish (Türkiye)",
+    0x0408: "Greek (Greece)",
+}
+
+
+@pytest.mark.parametrize("lang_id, winapi", sorted(WINAPI_DISPLAY_NAMES.items()))
+def test_table_display_name_matches_winapi(lang_id, winapi):
+    assert langid_table().display_name(lang_id) == winapi
+
+
+@pytest.mark.parametrize("lang_id, winapi", sorted(WINAPI_DISPLAY_NAMES.items()))
+def test_table_and_winapi_names_format_identically(lang_id, winapi):
+    table = format_language_text(langid_table().display_name(lang_id), "Red")
+    assert table.encode("utf-8") == format_language_text(winapi, "Red").encode("utf-8")
+
+
+def test_every_language_code_has_a_name():
+    codes = {label.partition(" ")[0] for label in LANGUAGE_MAP.values()}
+    assert codes <= set(LANGUAGE_NAMES)
+
+
+def test_truncated_countries_are_shown_in_full():
+    for lang_id, label in LANGUAGE_MAP.items():
+        country = label.partition(" ")[2]
+        if len(label) == 16 and country in COUNTRY_NAMES:
+            assert langid_table().display_name(lang_id).endswith(f"({COUNTRY_NAMES[country]})")
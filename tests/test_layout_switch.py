@@ -0,0 +1,45 @@
+from boten.installed_languages import InstalledLanguages
+from boten.layout_switch import LayoutSwitcher
+from boten.os_backend import FakeBackend
+
+# GetKeyboardLayoutList order: Hebrew was added first, then US English (twice: two keyboards), then Russian
+LAYOUT_LIST = [0x040D, 0x0409, 0x0409, 0x0419]
+CYCLE = [0x040D, 0x0409, 0x0419]
+
+
+def switcher(layouts=LAYOUT_LIST) -> LayoutSwitcher:
+    return LayoutSwitcher(lambda: layouts, lambda lang_id: True)
+
+
+def test_layouts_keep_os_order_without_duplicates():
+    assert switcher().layouts() == CYCLE
+    assert FakeBackend(LAYOUT_LIST).installed_langids() == CYCLE
+
+
+def test_targets_follow_the_hotkey_cycle():
+    layouts = switcher()
+    assert layouts.target(0x040D) == 0x0409
+    assert layouts.target(0x0419) == 0x040D
+    assert layouts.target(0x0409, steps=2) == 0x040D
+    assert [layouts.layout_at(i) for i in range(3)] == CYCLE
+
+
+def test_steps_match_the_presses_the_os_needs():
+    backend = FakeBackend(LAYOUT_LIST, hotkey_hold=0)
+    layouts = switcher()
+    for index, target in enumerate(CYCLE):
+        for start in CYCLE:
+            backend.current = start
+            for _ in range(layouts.steps_to(start, index)):
+                backend.press_language_hotkey()
+            assert backend.current == target
+
+
+def test_installed_languages_keep_os_order_and_notice_a_reorder():
+    layouts = list(LAYOUT_LIST)
+    installed = InstalledLanguages(lambda: layouts, lambda lang_id: "")
+    installed.poll()
+    assert installed.installed() == CYCLE
+    layouts.reverse()
+    assert installed.poll() == (set(), set())
+    assert installed.installed() == [0x0419, 0x0409, 0x040D]
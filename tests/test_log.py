@@ -0,0 +1,40 @@
+import contextlib
+import io
+
+from boten.log import Logger, StreamSink
+
+
+class ListSink:
+    def __init__(self) -> None:
+        self.lines = []
+
+    def write(self, text: str) -> None:
+        self.lines += text.splitlines()
+
+    def close(self) -> None:
+        pass
+
+
+def test_flush_writes_collapsed_repeats():
+    sink = ListSink()
+    logger = Logger(sinks=[sink], repeat_limit=2, repeat_window=60.0)
+    for _ in range(10):
+        logger.info("Language changed to: %s", "Red:Eng (United States)")
+    assert logger.flush()
+    assert len(sink.lines) == 3
+    assert sink.lines[-1].endswith("Language changed to: Red:Eng (United States) ×8")
+    logger.stop()
+
+
+def test_repeats_do_not_leak_past_a_redirected_stdout():
+    logger = Logger(sinks=[StreamSink()], repeat_limit=1, repeat_window=60.0)
+    captured, after = io.StringIO(), io.StringIO()
+    with contextlib.redirect_stdout(captured):
+        for _ in range(5):
+            logger.info("NEW Language Sent to Arduino")
+        logger.flush()
+    with contextlib.redirect_stdout(after):
+        logger.stop()
+    assert captured.getvalue().count("\n") == 2
+    assert "×4" in captured.getvalue()
+    assert after.getvalue() == ""
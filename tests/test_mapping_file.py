@@ -0,0 +1,20 @@
+import os
+
+import pytest
+
+from boten import main
+from boten.os_backend import FakeBackend
+
+
+def test_mapping_file_is_replaced_atomically(monkeypatch):
+    monkeypatch.setattr(main, "os_backend", FakeBackend([0x0409]))
+    main.save_language_color_mapping_if_changed()
+    before = main.OUTPUT_PATH.read_text(encoding="utf-8")
+    assert before.startswith("1033:English (United States):")
+
+    # A crash between writing and renaming leaves the previous file whole
+    monkeypatch.setattr(main, "os_backend", FakeBackend([0x0409, 0x040D]))
+    monkeypatch.setattr(os, "replace", lambda src, dst: (_ for _ in ()).throw(OSError("crash")))
+    with pytest.raises(OSError):
+        main.save_language_color_mapping_if_changed()
+    assert main.OUTPUT_PATH.read_text(encoding="utf-8") == before
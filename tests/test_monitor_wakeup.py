@@ -0,0 +1,56 @@
+import time
+
+import pytest
+
+# The polling loop passed ~100 times/s while idle and took ~10 ms from a change to its frame
+MAX_IDLE_PASSES_PER_S = 10
+MAX_DISPATCH_P50_S = 0.005
+
+
+@pytest.fixture(scope="module")
+def sim():
+    from boten import main
+    from boten.simulation import Simulation
+
+    simulation = Simulation(main)
+    simulation.start()
+    assert simulation.wait_connected()
+    yield simulation
+    simulation.stop()
+
+
+def test_idle_loop_blocks_instead_of_polling(sim):
+    time.sleep(0.5)
+    iterations = sim.stats["iterations"]
+    started = time.perf_counter()
+    time.sleep(2.0)
+    rate = (sim.stats["iterations"] - iterations) / (time.perf_counter() - started)
+    assert rate <= MAX_IDLE_PASSES_PER_S
+
+
+def test_language_change_is_dispatched_without_waiting_for_a_poll(sim):
+    arduino = sim.arduinos[0]
+    latencies = []
+    for i in range(20):
+        langid = (0x040D, 0x0409)[i % 2]
+        expected = sim.main.language_frames.get(langid)[0].encode("utf-8")
+        start = len(arduino.received)
+        changed_at = time.perf_counter()
+        sim.language_source.set_langid(langid)
+        received = arduino.wait_for(lambda line: line.startswith(expected), start=start, timeout=2.0)
+        assert received is not None
+        latencies.append(received[0] - changed_at)
+        time.sleep(0.05)
+    latencies.sort()
+    assert latencies[len(latencies) // 2] < MAX_DISPATCH_P50_S
+
+
+def test_inbound_command_wakes_the_idle_loop(sim):
+    injections = len(sim.backend.injections)
+    sent_at = sim.arduinos[0].send(b"LANGUAGE_TOGGLE\n")
+    deadline = time.perf_counter() + 2.0
+    while len(sim.backend.injections) == injections and time.perf_counter() < deadline:
+        time.sleep(0.0005)
+    assert len(sim.backend.injections) > injections
+    # Well under the 1 s keep-alive timer, so the command did not wait for the next timeout
+    assert sim.backend.injections[injections] - sent_at < 0.1
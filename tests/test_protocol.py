@@ -0,0 +1,141 @@
+import random
+
+import pytest
+
+from boten.langid_table import langid_table
+from boten.language_map import LANGUAGE_MAP
+from boten.protocol import (
+    FLAG_RESYNC,
+    MAX_LABEL_BYTES,
+    OP_ACK,
+    OP_KEEP_ALIVE,
+    OP_LANGUAGE,
+    OP_SELECT_LAYOUT,
+    OP_STATE,
+    OP_TOGGLE,
+    AckedBinaryCodec,
+    BinaryCodec,
+    BinaryFramer,
+    Frame,
+    FrameDecoder,
+    encode_ack,
+    encode_language,
+    encode_state,
+)
+
+POOL = ["Red", "Green", "Blue", "White", "Cyan", "Yellow", "Magenta"]
+
+
+def decode(data: bytes, chunk_sizes=None):
+    decoder = FrameDecoder()
+    if chunk_sizes is None:
+        return decoder.feed(data), decoder
+    frames, pos = [], 0
+    for size in chunk_sizes:
+        frames += decoder.feed(data[pos:pos + size])
+        pos += size
+    return frames + decoder.feed(data[pos:]), decoder
+
+
+@pytest.mark.parametrize("color", [None, *POOL])
+def test_every_language_frame_round_trips(color):
+    codec = BinaryCodec(POOL)
+    for langid in LANGUAGE_MAP:
+        label = langid_table().label(langid)
+        (frame,), decoder = decode(codec.language(langid, color, "ignored"))
+        assert (frame.opcode, frame.langid) == (OP_LANGUAGE, langid)
+        assert frame.color_index == (None if color is None else POOL.index(color))
+        # Labels with multi-byte characters may be cut to MAX_LABEL_BYTES, never mid-character
+        if len(label.encode("utf-8")) <= MAX_LABEL_BYTES:
+            assert frame.label == label
+        else:
+            assert label.startswith(frame.label) and len(frame.label.encode("utf-8")) <= MAX_LABEL_BYTES
+        assert decoder.errors == 0
+
+
+def test_labels_are_truncated_on_a_character_boundary():
+    label = "FR Côte d’Ivoire ünïcødé"
+    frame = encode_language(0x300C, 0, label)
+    (decoded,), _ = decode(frame)
+    assert len(decoded.label.encode("utf-8")) <= MAX_LABEL_BYTES
+    assert label.startswith(decoded.label)
+    assert "�" not in decoded.label
+
+
+def test_control_state_and_ack_frames_round_trip():
+    codec = AckedBinaryCodec(POOL)
+    language = codec.language(0x040D, "White", "White:Heb (Israel)")
+    stream = b"".join([
+        codec.keep_alive(),
+        bytes((OP_TOGGLE,)),
+        bytes((OP_SELECT_LAYOUT, 3)),
+        encode_state(0xFFFF, language, FLAG_RESYNC),
+        encode_ack(0xFFFF),
+    ])
+    frames, decoder = decode(stream)
+    assert [f.opcode for f in frames] == [OP_KEEP_ALIVE, OP_TOGGLE, OP_SELECT_LAYOUT, OP_STATE, OP_ACK]
+    assert frames[2].layout_index == 3
+    assert (frames[3].langid, frames[3].color_index, frames[3].seq, frames[3].flags) == (0x040D, 3, 0xFFFF, FLAG_RESYNC)
+    assert frames[4].seq == 0xFFFF
+    assert decoder.errors == 0
+
+
+def test_framer_turns_device_frames_into_command_lines():
+    acks = []
+    framer = BinaryFramer(on_ack=acks.append)
+    lines = framer.feed(bytes((OP_TOGGLE, OP_SELECT_LAYOUT, 2)) + encode_ack(7) + bytes((OP_KEEP_ALIVE,)))
+    assert lines == [b"LANGUAGE_TOGGLE", b"SELECT_LAYOUT 2", b"KEEP_ALIVE"]
+    assert acks == [7]
+
+
+def random_chunks(rng: random.Random, length: int):
+    sizes = []
+    while sum(sizes) < length:
+        sizes.append(rng.randint(1, 8))
+    return sizes
+
+
+def test_fuzz_valid_streams_decode_the_same_in_any_chunking():
+    rng = random.Random(7)
+    codec = AckedBinaryCodec(POOL)
+    langids = list(LANGUAGE_MAP)
+    for _ in range(200):
+        parts, expected = [], 0
+        for _ in range(rng.randint(1, 20)):
+            kind = rng.randrange(5)
+            if kind == 0:
+                parts.append(bytes((rng.choice((OP_KEEP_ALIVE, OP_TOGGLE)),)))
+            elif kind == 1:
+                parts.append(bytes((OP_SELECT_LAYOUT, rng.randrange(256))))
+            elif kind == 2:
+                parts.append(encode_ack(rng.randrange(0x10000)))
+            else:
+                language = codec.language(rng.choice(langids), rng.choice([None, *POOL]), "")
+                parts.append(language if kind == 3 else encode_state(rng.randrange(0x10000), language))
+            expected += 1
+        stream = b"".join(parts)
+        whole, _ = decode(stream)
+        chunked, decoder = decode(stream, random_chunks(rng, len(stream)))
+        assert len(whole) == expected
+        assert chunked == whole
+        assert decoder.errors == 0
+
+
+def test_fuzz_garbage_never_raises_or_grows_the_buffer():
+    rng = random.Random(11)
+    for _ in range(500):
+        garbage = bytes(rng.randrange(256) for _ in range(rng.randint(1, 200)))
+        whole, _ = decode(garbage)
+        chunked, decoder = decode(garbage, random_chunks(rng, len(garbage)))
+        assert chunked == whole
+        # At most one incomplete frame is kept: a state header plus a full language frame
+        assert len(decoder._buf) <= 4 + 5 + MAX_LABEL_BYTES
+
+
+def test_decoder_resynchronizes_after_garbage():
+    frame = encode_language(0x0409, 0, "EN United States")
+    # 0xEE is not an opcode; an oversize label length makes the language header malformed
+    garbage = b"\xee\xee" + bytes((OP_LANGUAGE, 0x09, 0x04, 0, MAX_LABEL_BYTES + 1))
+    frames, decoder = decode(garbage + frame)
+    assert frames[-1] == Frame(OP_LANGUAGE, 0x0409, 0, "EN United States")
+    assert decoder.errors > 0
@@ -0,0 +1,93 @@
+import random
+
+from boten.reconnect import ReconnectScheduler
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def scheduler(clock: FakeClock, jitter: float = 0.0) -> ReconnectScheduler:
+    return ReconnectScheduler(base=0.25, cap=8.0, jitter=jitter, clock=clock, rng=random.Random(1))
+
+
+def test_backoff_doubles_up_to_the_cap():
+    reconnect = scheduler(FakeClock())
+    delays = [reconnect.failed() for _ in range(8)]
+    assert delays == [0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 8.0, 8.0]
+    assert reconnect.failures == 8
+
+
+def test_backoff_survives_hours_without_a_device():
+    reconnect = scheduler(FakeClock())
+    # Two hours of attempts at the 8 s cap; 2 ** 1024 used to overflow
+    reconnect.failures = 1030
+    assert reconnect.failed() == 8.0
+    assert reconnect.failures == 1031
+
+
+def test_jitter_only_shortens_the_delay():
+    reconnect = scheduler(FakeClock(), jitter=0.2)
+    for expected in (0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 8.0):
+        delay = reconnect.failed()
+        assert expected * 0.8 <= delay <= expected
+
+
+def test_next_attempt_is_due_after_the_delay():
+    clock = FakeClock()
+    reconnect = scheduler(clock)
+    assert reconnect.due()
+    delay = reconnect.failed()
+    assert not reconnect.due()
+    assert reconnect.remaining() == delay
+    clock.now += delay
+    assert reconnect.due()
+
+
+def test_wake_makes_the_attempt_due_and_resets_the_backoff():
+    clock = FakeClock()
+    reconnect = scheduler(clock)
+    for _ in range(6):
+        reconnect.failed()
+    assert not reconnect.due()
+    reconnect.wake()
+    assert reconnect.due()
+    assert reconnect.failed() == 0.25
+
+
+def test_success_resets_the_backoff():
+    reconnect = scheduler(FakeClock())
+    for _ in range(4):
+        reconnect.failed()
+    reconnect.succeeded()
+    assert reconnect.due()
+    assert reconnect.failed() == 0.25
+
+
+def test_stats_track_uptime_downtime_and_outages():
+    clock = FakeClock()
+    reconnect = scheduler(clock)
+    clock.now = 3.0
+    assert reconnect.set_connected(True)
+    assert not reconnect.set_connected(True)
+    assert reconnect.last_outage == 3.0
+    clock.now = 13.0
+    assert reconnect.set_connected(False)
+    reconnect.failed()
+    clock.now = 18.0
+    assert reconnect.stats() == {
+        "connected": False,
+        "uptime": 10.0,
+        "downtime": 8.0,
+        "outages": 1,
+        "longest_outage": 3.0,
+        "attempts": 1,
+        "failures": 1,
+    }
+    reconnect.set_connected(True)
+    assert reconnect.last_outage == 5.0
+    assert reconnect.longest_outage == 5.0
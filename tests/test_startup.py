@@ -0,0 +1,20 @@
+import sys
+from pathlib import Path
+
+# bench.py sits next to the package and owns the budget, so this test and --check-startup agree
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from bench import STARTUP_BUDGET_MS, bench_startup  # noqa: E402
+
+
+def test_import_stays_within_the_startup_budget():
+    # Best of three fresh interpreters, as --check-startup measures it
+    results = bench_startup(runs=3)
+    assert results["startup_import_ms"] <= STARTUP_BUDGET_MS
+
+
+def test_lazy_modules_are_not_imported_at_startup():
+    results = bench_startup(runs=1)
+    assert results["startup_modules"] > 0
+    # Any of bench.LAZY_MODULES (pyserial, pywin32, asyncio, http.server, ...) in the import log
+    assert results["startup_lazy_violations"] == []
@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+
+from boten.engine import MemoryTransport, PySerialTransport
+from boten.simulation import FakeArduino, PtyPort
+
+
+def run(coro):
+    return asyncio.run(asyncio.wait_for(coro, 5.0))
+
+
+@pytest.fixture
+def arduino():
+    device = FakeArduino()
+    yield device
+    device.close()
+
+
+def test_pty_transport_reads_frames_split_across_writes(arduino):
+    transport = PySerialTransport(PtyPort(arduino.path))
+
+    async def scenario():
+        arduino.send(b"LANGUAGE_")
+        arduino.send(b"TOGGLE\nSELECT_LAYOUT 2\n")
+        return [await transport.read_line(), await transport.read_line()]
+
+    try:
+        assert run(scenario()) == [b"LANGUAGE_TOGGLE", b"SELECT_LAYOUT 2"]
+    finally:
+        transport.close()
+
+
+def test_pty_transport_writes_to_the_device(arduino):
+    transport = PySerialTransport(PtyPort(arduino.path))
+    try:
+        run(transport.write(b"Red:Eng (United States)\n"))
+        assert arduino.wait_for(lambda line: line == b"Red:Eng (United States)") is not None
+    finally:
+        transport.close()
+
+
+def test_pty_transport_close_ends_a_pending_read(arduino):
+    transport = PySerialTransport(PtyPort(arduino.path))
+
+    async def scenario():
+        pending = asyncio.create_task(transport.read_line())
+        await asyncio.sleep(0.05)
+        transport.close()
+        return await pending
+
+    assert run(scenario()) is None
+    assert not transport.conn.is_open
+
+
+def test_pty_transport_reports_a_device_disconnect(arduino):
+    transport = PySerialTransport(PtyPort(arduino.path))
+
+    async def scenario():
+        pending = asyncio.create_task(transport.read_line())
+        await asyncio.sleep(0.05)
+        arduino.close()
+        await pending
+
+    try:
+        with pytest.raises(OSError):
+            run(scenario())
+        with pytest.raises(OSError):
+            run(transport.write(b"KEEP_ALIVE\n"))
+    finally:
+        transport.close()
+
+
+def test_memory_transport_round_trip_and_close():
+    async def scenario():
+        transport = MemoryTransport()
+        transport.feed(b"LANGUAGE_TOGGLE")
+        first = await transport.read_line()
+        await transport.write(b"KEEP_ALIVE\n")
+        pending = asyncio.create_task(transport.read_line())
+        await asyncio.sleep(0)
+        # close() is the in-memory disconnect: a pending read ends with None
+        transport.close()
+        return first, transport.written, await pending
+
+    assert run(scenario()) == (b"LANGUAGE_TOGGLE", [b"KEEP_ALIVE\n"], None)
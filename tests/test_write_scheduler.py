@@ -0,0 +1,68 @@
+import time
+
+from boten.connection import FakeSerialPort
+from boten.fanout import DeviceLink
+from boten.protocol import TextCodec
+from boten.write_scheduler import CONTROL, KEEP_ALIVE, LANGUAGE, WriteScheduler
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def drain(scheduler: WriteScheduler) -> list:
+    kinds = []
+    while True:
+        item = scheduler.next(0)
+        if item is None:
+            return kinds
+        kinds.append(item[0])
+        scheduler.sent(item[0])
+
+
+def test_idle_keep_alives_are_not_suppressed_by_each_other():
+    clock = FakeClock()
+    scheduler = WriteScheduler(keep_alive_interval=1.0, clock=clock)
+    written = []
+    for tick in range(10):
+        clock.now = float(tick)
+        scheduler.submit(b"KA", KEEP_ALIVE)
+        written += drain(scheduler)
+    assert written == [KEEP_ALIVE] * 10
+    assert scheduler.suppressed == 0
+
+
+def test_traffic_suppresses_the_next_keep_alive():
+    clock = FakeClock()
+    scheduler = WriteScheduler(keep_alive_interval=1.0, clock=clock)
+    for kind in (LANGUAGE, CONTROL):
+        clock.now += 5
+        scheduler.submit(b"frame", kind)
+        drain(scheduler)
+        clock.now += 0.5
+        scheduler.submit(b"KA", KEEP_ALIVE)
+        assert drain(scheduler) == []
+    assert scheduler.suppressed == 2
+
+
+def test_idle_keep_alives_arrive_at_a_steady_rate():
+    interval = 0.05
+    port = FakeSerialPort("FAKE", handshake=False)
+    # Each write completes a few ms after it was handed out, as over a real UART
+    port.byte_time = 0.0025
+    link = DeviceLink("FAKE", port, TextCodec(), commands=None, keep_alive_interval=interval)
+    link.start()
+    try:
+        # The monitor loop offers a keep-alive every interval, as main does every KEEP_ALIVE_TIMER
+        for _ in range(20):
+            link.send(b"KA", KEEP_ALIVE)
+            time.sleep(interval)
+    finally:
+        link.close()
+    gaps = [b - a for a, b in zip(port.write_times, port.write_times[1:])]
+    assert len(port.written) >= 18
+    assert max(gaps) < interval * 1.6